@@ -0,0 +1,381 @@
+"""
+Measures every export backend and option on synthetic videos, recording time, CPU, memory, temp disk, and size.
+
+    python benchmarks/export_benchmark.py --ffmpeg-path ffmpeg --convert-path convert --gifsicle-path gifsicle
+    python benchmarks/export_benchmark.py --sizes 640x480 --lengths 5 --motions high --json report.json --csv report.csv
+"""
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from giffer.exporter import FORMAT_EXTENSIONS, ExportJob, GifExporter
+
+# resource only exists on linux and mac, cpu and memory are left empty on windows
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# ffmpeg lavfi sources for each motion level, from a still picture to every pixel changing every frame
+MOTIONS = {'static': 'smptebars=size={size}:rate={fps}',
+           'low': 'testsrc2=size={size}:rate={fps}',
+           'high': 'testsrc2=size={size}:rate={fps},noise=alls=30:allf=t+u'}
+
+# name, backend, and extra ExportJob arguments of every case, and the tools each needs besides ffmpeg
+CASES = (('ffmpeg', 'ffmpeg', {}, ()),
+         ('ffmpeg + gifsicle', 'ffmpeg', {'optimize': True}, ('gifsicle',)),
+         ('convert', 'convert', {}, ('convert',)),
+         ('convert + gifsicle', 'convert', {'optimize': True}, ('convert', 'gifsicle')),
+         ('convert stream', 'convert', {'stream': True}, ('convert',)),
+         ('convert stream + gifsicle', 'convert', {'stream': True, 'optimize': True}, ('convert', 'gifsicle')),
+         ('numpy', 'numpy', {}, ()),
+         ('numpy optimized', 'numpy', {'optimize': True}, ()),
+         ('webp', 'ffmpeg', {'format': 'webp'}, ()),
+         ('apng', 'ffmpeg', {'format': 'apng'}, ()),
+         ('mp4', 'ffmpeg', {'format': 'mp4'}, ()),
+         ('webm', 'ffmpeg', {'format': 'webm'}, ()))
+
+# columns of the .csv report, in order
+COLUMNS = ('case', 'video', 'motion', 'size', 'length', 'run', 'wall_seconds', 'cpu_seconds', 'peak_rss_mb',
+           'peak_temp_mb', 'output_bytes', 'error')
+
+# seconds between temp directory size samples
+DISK_SAMPLE_INTERVAL = 0.05
+
+
+def makeVideo(ffmpeg_path, directory, motion, size, length, fps=30):
+    """
+    Generates a synthetic test video with ffmpeg's lavfi sources, unless it was generated before.
+
+    Args:
+        ffmpeg_path (string): Path to ffmpeg.exe
+
+        directory (string): Directory to keep generated videos in.
+
+        motion (string): One of the MOTIONS names.
+
+        size (string): Resolution such as "640x480"
+
+        length (float): Seconds long.
+
+        fps (int): Frames per second.
+
+    Returns:
+        (string): Path to the video.
+    """
+    path = os.path.join(directory, f'{motion}_{size}_{length:g}s.mp4')
+    if os.path.exists(path):
+        return path
+
+    source = MOTIONS[motion].format(size=size, fps=fps)
+    temp_path = path + '.tmp.mp4'
+    command = [ffmpeg_path, '-v', 'error', '-y', '-f', 'lavfi', '-i', source, '-t', str(length),
+               '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-g', str(fps * 2), temp_path]
+    subprocess.run(command, stdin=subprocess.DEVNULL, check=True)
+    os.replace(temp_path, path)
+    return path
+
+
+def getDirectorySize(directory):
+    """
+    Gets how many bytes every file in the given directory takes up, ignoring files removed while walking.
+
+    Args:
+        directory (string): Directory to measure.
+
+    Returns:
+        (int): Bytes.
+    """
+    total = 0
+    for root, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            try:
+                total += os.path.getsize(os.path.join(root, file_name))
+            except OSError:
+                pass
+
+    return total
+
+
+class DiskSampler(threading.Thread):
+    """
+    Samples how big a directory gets while an export runs, to find the most temp disk it used at once.
+    """
+    def __init__(self, directory):
+        """
+        Args:
+            directory (string): Directory to sample.
+        """
+        super(DiskSampler, self).__init__(daemon=True)
+        self.directory = directory
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(DISK_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, getDirectorySize(self.directory))
+
+    def stop(self):
+        """
+        Stops sampling, taking one last sample.
+
+        Returns:
+            (int): Most bytes the directory took up.
+        """
+        self.stopped.set()
+        self.join()
+        self.peak = max(self.peak, getDirectorySize(self.directory))
+        return self.peak
+
+
+def getUsage():
+    """
+    Gets the CPU seconds and peak memory of this process and every child process it has waited on.
+
+    Returns:
+        (tuple): CPU seconds, and peak resident memory of the biggest single process in megabytes.
+        Both None on windows.
+    """
+    if not resource:
+        return None, None
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+    # linux reports kilobytes, mac reports bytes
+    scale = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+    return cpu, max(own.ru_maxrss, children.ru_maxrss) / scale
+
+
+def measure(data):
+    """
+    Exports one case and measures it. Runs in its own process, launched by runCase, so CPU and memory
+    only count this export.
+
+    Args:
+        data (dictionary): "job" as ExportJob dictionary, "tools" as tool name to path dictionary,
+        and "temp" as the directory to export temp files to.
+
+    Returns:
+        (dictionary): Measured COLUMNS, without the ones runCase fills in.
+    """
+    tempfile.tempdir = data['temp']
+    job = ExportJob.fromDict(data['job'])
+    tools = data['tools']
+    exporter = GifExporter(tools['ffmpeg'], tools['convert'], tools['gifsicle'])
+    sampler = DiskSampler(data['temp'])
+    sampler.start()
+    error = ''
+
+    started = time.perf_counter()
+    try:
+        result = exporter.export(job)
+        error = ' '.join(result.warnings)
+    except Exception as export_error:
+        error = str(export_error) or type(export_error).__name__
+
+    wall = time.perf_counter() - started
+    peak_temp = sampler.stop()
+    cpu, peak_rss = getUsage()
+
+    return {'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'peak_rss_mb': peak_rss,
+            'peak_temp_mb': peak_temp / 1024.0 / 1024.0,
+            'output_bytes': os.path.getsize(job.output) if os.path.exists(job.output) else None,
+            'error': error}
+
+
+def runCase(job, tools, temp_directory):
+    """
+    Launches a new python process that exports and measures the given job.
+
+    Args:
+        job (ExportJob): Job to export.
+
+        tools (dictionary): Tool name as key, path to tool as value.
+
+        temp_directory (string): Empty directory for the export's temp files.
+
+    Returns:
+        (dictionary): Measured COLUMNS, without the ones describing the case.
+    """
+    data = json.dumps({'job': job.toDict(), 'tools': tools, 'temp': temp_directory})
+    command = [sys.executable, os.path.abspath(__file__), '--measure']
+    process = subprocess.run(command, input=data.encode(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                             check=True)
+    return json.loads(process.stdout.decode().strip().splitlines()[-1])
+
+
+def getEnvironment(tools):
+    """
+    Gets what the benchmark ran on, so reports from different machines and tool versions can be told apart.
+
+    Args:
+        tools (dictionary): Tool name as key, path to tool as value.
+
+    Returns:
+        (dictionary): Platform, python, cpu count, time, and the first line of each tool's version.
+    """
+    versions = {}
+    for name, path in tools.items():
+        if not path:
+            continue
+
+        flag = '--version' if name == 'gifsicle' else '-version'
+        try:
+            output = subprocess.run([path, flag], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    stdin=subprocess.DEVNULL).stdout.decode(errors='replace')
+            versions[name] = output.strip().splitlines()[0] if output.strip() else ''
+        except OSError:
+            versions[name] = ''
+
+    return {'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'tools': versions}
+
+
+def summarize(rows):
+    """
+    Gets the median of every measurement for each case and video, over all runs that did not fail.
+
+    Args:
+        rows (list): Measured rows with COLUMNS as keys.
+
+    Returns:
+        (list): Rows with the same keys, one per case and video, "run" is the amount of runs.
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['case'], row['video']), []).append(row)
+
+    summary = []
+    for group in groups.values():
+        passed = [row for row in group if row['output_bytes']]
+        row = dict(group[0], run=len(passed), error=group[-1]['error'])
+
+        for column in ('wall_seconds', 'cpu_seconds', 'peak_rss_mb', 'peak_temp_mb', 'output_bytes'):
+            values = [value[column] for value in passed if value[column] is not None]
+            row[column] = statistics.median(values) if values else None
+
+        summary.append(row)
+
+    return summary
+
+
+def formatValue(value, precision=2):
+    """
+    Gets the given measurement as text for the table, empty if it was not measured.
+
+    Args:
+        value (float): Measurement.
+
+        precision (int): Decimals to show.
+
+    Returns:
+        (string): Formatted value.
+    """
+    return '' if value is None else f'{value:0.{precision}f}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', default='320x240,640x480', help='Comma separated resolutions of the test videos.')
+    parser.add_argument('--lengths', default='2,6', help='Comma separated seconds of the test videos.')
+    parser.add_argument('--motions', default=','.join(MOTIONS), help='Comma separated motion levels: ' +
+                        ', '.join(MOTIONS))
+    parser.add_argument('--cases', default='', help='Comma separated case names to run, defaults to every case.')
+    parser.add_argument('--runs', type=int, default=3, help='Times to run each case, the median is reported.')
+    parser.add_argument('--fps', type=float, default=15.0, help='Frames per second of every .gif.')
+    parser.add_argument('--videos', default='', help='Directory to keep generated test videos in between runs.')
+    parser.add_argument('--json', default='', help='.json to write the environment and every run to.')
+    parser.add_argument('--csv', default='', help='.csv to write every run to.')
+    parser.add_argument('--ffmpeg-path', default=shutil.which('ffmpeg') or '', help='Defaults to ffmpeg on the PATH.')
+    parser.add_argument('--convert-path', default='', help='Skips the convert cases if not given.')
+    parser.add_argument('--gifsicle-path', default='', help='Skips the gifsicle cases if not given.')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(measure(json.loads(sys.stdin.read()))))
+        return
+
+    if not args.ffmpeg_path:
+        parser.error('ffmpeg is needed to generate the test videos! Pass --ffmpeg-path')
+
+    tools = {'ffmpeg': args.ffmpeg_path, 'convert': args.convert_path, 'gifsicle': args.gifsicle_path}
+    names = args.cases.split(',') if args.cases else [name for name, _, _, _ in CASES]
+    cases = [case for case in CASES if case[0] in names and all(tools[tool] for tool in case[3])]
+    skipped = [case[0] for case in CASES if case[0] in names and case not in cases]
+    if skipped:
+        print('skipping, missing tools: ' + ', '.join(skipped))
+
+    video_directory = args.videos or tempfile.mkdtemp(prefix='giffer_benchmark_videos_')
+    os.makedirs(video_directory, exist_ok=True)
+    work_directory = tempfile.mkdtemp(prefix='giffer_benchmark_')
+    rows = []
+
+    print(f'{"case":<28}{"video":<28}{"wall":>10}{"cpu":>13}{"peak rss":>11}{"peak temp":>16}{"output":>13}')
+    try:
+        for size in args.sizes.split(','):
+            for length in [float(length) for length in args.lengths.split(',')]:
+                for motion in args.motions.split(','):
+                    video = makeVideo(args.ffmpeg_path, video_directory, motion, size, length)
+
+                    for name, backend, options, _ in cases:
+                        for run in range(args.runs):
+                            temp_directory = tempfile.mkdtemp(dir=work_directory)
+                            extension = FORMAT_EXTENSIONS[options.get('format', 'gif')]
+                            output = os.path.join(work_directory, 'output' + extension)
+                            job = ExportJob(video, output, 0.0, length, args.fps, backend=backend, **options)
+
+                            row = {'case': name, 'video': os.path.basename(video), 'motion': motion,
+                                   'size': size, 'length': length, 'run': run}
+                            row.update(runCase(job, tools, temp_directory))
+                            rows.append(row)
+
+                            shutil.rmtree(temp_directory, ignore_errors=True)
+                            if os.path.exists(output):
+                                os.remove(output)
+
+                        row = summarize([row for row in rows if row['case'] == name and row['video'] ==
+                                         os.path.basename(video)])[0]
+                        print(f'{name:<28}{row["video"]:<28}{formatValue(row["wall_seconds"]):>9}s'
+                              f'{formatValue(row["cpu_seconds"]):>9}s cpu{formatValue(row["peak_rss_mb"], 1):>9}MB'
+                              f'{formatValue(row["peak_temp_mb"], 1):>9}MB temp{row["output_bytes"] or 0:>12.0f}B'
+                              f'  {row["error"]}')
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+        if not args.videos:
+            shutil.rmtree(video_directory, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump({'environment': getEnvironment(tools), 'runs': rows, 'summary': summarize(rows)},
+                      json_file, indent=4)
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
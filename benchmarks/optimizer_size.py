@@ -0,0 +1,74 @@
+"""
+Compares the size of .gifs optimized by giffer's own optimizer against gifsicle.exe -O3, and how long each took.
+
+    python benchmarks/optimizer_size.py video.mp4 --start 1 --end 4 --fps 15 --ffmpeg-path ffmpeg --gifsicle-path gifsicle
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from giffer.exporter import ExportJob, GifExporter
+
+
+def exportTimed(exporter, job):
+    """
+    Exports the given job, timing it.
+
+    Args:
+        exporter (GifExporter): Exporter to export with.
+
+        job (ExportJob): Job to export.
+
+    Returns:
+        (tuple): Seconds the export took, and size of the .gif in bytes.
+    """
+    started = time.time()
+    exporter.export(job)
+    return time.time() - started, os.path.getsize(job.output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('source', help='Video to export.')
+    parser.add_argument('-s', '--start', type=float, default=0.0)
+    parser.add_argument('-e', '--end', type=float, default=None)
+    parser.add_argument('--fps', type=float, default=15.0)
+    parser.add_argument('--colors', type=int, default=256)
+    parser.add_argument('--dither', default='bayer', help='Built-in encoder dither, "none", "bayer", or error diffusion.')
+    parser.add_argument('--ffmpeg-path', default='', help='Decodes with OpenCV if not given.')
+    parser.add_argument('--gifsicle-path', default='', help='Skips gifsicle.exe if not given.')
+    args = parser.parse_args(argv)
+
+    exporter = GifExporter(args.ffmpeg_path, gifsicle_path=args.gifsicle_path)
+    directory = tempfile.mkdtemp(prefix='giffer_benchmark_')
+    rows = []
+
+    def addRow(name, optimize, seconds=0.0):
+        job = ExportJob(args.source, os.path.join(directory, name + '.gif'), args.start, args.end, args.fps,
+                        args.colors, 'numpy', optimize, dither=args.dither)
+        export_seconds, size = exportTimed(exporter, job)
+        rows.append((name, size, export_seconds + seconds))
+        return job
+
+    unoptimized = addRow('unoptimized', False)
+    addRow('native', True)
+
+    if args.gifsicle_path:
+        output = os.path.join(directory, 'gifsicle.gif')
+        started = time.time()
+        exporter.gifsicleOptimize(args.gifsicle_path, unoptimized.output, output, args.colors)
+        rows.append(('gifsicle -O3', os.path.getsize(output), rows[0][2] + time.time() - started))
+
+    print(f'{"optimizer":<14}{"bytes":>12}{"of unoptimized":>16}{"seconds":>10}')
+    for name, size, seconds in rows:
+        print(f'{name:<14}{size:>12}{100.0 * size / rows[0][1]:>15.1f}%{seconds:>10.2f}')
+
+    print('.gifs written to ' + directory)
+
+
+if __name__ == '__main__':
+    main()
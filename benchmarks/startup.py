@@ -0,0 +1,145 @@
+"""
+Measures how long giffer.exe takes to start, from launching python to the main window's first paint.
+
+    python benchmarks/startup.py --runs 10 --video video.mp4 --json startup.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTED_VARIABLE = 'GIFFER_BENCHMARK_STARTED'
+
+# stages in the order they happen, each timed from when the process was launched
+STAGES = ('interpreter', 'import_qt', 'import_giffer', 'application', 'window', 'first_paint')
+
+
+def measure(video):
+    """
+    Starts giffer the way build_giffer.py does, timing each stage, then quits at the first paint.
+    Runs in its own process, launched by runOnce.
+
+    Args:
+        video (string): Video to launch giffer with, like the right click shortcut does. May be empty.
+
+    Returns:
+        (dictionary): Stage name as key, seconds since the process was launched as value.
+    """
+    started = float(os.environ[STARTED_VARIABLE])
+    times = {'interpreter': time.time() - started}
+
+    from PySide2 import QtWidgets, QtCore
+    times['import_qt'] = time.time() - started
+
+    sys.path.insert(0, ROOT)
+    import giffer.main
+    times['import_giffer'] = time.time() - started
+
+    app = QtWidgets.QApplication([sys.argv[0]])
+    times['application'] = time.time() - started
+
+    window = giffer.main.MainWindow(starting_video=video)
+    times['window'] = time.time() - started
+
+    class PaintFilter(QtCore.QObject):
+        def eventFilter(self, watched, event):
+            if event.type() == QtCore.QEvent.Paint and 'first_paint' not in times:
+                times['first_paint'] = time.time() - started
+                QtCore.QTimer.singleShot(0, app.quit)
+
+            return False
+
+    paint_filter = PaintFilter()
+    window.installEventFilter(paint_filter)
+    window.show()
+    app.exec_()
+
+    # stop the export queue the way closing the window would, without waiting on the video
+    window.export_queue.stop()
+    return times
+
+
+def runOnce(video, import_time=False):
+    """
+    Launches a new python process that measures giffer's startup.
+
+    Args:
+        video (string): Video to launch giffer with. May be empty.
+
+        import_time (boolean): If True, runs python with "-X importtime" and returns its report too.
+
+    Returns:
+        (tuple): Stage times dictionary, and the import time report, empty if not asked for.
+    """
+    command = [sys.executable] + (['-X', 'importtime'] if import_time else [])
+    command += [os.path.abspath(__file__), '--measure', '--video', video]
+    environment = dict(os.environ, **{STARTED_VARIABLE: repr(time.time())})
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=environment, check=True)
+    return json.loads(process.stdout.decode().strip().splitlines()[-1]), process.stderr.decode()
+
+
+def getSlowestImports(report, count=15):
+    """
+    Gets the modules that took longest to import from a "-X importtime" report.
+
+    Args:
+        report (string): stderr of python run with "-X importtime"
+
+        count (int): Amount of modules to get.
+
+    Returns:
+        (list): (seconds including the modules it imported, module name), slowest first.
+    """
+    imports = []
+
+    for line in report.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative) / 1000000.0, name.strip()))
+
+    return sorted(imports, reverse=True)[:count]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--runs', type=int, default=5, help='Times to launch giffer, the median of each stage is shown.')
+    parser.add_argument('--video', default='', help='Video to launch giffer with, like the right click shortcut.')
+    parser.add_argument('--json', default='', help='.json to write every run\'s times to.')
+    parser.add_argument('--import-time', action='store_true', help='Also show the slowest imports of the last run.')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(measure(args.video)))
+        return
+
+    runs = []
+    report = ''
+    for run in range(args.runs):
+        times, report = runOnce(args.video, args.import_time and run == args.runs - 1)
+        runs.append(times)
+
+    print(f'{"stage":<16}{"median":>10}{"min":>10}{"max":>10}   seconds since launch')
+    for stage in STAGES:
+        values = [times[stage] for times in runs if stage in times]
+        if values:
+            print(f'{stage:<16}{statistics.median(values):>10.3f}{min(values):>10.3f}{max(values):>10.3f}')
+
+    if args.import_time:
+        print('\nslowest imports, including what they import:')
+        for seconds, name in getSlowestImports(report):
+            print(f'{seconds:>10.3f}  {name}')
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump({'video': args.video, 'runs': runs}, json_file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+import os
+import math
+import time
+import shutil
+import tempfile
+import concurrent.futures
+import giffer.gifutil as gifutil
+from giffer.cache import DiskCache, getFileKey, makeKey
+from giffer.exporter import ExportCancelled, ExportJob, ExportProgress, GifExporter
+from giffer.metrics import StageRecord, logMetrics
+from giffer.probe import getMetadataCache, probeVideo
+
+
+# trial sizes are a few bytes of .json each, this holds tens of thousands of them
+TRIAL_CACHE_SIZE = 4 * 1024 * 1024
+
+# seconds of each sample trial exported to estimate the size of the whole range
+SAMPLE_LENGTH = 1.0
+
+# most samples spread across the range, more samples estimate better but take longer
+MAX_SAMPLES = 3
+
+# estimates are aimed this far under the budget, since samples never quite match the whole range
+SIZE_MARGIN = 0.92
+
+# times the full export may come out too big and be exported again one level down
+MAX_ATTEMPTS = 3
+
+# quality levels are every combination of these, tried from the biggest .gif to the smallest. the job's own colors
+# are always tried first, then every step of COLORS below them
+SCALES = (1.0, 0.75, 0.5, 0.375, 0.25)
+FPS_SCALES = (1.0, 0.75, 0.5)
+COLORS = (256, 128, 64, 32)
+
+# gifs below these look broken rather than small
+MIN_WIDTH = 64
+MIN_FPS = 5.0
+MIN_COLORS = 2
+
+
+def getTrialCache():
+    """
+    Gets the cache that holds how big sample trials came out, shared by every giffer.exe
+
+    Returns:
+        (DiskCache): Cache of trial size .json
+    """
+    return DiskCache(gifutil.getCacheDirectory('size_trials'), TRIAL_CACHE_SIZE)
+
+
+def parseSize(text):
+    """
+    Parses a size such as "8MB", "500k", or "2000000" into bytes.
+
+    Args:
+        text (string): Number of bytes, optionally followed by k, kb, m, mb, g, or gb.
+
+    Returns:
+        (int): Bytes.
+    """
+    units = {'': 1, 'b': 1, 'k': 1024, 'kb': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2, 'g': 1024 ** 3, 'gb': 1024 ** 3}
+    text = str(text).strip().lower()
+    number = text.rstrip('kmgb')
+    unit = text[len(number):]
+
+    try:
+        size = float(number) * units[unit]
+    except (ValueError, KeyError):
+        raise ValueError('Invalid size "' + str(text) + '"! Use bytes, or a number followed by KB, MB, or GB')
+
+    if size <= 0:
+        raise ValueError('Size must be more than 0 bytes!')
+
+    return int(size)
+
+
+def getLevels(job, width, fps):
+    """
+    Gets every quality level the job could be exported at, from the biggest .gif to the smallest.
+    Levels are ordered by how big they should come out, pixels times frames times bits per color, so the first
+    level that fits in the budget is the best looking one that does.
+
+    Args:
+        job (ExportJob): Job to lower the colors, fps, and width of.
+
+        width (int): Pixels wide the job exports at before scaling, after any crop and scale of its own.
+
+        fps (float): Frames per second the job exports at before lowering.
+
+    Returns:
+        (list): ExportJob for every level, without a max_size.
+    """
+    levels = []
+    colors_steps = [colors for colors in [job.colors] + [colors for colors in COLORS if colors < job.colors]
+                    if colors >= MIN_COLORS]
+
+    for scale in SCALES:
+        level_width = max(int(round(width * scale / 2.0)) * 2, 2)
+        if scale < 1.0 and level_width < MIN_WIDTH:
+            continue
+
+        # a height the job was given is scaled with the width, otherwise the height keeps the aspect ratio
+        level_height = job.height
+        if scale < 1.0 and job.height:
+            level_height = max(int(round(job.height * scale / 2.0)) * 2, 2)
+
+        for fps_scale in FPS_SCALES:
+            level_fps = fps * fps_scale
+            if fps_scale < 1.0 and level_fps < MIN_FPS:
+                continue
+
+            for colors in colors_steps:
+                data = dict(job.toDict(), width=level_width if scale < 1.0 else job.width, height=level_height,
+                            fps=level_fps, colors=colors, max_size=None)
+                weight = scale * scale * fps_scale * math.log2(colors)
+                levels.append((weight, ExportJob.fromDict(data)))
+
+    levels.sort(key=lambda level: level[0], reverse=True)
+    return [level for _, level in levels]
+
+
+def getSamples(job):
+    """
+    Splits the job's range into short samples spread evenly across it.
+
+    Args:
+        job (ExportJob): Job to sample.
+
+    Returns:
+        (list): (start seconds, length seconds) of each sample.
+    """
+    count = max(min(int(job.length // SAMPLE_LENGTH), MAX_SAMPLES), 1)
+    length = min(SAMPLE_LENGTH, job.length)
+    step = (job.length - length) / count
+
+    return [(job.start + step * (index + 0.5), length) for index in range(count)]
+
+
+class SizeEstimator(object):
+    """
+    Estimates how big the whole range of a job will come out by exporting short samples of it side by side.
+    Sample sizes are cached, so searching the same range again, or with a different budget, is instant.
+    """
+    def __init__(self, exporter, job, cache=None, input_job=None):
+        """
+        Args:
+            exporter (GifExporter): Exporter whose tools the samples are exported with. Cancelling it cancels samples.
+
+            job (ExportJob): Job to estimate the levels of.
+
+            cache (DiskCache): Cache of sample sizes. If None, samples are exported every time.
+
+            input_job (ExportJob): Same range as the job, read from its intermediate, see GifExporter.getInputJob.
+            If None, samples are read from the job's source.
+        """
+        self.exporter = exporter
+        self.job = job
+        self.cache = cache
+        self.input_job = input_job or job
+        self.samples = getSamples(job)
+        self.source_key = getFileKey(job.source)
+        self.estimates = {}
+
+    def getTrialKey(self, level, start, length):
+        """
+        Gets the key the size of a sample trial is cached with.
+
+        Args:
+            level (ExportJob): Job the sample was exported with.
+
+            start (float): Seconds the sample starts at.
+
+            length (float): Seconds the sample lasts.
+
+        Returns:
+            (string): Key for the trial cache.
+        """
+        return makeKey('trial', self.source_key, round(start, 6), round(length, 6), self.exporter.videoFilter(level),
+                       level.colors, level.stats_mode, level.dither, level.backend, level.optimize, level.stream,
+                       level.dedupe)
+
+    def exportSample(self, level, start, length, output):
+        """
+        Exports a sample of the given level and gets how big it came out. Runs on a pool thread.
+
+        Args:
+            level (ExportJob): Job to export a sample of.
+
+            start (float): Seconds the sample starts at.
+
+            length (float): Seconds the sample lasts.
+
+            output (string): Path to export the sample to.
+
+        Returns:
+            (int): Bytes the sample came out at.
+        """
+        key = self.getTrialKey(level, start, length)
+        data = self.cache.fetchJson(key) if self.cache else None
+        if data:
+            return data['size']
+
+        # each sample runs on its own exporter, samples are short so one ffmpeg.exe each
+        exporter = GifExporter(self.exporter.ffmpeg_path, self.exporter.convert_path, self.exporter.gifsicle_path,
+                               max_segments=1)
+        exporter.log_metrics = False
+        self.exporter.trial_exporters.append(exporter)
+
+        try:
+            if self.exporter.cancelled:
+                raise ExportCancelled('Export was cancelled!')
+
+            # samples are keyed by the source's times, but read from the same moment of the intermediate
+            start += self.input_job.start - self.job.start
+            sample = ExportJob.fromDict(dict(level.toDict(), source=self.input_job.source, output=output, start=start,
+                                             end=start + length))
+            exporter.export(sample)
+            size = os.path.getsize(output)
+        finally:
+            self.exporter.trial_exporters.remove(exporter)
+
+        if self.cache:
+            self.cache.storeJson(key, {'size': size})
+
+        return size
+
+    def estimate(self, level, temp_directory):
+        """
+        Estimates how big the whole range comes out at the given level, exporting every sample side by side.
+
+        Args:
+            level (ExportJob): Job to estimate.
+
+            temp_directory (string): Directory to export samples to.
+
+        Returns:
+            (int): Estimated bytes of the whole range.
+        """
+        key = id(level)
+        if key in self.estimates:
+            return self.estimates[key]
+
+        outputs = [os.path.join(temp_directory, 'sample' + str(len(self.estimates)) + '_' + str(index) + '.gif')
+                   for index in range(len(self.samples))]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.exporter.max_segments) as pool:
+            futures = [pool.submit(self.exportSample, level, start, length, output)
+                       for (start, length), output in zip(self.samples, outputs)]
+            sizes = [future.result() for future in futures]
+
+        sampled_length = sum(length for _, length in self.samples)
+        self.estimates[key] = int(sum(sizes) / sampled_length * self.job.length)
+        return self.estimates[key]
+
+
+def findLevel(estimator, levels, max_size, temp_directory, report=None):
+    """
+    Binary searches the levels for the first, so best looking, one estimated to fit in the given size.
+    Assumes levels come out smaller the further down the list they are, as getLevels orders them.
+
+    Args:
+        estimator (SizeEstimator): Estimates the size of a level.
+
+        levels (list): ExportJob for every level, biggest first.
+
+        max_size (int): Bytes the estimate has to fit in.
+
+        temp_directory (string): Directory to export samples to.
+
+        report (function): Called with the amount of levels estimated so far.
+
+    Returns:
+        (int): Index of the best level that fits, None if not even the smallest level fits.
+    """
+    low = 0
+    high = len(levels) - 1
+    best = None
+    estimated = 0
+
+    while low <= high:
+        middle = (low + high) // 2
+        size = estimator.estimate(levels[middle], temp_directory)
+        estimated += 1
+
+        if report:
+            report(estimated)
+
+        if size <= max_size:
+            best = middle
+            high = middle - 1
+        else:
+            low = middle + 1
+
+    return best
+
+
+def describeLevel(level, size):
+    """
+    Gets the colors, fps, and width a job was fit to size with, to show the user.
+
+    Args:
+        level (ExportJob): Job that was exported.
+
+        size (int): Bytes the .gif came out at.
+
+    Returns:
+        (string): Note such as "Fit in 7.84MB with 128 colors, 15.00 fps, 480px wide"
+    """
+    width = str(level.width) + 'px wide' if level.width else 'full width'
+    if level.height:
+        width += ', ' + str(level.height) + 'px high'
+    return f'Fit in {gifutil.formatSize(size)} with {level.colors} colors, {level.fps:0.2f} fps, {width}'
+
+
+def exportToSize(exporter, job):
+    """
+    Exports the job at the best colors, fps, and width that fit in its max_size. Searches quality levels by
+    exporting short samples of each one side by side, then exports the whole range at the chosen level.
+    If the whole range still comes out too big, exports again at the next level expected to fit.
+
+    Args:
+        exporter (GifExporter): Exporter to export with.
+
+        job (ExportJob): Job with a max_size.
+
+    Returns:
+        (ExportResult): Result of the export, with a note of the colors, fps, and width chosen.
+        Has a warning if it still came out too big after MAX_ATTEMPTS exports.
+    """
+    if job.length is None or job.length <= 0:
+        raise ValueError('An end is required to export to a size!')
+
+    info = probeVideo(job.source, exporter.ffmpeg_path, getMetadataCache())
+    fps = job.fps or float(info.fps)
+    source_width, source_height = job.crop[2:] if job.crop else (info.width, info.height)
+    width, _ = gifutil.getScaledSize(source_width, source_height, job.width, job.height)
+    levels = getLevels(job, width, fps)
+    if not levels:
+        raise ValueError('Could not fit the .gif in ' + gifutil.formatSize(job.max_size) + ' with ' +
+                         str(job.colors) + ' colors! At least ' + str(MIN_COLORS) + ' colors are needed')
+
+    rounds = max(int(math.ceil(math.log2(len(levels) + 1))), 1)
+
+    def report(estimated):
+        exporter.reportProgress(ExportProgress('fitting to ' + gifutil.formatSize(job.max_size), estimated,
+                                               percent=min(100.0 * estimated / rounds, 100.0)))
+
+    temp_directory = tempfile.mkdtemp()
+    target = job.max_size * SIZE_MARGIN
+    searching = StageRecord('fit to size')
+    searching_started = time.time()
+
+    # the search is logged along with the export that fit, rather than each export on its own
+    log_metrics = exporter.log_metrics
+    exporter.log_metrics = False
+
+    try:
+        # samples seek into the range's intermediate rather than the source, the final export reads it too
+        started = time.perf_counter()
+        estimator = SizeEstimator(exporter, job, getTrialCache(), exporter.getInputJob(job, temp_directory))
+        searching.seconds += time.perf_counter() - started
+
+        for _ in range(MAX_ATTEMPTS):
+            started = time.perf_counter()
+            index = findLevel(estimator, levels, target, temp_directory, report)
+            searching.seconds += time.perf_counter() - started
+            if index is None:
+                smallest = estimator.estimate(levels[-1], temp_directory)
+                raise ValueError('Could not fit the .gif in ' + gifutil.formatSize(job.max_size) + ', the smallest it '
+                                 'can export at comes out around ' + gifutil.formatSize(smallest))
+
+            if exporter.cancelled:
+                raise ExportCancelled('Export was cancelled!')
+
+            level = levels[index]
+            result = exporter.export(level)
+            size = os.path.getsize(result.path)
+
+            result.job = job
+            # the level's size replaces the note of the attempt's own export
+            result.notes = [describeLevel(level, size)]
+            result.metrics.records.insert(0, searching)
+            if size <= job.max_size:
+                break
+
+            # samples underestimated this range, aim lower by as much as they were off
+            target *= job.max_size / float(size)
+            levels = levels[index + 1:]
+            if not levels:
+                break
+    finally:
+        exporter.log_metrics = log_metrics
+        shutil.rmtree(temp_directory, ignore_errors=True)
+
+    if size > job.max_size:
+        result.notes = []
+        result.warnings.append('Could not fit the .gif in ' + gifutil.formatSize(job.max_size) + '! ' +
+                               describeLevel(level, size).replace('Fit in', 'Exported at'))
+
+    # total covers the search and every attempt, not only the export that fit
+    result.metrics.started = searching_started
+    result.metrics.finish()
+    if log_metrics:
+        logMetrics(result.metrics, 'finished')
+
+    return result
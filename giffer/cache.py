@@ -0,0 +1,324 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import collections
+
+
+# bytes read from the start, middle, and end of a file to hash it, reading all of a large video takes too long
+HASH_SAMPLE_SIZE = 1024 * 1024
+
+# hashes already worked out this session, keyed by path, size, and modified time
+_file_hashes = {}
+
+
+def hashFile(path):
+    """
+    Gets a hash of the given file's content. Hashes the size and a sample from the start, middle, and end,
+    which tells videos apart without reading gigabytes. Remembered for the session by path, size, and modified time.
+
+    Args:
+        path (string): Path to file to hash.
+
+    Returns:
+        (string): Hex digest of the file's content.
+    """
+    stat = os.stat(path)
+    stat_key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+
+    if stat_key in _file_hashes:
+        return _file_hashes[stat_key]
+
+    sha = hashlib.sha1(str(stat.st_size).encode())
+    with open(path, 'rb') as open_file:
+        if stat.st_size <= HASH_SAMPLE_SIZE * 3:
+            sha.update(open_file.read())
+        else:
+            for offset in (0, stat.st_size // 2, stat.st_size - HASH_SAMPLE_SIZE):
+                open_file.seek(offset)
+                sha.update(open_file.read(HASH_SAMPLE_SIZE))
+
+    _file_hashes[stat_key] = sha.hexdigest()
+    return _file_hashes[stat_key]
+
+
+def getFileKey(path):
+    """
+    Gets the parts a file is keyed by in the caches. The content hash only samples the file, so two videos the same
+    size could share it, the path, size, and modified time are part of the key too.
+
+    Args:
+        path (string): Path to file to get key parts of.
+
+    Returns:
+        (list): Absolute path, size, modified time, and content hash of the file.
+    """
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime, hashFile(path)]
+
+
+def makeKey(*parts):
+    """
+    Gets a cache key from the given parts.
+
+    Args:
+        parts (list): Anything that can be written to .json, e.g. file hash, times, and settings.
+
+    Returns:
+        (string): Hex digest of the given parts.
+    """
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+class MemoryCache(object):
+    """
+    Holds up to max_items values in memory by key, dropping the least recently used value once full.
+    """
+    def __init__(self, max_items):
+        """
+        Args:
+            max_items (int): Amount of values to hold before the least recently used is dropped.
+        """
+        self.max_items = max_items
+        self.items = collections.OrderedDict()
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key, default=None):
+        """
+        Gets the value held for the given key, marking it as recently used.
+
+        Args:
+            key (object): Any hashable key.
+
+            default (object): Returned if no value is held for the key.
+
+        Returns:
+            (object): Value held for the key, or default.
+        """
+        if key not in self.items:
+            return default
+
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def set(self, key, value):
+        """
+        Holds the given value for the given key, dropping the least recently used value if full.
+
+        Args:
+            key (object): Any hashable key.
+
+            value (object): Value to hold.
+        """
+        self.items[key] = value
+        self.items.move_to_end(key)
+
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        """
+        Drops every value.
+        """
+        self.items.clear()
+
+
+class DiskCache(object):
+    """
+    Directory of files stored by key, removing the least recently used files once it grows past max_bytes.
+    Files are stored and fetched by copy or hard link, so a file being evicted never breaks someone using it.
+    Safe to use from many threads and many giffer.exe instances at the same time.
+    """
+    def __init__(self, directory, max_bytes, link=True):
+        """
+        Args:
+            directory (string): Directory to store files in. Created if it does not exist.
+
+            max_bytes (int): Size the directory may grow to before least recently used files are removed.
+
+            link (boolean): If False, files are always copied in and out, for files the user may change afterwards.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.link = link
+
+    def getPath(self, key):
+        """
+        Gets where the file for the given key is stored.
+
+        Args:
+            key (string): Key returned by makeKey.
+
+        Returns:
+            (string): Path to file stored for key, may not exist.
+        """
+        return os.path.join(self.directory, key)
+
+    def contains(self, key):
+        """
+        Gets whether a file is stored for the given key.
+
+        Args:
+            key (string): Key returned by makeKey.
+
+        Returns:
+            (boolean): True if a file is stored for the key.
+        """
+        return os.path.exists(self.getPath(key))
+
+    def fetch(self, key, destination):
+        """
+        Hard links, or copies if it can't link, the file stored for the given key to the given destination.
+        Marks the file as recently used.
+
+        Args:
+            key (string): Key returned by makeKey.
+
+            destination (string): Path to place the file at. Must not exist.
+
+        Returns:
+            (boolean): True if the file was stored and placed at the destination, False if it is not stored.
+        """
+        path = self.getPath(key)
+
+        try:
+            os.utime(path)
+            if self.link:
+                try:
+                    os.link(path, destination)
+                    return True
+                except OSError:
+                    pass
+
+            shutil.copyfile(path, destination)
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def fetchJson(self, key):
+        """
+        Reads the .json stored for the given key. Marks the file as recently used.
+
+        Args:
+            key (string): Key returned by makeKey.
+
+        Returns:
+            (object): Data stored for the key, None if nothing is stored or the file can't be read.
+        """
+        path = self.getPath(key)
+
+        try:
+            os.utime(path)
+            with open(path, 'r') as open_file:
+                return json.load(open_file)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, source):
+        """
+        Hard links, or copies if it can't link, the given file into the cache under the given key,
+        then evicts least recently used files if too big. The given file must not be changed afterwards.
+
+        Args:
+            key (string): Key returned by makeKey.
+
+            source (string): Path to file to store.
+        """
+        def linkFile(temp_path):
+            if self.link:
+                os.remove(temp_path)
+                try:
+                    os.link(source, temp_path)
+                    return
+                except OSError:
+                    pass
+
+            shutil.copyfile(source, temp_path)
+
+        self.write(key, linkFile)
+
+    def storeJson(self, key, data):
+        """
+        Writes the given data as .json into the cache under the given key, then evicts least recently used files.
+
+        Args:
+            key (string): Key returned by makeKey.
+
+            data (object): Anything that can be written to .json
+        """
+        def writeData(temp_path):
+            with open(temp_path, 'w') as open_file:
+                json.dump(data, open_file)
+
+        self.write(key, writeData)
+
+    def write(self, key, write_function):
+        """
+        Writes a file into the cache under the given key, then evicts least recently used files if too big.
+
+        Args:
+            key (string): Key returned by makeKey.
+
+            write_function (function): Called with the path to write the file's content to.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        # write to a temp file in the cache first so other readers never see half a file
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(handle)
+
+        try:
+            write_function(temp_path)
+            os.replace(temp_path, self.getPath(key))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used files until the cache is no bigger than max_bytes.
+        """
+        if not os.path.isdir(self.directory):
+            return
+
+        entries = []
+        total = 0
+
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or entry.name.endswith('.tmp'):
+                continue
+
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                return
+
+            try:
+                os.remove(path)
+            except OSError:
+                # another giffer.exe may have removed it, or windows may have it open
+                continue
+
+            total -= size
+
+    def clear(self):
+        """
+        Removes every file in the cache.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
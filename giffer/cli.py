@@ -0,0 +1,368 @@
+import os
+import sys
+import shutil
+import argparse
+import subprocess
+import giffer.gifutil as gifutil
+from giffer.budget import parseSize
+from giffer.exporter import (BACKENDS, DEDUPE_THRESHOLD, FORMAT_EXTENSIONS, FORMATS, ExportJob, GifExporter,
+                             getIntermediateCache, getPaletteCache, getResultCache)
+from giffer.probe import getMetadataCache, probeVideo
+
+
+def getToolPaths(args):
+    """
+    Gets the paths to ffmpeg, convert, and gifsicle. Paths given as arguments win over the cached settings,
+    which win over whatever is found on the PATH.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        (dictionary): Tool name as key, path to tool as value.
+    """
+    data_path = gifutil.getDataPath()
+    data = gifutil.readJson(data_path) if os.path.exists(data_path) else {}
+    paths = {}
+
+    for name in ('ffmpeg', 'convert', 'gifsicle'):
+        path = getattr(args, name + '_path') or data.get(name) or shutil.which(name) or ''
+        paths[name] = path
+
+    return paths
+
+
+def parseCrop(text):
+    """
+    Parses a crop such as "100,50,640,360" into the x, y, width, and height an ExportJob crops to.
+
+    Args:
+        text (string): x, y, width, and height in pixels, separated by commas.
+
+    Returns:
+        (list): x, y, width, and height in pixels.
+    """
+    try:
+        crop = [int(value) for value in text.split(',')]
+    except ValueError:
+        crop = []
+
+    if len(crop) != 4:
+        raise ValueError('Invalid crop "' + text + '"! Use x,y,width,height in pixels, e.g. 100,50,640,360')
+
+    return crop
+
+
+def parseClip(text):
+    """
+    Parses a clip such as "1.5:4" into the start and end it exports.
+
+    Args:
+        text (string): Start and end in seconds, separated by a colon.
+
+    Returns:
+        (tuple): Start and end in seconds.
+    """
+    try:
+        start, end = (float(value) for value in text.split(':'))
+    except ValueError:
+        raise ValueError('Invalid clip "' + text + '"! Use start:end in seconds, e.g. 1.5:4')
+
+    if end <= start:
+        raise ValueError('Invalid clip "' + text + '"! The end must be after the start')
+
+    return start, end
+
+
+def getOutputPath(source, output, extension='.gif'):
+    """
+    Gets where the .gif for the given source video should be written to.
+
+    Args:
+        source (string): Path to video.
+
+        output (string): Path to .gif or to a directory. If empty, exports next to the source video.
+
+        extension (string): Extension of the format exported, used when output is not a file.
+
+    Returns:
+        (string): Path to .gif, never the source video itself unless output is.
+    """
+    if not output:
+        return gifutil.getExportName(source, os.path.dirname(source), extension)
+
+    if os.path.isdir(output):
+        return gifutil.getExportName(source, output, extension)
+
+    return output
+
+
+def fillFromVideo(job, ffmpeg_path):
+    """
+    Fills in the fps and end the job was not given with the video's own frame rate and duration,
+    so exports know how many frames they will write. Left empty if the video can't be probed.
+
+    Args:
+        job (ExportJob): Job to fill in.
+
+        ffmpeg_path (string): Path to ffmpeg, ffprobe is looked for next to it.
+    """
+    if job.fps and job.end is not None:
+        return
+
+    try:
+        info = probeVideo(job.source, ffmpeg_path, getMetadataCache())
+    except (OSError, ValueError, ImportError, subprocess.CalledProcessError):
+        return
+
+    if not job.fps:
+        job.fps = float(info.fps)
+
+    if job.end is None and info.duration:
+        job.end = info.duration
+
+
+def getJobOptions(args):
+    """
+    Gets the ExportJob arguments the command line sets for every video.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        (dictionary): ExportJob argument name as key, without source and output.
+    """
+    return {'start': args.start,
+            'end': args.end,
+            'fps': args.fps,
+            'colors': args.colors,
+            'backend': args.backend,
+            'optimize': args.gifsicle,
+            'stats_mode': args.stats_mode,
+            'dither': args.dither,
+            'stream': args.stream,
+            'width': args.width,
+            'max_size': parseSize(args.max_size) if args.max_size else None,
+            'height': args.height,
+            'crop': parseCrop(args.crop) if args.crop else None,
+            'format': args.format,
+            'dedupe': args.dedupe}
+
+
+def readJobs(path):
+    """
+    Gets the jobs in the given --jobs .json, a list of dictionaries like the ones returned by ExportJob.toDict.
+
+    Args:
+        path (string): Path to the .json.
+
+    Returns:
+        (list): ExportJob for every entry. Raises ValueError naming the file, and the entry, that could not be read.
+    """
+    try:
+        data = gifutil.readJson(path)
+    except (OSError, ValueError) as error:
+        raise ValueError('Could not read --jobs ' + path + '! ' + str(error))
+
+    if not isinstance(data, list):
+        raise ValueError('--jobs ' + path + ' must be a list of jobs!')
+
+    jobs = []
+    for index, entry in enumerate(data):
+        try:
+            jobs.append(ExportJob.fromDict(entry))
+        except (TypeError, KeyError, ValueError) as error:
+            raise ValueError('Invalid job ' + str(index) + ' in --jobs ' + path + '! ' + str(error))
+
+    return jobs
+
+
+def getJobs(args, paths):
+    """
+    Gets all the jobs to export from the given command line arguments.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+        paths (dictionary): Tool name as key, path to tool as value, as returned by getToolPaths.
+
+    Returns:
+        (list): ExportJob for every video given and every job in the --jobs .json
+    """
+    if len(args.inputs) > 1 and args.output and not os.path.isdir(args.output):
+        raise ValueError('--output must be a directory when exporting more than one video!')
+
+    options = getJobOptions(args)
+    clips = [parseClip(clip) for clip in args.clip] or [(args.start, args.end)]
+    jobs = []
+    for source, (start, end), number in ((source, clip, number) for source in args.inputs
+                                         for number, clip in enumerate(clips, 1)):
+        output = getOutputPath(source, args.output, FORMAT_EXTENSIONS[args.format])
+        if len(clips) > 1:
+            file_name, extension = os.path.splitext(output)
+            output = file_name + '_' + str(number) + extension
+
+        jobs.append(ExportJob(source, output, **dict(options, start=start, end=end)))
+
+    if args.jobs:
+        jobs += readJobs(args.jobs)
+
+    for job in jobs:
+        if os.path.exists(job.source):
+            fillFromVideo(job, paths['ffmpeg'])
+
+    return jobs
+
+
+def getBatches(jobs):
+    """
+    Groups the clips of each video that can share a decode, see GifExporter.canShareDecode, so they are exported
+    together and decode it once. Every other job is a batch of its own.
+
+    Args:
+        jobs (list): ExportJob to export.
+
+    Returns:
+        (list): Lists of ExportJob with the same source, in the order each batch first appears.
+    """
+    batches = {}
+    for job in jobs:
+        key = job.source if GifExporter.canShareDecode(job) else id(job)
+        batches.setdefault(key, []).append(job)
+
+    return list(batches.values())
+
+
+def createParser():
+    """
+    Creates the parser for the giffer command line.
+
+    Returns:
+        (argparse.ArgumentParser): Parser with all of giffer's arguments.
+    """
+    parser = argparse.ArgumentParser(prog='giffer', description='Export .gifs from videos without opening a window.')
+    parser.add_argument('inputs', nargs='*', help='Videos to export.')
+    parser.add_argument('-o', '--output', default='', help='.gif to export to, or directory to export all .gifs to.')
+    parser.add_argument('-s', '--start', type=float, default=0.0, help='Seconds where the .gif should start.')
+    parser.add_argument('-e', '--end', type=float, default=None, help='Seconds where the .gif should end.')
+    parser.add_argument('--clip', action='append', default=[],
+                        help='start:end in seconds of a clip to export, repeat to export many clips in one pass.')
+    parser.add_argument('--fps', type=float, default=None, help='Frames per second. Defaults to the video\'s exact fps.')
+    parser.add_argument('--width', type=int, default=None, help='Pixels wide to scale to. Defaults to the video\'s.')
+    parser.add_argument('--height', type=int, default=None, help='Pixels high to scale to. Defaults to the video\'s.')
+    parser.add_argument('--crop', default='', help='x,y,width,height of the video to keep, cropped before scaling.')
+    parser.add_argument('--max-size', default='', help='Size to fit in, e.g. 8MB. Lowers colors, fps, and width.')
+    parser.add_argument('--colors', type=int, default=256, help='Most colors the .gif may use.')
+    parser.add_argument('--backend', choices=BACKENDS, default='ffmpeg', help='Tools used to create the .gif')
+    parser.add_argument('--format', choices=FORMATS, default='gif',
+                        help='Format to export, anything but gif is encoded by ffmpeg alone.')
+    parser.add_argument('--dedupe', type=float, nargs='?', const=DEDUPE_THRESHOLD, default=None,
+                        help='Drop frames differing from the last by at most this, 0 to 1, showing it longer instead.')
+    parser.add_argument('--gifsicle', action='store_true', help='Optimize the .gif with gifsicle, or built-in with numpy.')
+    parser.add_argument('--stream', action='store_true', help='Pipe frames into convert instead of writing .pngs.')
+    parser.add_argument('--stats-mode', choices=('full', 'diff', 'single'), default='full', help='ffmpeg palettegen stats_mode.')
+    parser.add_argument('--dither', default='sierra2_4a', help='ffmpeg paletteuse dither, e.g. bayer or none.')
+    parser.add_argument('--no-palette-cache', action='store_true', help='Generate every palette, even if cached.')
+    parser.add_argument('--no-intermediate-cache', action='store_true',
+                        help='Seek into the video every export, even if the range was cut into a lossless .mkv.')
+    parser.add_argument('--cut-intermediates', action='store_true',
+                        help='Cut each range into a lossless .mkv, faster to export again with other settings.')
+    parser.add_argument('--no-result-cache', action='store_true',
+                        help='Export every .gif, even if the same video and settings were exported before.')
+    parser.add_argument('--segments', type=int, default=None, help='Most ffmpeg processes per export. Defaults to cores.')
+    parser.add_argument('--metrics', default='', help='.json to write how long each stage of every export took.')
+    parser.add_argument('--watch', default='', help='Folder to watch, exporting every new or changed video in it.')
+    parser.add_argument('--workers', type=int, default=None, help='Videos --watch exports at once. Defaults to half the cores.')
+    parser.add_argument('--once', action='store_true', help='Export every video in the --watch folder, then exit.')
+    parser.add_argument('--jobs', default='', help='.json with a list of jobs, each with the ExportJob arguments.')
+    parser.add_argument('--ffmpeg-path', default='', help='Path to ffmpeg. Defaults to the giffer.exe settings.')
+    parser.add_argument('--convert-path', default='', help='Path to convert. Defaults to the giffer.exe settings.')
+    parser.add_argument('--gifsicle-path', default='', help='Path to gifsicle. Defaults to the giffer.exe settings.')
+    return parser
+
+
+def main(argv=None):
+    """
+    Exports every job given in the command line, carrying on to the next job if one fails.
+
+    Args:
+        argv (list): Command line arguments, uses sys.argv if None.
+
+    Returns:
+        (int): Exit code, 0 if every job exported, 1 if any job failed.
+    """
+    parser = createParser()
+    args = parser.parse_args(argv)
+
+    paths = getToolPaths(args)
+
+    if args.watch:
+        if not os.path.isdir(args.watch):
+            parser.error('--watch must be a folder!')
+
+        # imported here since the watcher imports the command line's helpers
+        from giffer.watch import FolderWatcher
+
+        try:
+            watcher = FolderWatcher(args.watch, paths, getJobOptions(args), args.workers)
+        except ValueError as error:
+            parser.error(str(error))
+
+        watcher.run(args.once)
+        return 0
+
+    try:
+        jobs = getJobs(args, paths)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if not jobs:
+        parser.error('No videos to export! Pass videos or --jobs')
+
+    palette_cache = None if args.no_palette_cache else getPaletteCache()
+    intermediate_cache = None if args.no_intermediate_cache else getIntermediateCache()
+    result_cache = None if args.no_result_cache else getResultCache()
+    exporter = GifExporter(paths['ffmpeg'],
+                           paths['convert'],
+                           paths['gifsicle'],
+                           palette_cache=palette_cache,
+                           max_segments=args.segments,
+                           intermediate_cache=intermediate_cache,
+                           result_cache=result_cache,
+                           cut_intermediates=args.cut_intermediates)
+    failed = 0
+    metrics = []
+
+    # clips of one video are exported in one pass, but each fails on its own
+    for batch in getBatches(jobs):
+        try:
+            results = exporter.exportClips(batch) if len(batch) > 1 else [exporter.export(batch[0])]
+        except Exception as error:
+            failed += len(batch)
+            print('FAILED: ' + batch[0].source + ': ' + str(error), file=sys.stderr)
+            continue
+
+        for result in results:
+            job = result.job
+            if result.error:
+                failed += 1
+                print('FAILED: ' + job.source + ': ' + str(result.error), file=sys.stderr)
+                continue
+
+            metrics.append(result.metrics.toDict())
+
+            for warning in result.warnings:
+                print('WARNING: ' + job.source + ': ' + warning, file=sys.stderr)
+
+            for note in result.notes:
+                print(job.source + ': ' + note, file=sys.stderr)
+
+            print(result.path)
+
+    if args.metrics:
+        gifutil.writeJson(args.metrics, metrics)
+
+    if failed:
+        print(str(failed) + ' of ' + str(len(jobs)) + ' exports failed.', file=sys.stderr)
+
+    return 1 if failed else 0
@@ -0,0 +1,198 @@
+from PySide2 import QtWidgets, QtCore
+
+
+# crops smaller than this many pixels of the video are treated as a stray click
+MIN_CROP_SIZE = 8
+
+
+def getDisplayRect(widget_width, widget_height, video_width, video_height):
+    """
+    Gets where the video is drawn inside a widget that keeps the video's aspect ratio, centered with bars on the sides.
+
+    Args:
+        widget_width (int): Pixels wide the widget is.
+
+        widget_height (int): Pixels high the widget is.
+
+        video_width (int): Pixels wide the video is.
+
+        video_height (int): Pixels high the video is.
+
+    Returns:
+        (tuple): x, y, width, and height in widget pixels the video is drawn at.
+    """
+    scale = min(widget_width / float(video_width), widget_height / float(video_height))
+    width = video_width * scale
+    height = video_height * scale
+    return (widget_width - width) / 2.0, (widget_height - height) / 2.0, width, height
+
+
+def toVideoCrop(rect, display_rect, video_width, video_height):
+    """
+    Gets the pixels of the video under the given rectangle of the widget the video is drawn in.
+
+    Args:
+        rect (tuple): x, y, width, and height in widget pixels.
+
+        display_rect (tuple): x, y, width, and height in widget pixels the video is drawn at, see getDisplayRect.
+
+        video_width (int): Pixels wide the video is.
+
+        video_height (int): Pixels high the video is.
+
+    Returns:
+        (list): x, y, width, and height in video pixels, kept inside the video and rounded to even pixels.
+        None if the rectangle covers less than MIN_CROP_SIZE pixels of the video either way.
+    """
+    display_x, display_y, display_width, display_height = display_rect
+    scale = video_width / float(display_width)
+
+    left = min(max((rect[0] - display_x) * scale, 0), video_width)
+    top = min(max((rect[1] - display_y) * scale, 0), video_height)
+    right = min(max((rect[0] + rect[2] - display_x) * scale, 0), video_width)
+    bottom = min(max((rect[1] + rect[3] - display_y) * scale, 0), video_height)
+
+    # even sizes keep every encoder and the 4:2:0 video ffmpeg decodes to happy
+    x = int(left) // 2 * 2
+    y = int(top) // 2 * 2
+    width = int(right - x) // 2 * 2
+    height = int(bottom - y) // 2 * 2
+
+    if width < MIN_CROP_SIZE or height < MIN_CROP_SIZE:
+        return None
+
+    return [x, y, width, height]
+
+
+def toWidgetRect(crop, display_rect, video_width):
+    """
+    Gets where the given crop of the video is drawn inside the widget, the opposite of toVideoCrop.
+
+    Args:
+        crop (list): x, y, width, and height in video pixels.
+
+        display_rect (tuple): x, y, width, and height in widget pixels the video is drawn at, see getDisplayRect.
+
+        video_width (int): Pixels wide the video is.
+
+    Returns:
+        (tuple): x, y, width, and height in widget pixels.
+    """
+    display_x, display_y, display_width, _ = display_rect
+    scale = display_width / float(video_width)
+    x, y, width, height = crop
+    return (int(round(display_x + x * scale)), int(round(display_y + y * scale)),
+            int(round(width * scale)), int(round(height * scale)))
+
+
+class CropSelector(QtCore.QObject):
+    """
+    Lets the user drag a rectangle over the video widget to crop the .gif to. The rectangle stays drawn over the
+    video, following it as the window resizes. Right clicking or double clicking the video clears the crop.
+    """
+    cropChanged = QtCore.Signal(object)
+
+    def __init__(self, widget, parent=None):
+        """
+        Args:
+            widget (QWidget): Widget the video is drawn in, keeping its aspect ratio.
+
+            parent (QObject): Parent of the selector.
+        """
+        super(CropSelector, self).__init__(parent=parent)
+        self.widget = widget
+        self.rubber_band = QtWidgets.QRubberBand(QtWidgets.QRubberBand.Rectangle, widget)
+        self.origin = None
+        self.video_width = 0
+        self.video_height = 0
+        self.crop = None
+        widget.installEventFilter(self)
+
+    def setVideoSize(self, width, height):
+        """
+        Sets the size of the video being cropped, clearing any crop of the last video.
+
+        Args:
+            width (int): Pixels wide the video is, 0 if unknown.
+
+            height (int): Pixels high the video is, 0 if unknown.
+        """
+        self.video_width = width
+        self.video_height = height
+        self.setCrop(None)
+
+    def getDisplayRect(self):
+        """
+        Gets where the video is drawn inside the widget.
+
+        Returns:
+            (tuple): x, y, width, and height in widget pixels.
+        """
+        return getDisplayRect(self.widget.width(), self.widget.height(), self.video_width, self.video_height)
+
+    def setCrop(self, crop):
+        """
+        Sets the crop and draws it over the video.
+
+        Args:
+            crop (list): x, y, width, and height in video pixels. None clears the crop.
+        """
+        self.crop = crop
+        self.updateRubberBand()
+        self.cropChanged.emit(crop)
+
+    def updateRubberBand(self):
+        """
+        Draws the crop over the video where the video is drawn now, or hides it if there is no crop.
+        """
+        if not self.crop or not self.video_width:
+            self.rubber_band.hide()
+            return
+
+        x, y, width, height = toWidgetRect(self.crop, self.getDisplayRect(), self.video_width)
+        self.rubber_band.setGeometry(x, y, width, height)
+        self.rubber_band.show()
+
+    def eventFilter(self, watched, event):
+        """
+        Overwriting event filter to drag out the crop with the left mouse button over the video widget.
+
+        Args:
+            watched (QObject): Object the event was sent to.
+
+            event (QEvent): Mouse or resize event to handle.
+
+        Returns:
+            (boolean): True if the event was handled and should not be passed on.
+        """
+        if watched is not self.widget or not self.video_width:
+            return False
+
+        event_type = event.type()
+
+        if event_type == QtCore.QEvent.Resize:
+            self.updateRubberBand()
+        elif event_type == QtCore.QEvent.MouseButtonDblClick or (event_type == QtCore.QEvent.MouseButtonPress and
+                                                                  event.button() == QtCore.Qt.RightButton):
+            self.origin = None
+            self.setCrop(None)
+            return True
+        elif event_type == QtCore.QEvent.MouseButtonPress and event.button() == QtCore.Qt.LeftButton:
+            self.origin = event.pos()
+            self.rubber_band.setGeometry(QtCore.QRect(self.origin, QtCore.QSize()))
+            self.rubber_band.show()
+            return True
+        elif event_type == QtCore.QEvent.MouseMove and self.origin is not None:
+            self.rubber_band.setGeometry(QtCore.QRect(self.origin, event.pos()).normalized())
+            return True
+        elif event_type == QtCore.QEvent.MouseButtonRelease and self.origin is not None:
+            rect = QtCore.QRect(self.origin, event.pos()).normalized()
+            self.origin = None
+            crop = toVideoCrop((rect.x(), rect.y(), rect.width(), rect.height()), self.getDisplayRect(),
+                               self.video_width, self.video_height)
+
+            # a click without a drag keeps the crop there was
+            self.setCrop(crop if crop else self.crop)
+            return True
+
+        return False
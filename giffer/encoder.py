@@ -0,0 +1,608 @@
+import numpy
+import giffer.gifutil as gifutil
+from giffer.gifstream import MAX_DELAY
+from giffer.optimizer import FrameOptimizer
+
+
+# 4x4 bayer threshold matrix, centered on zero, used for ordered dithering
+BAYER_MATRIX = (numpy.array([[0, 8, 2, 10],
+                             [12, 4, 14, 6],
+                             [3, 11, 1, 9],
+                             [15, 7, 13, 5]], dtype=numpy.float32) + 0.5) / 16.0 - 0.5
+
+# floyd steinberg error weights as (row offset, column offset, weight)
+FLOYD_STEINBERG_WEIGHTS = ((0, 1, 7 / 16.0), (1, -1, 3 / 16.0), (1, 0, 5 / 16.0), (1, 1, 1 / 16.0))
+
+# bits per channel of the lookup table that maps colors to their nearest palette index
+LOOKUP_BITS = 5
+
+# pixels sampled from all the frames to build the palette from
+PALETTE_SAMPLE_SIZE = 200000
+
+# frames dithered together, sharing the per line work of error diffusion
+DITHER_BATCH_SIZE = 16
+
+# pixels wide and high of the blocks frames are compared in for duplicates, the same as ffmpeg's mpdecimate
+DUPLICATE_BLOCK_SIZE = 8
+
+
+def medianCut(pixels, colors):
+    """
+    Reduces the given pixels to a palette using median cut. Repeatedly splits the box of pixels with the widest
+    channel range at the median of that channel, then averages each box into one color.
+
+    Args:
+        pixels (numpy.ndarray): (N, 3) uint8 RGB pixels.
+
+        colors (int): Most colors the palette may have.
+
+    Returns:
+        (numpy.ndarray): (colors or less, 3) uint8 RGB palette.
+    """
+    boxes = [pixels]
+    ranges = [numpy.ptp(pixels, axis=0)]
+
+    while len(boxes) < colors:
+        widest = int(numpy.argmax([box_range.max() for box_range in ranges]))
+
+        # every box is a single color, no more splitting will help
+        if ranges[widest].max() == 0:
+            break
+
+        box = boxes.pop(widest)
+        channel = int(numpy.argmax(ranges.pop(widest)))
+        half = len(box) // 2
+        order = numpy.argpartition(box[:, channel], half)
+
+        for split in (box[order[:half]], box[order[half:]]):
+            boxes.append(split)
+            ranges.append(numpy.ptp(split, axis=0))
+
+    return numpy.array([box.mean(axis=0) for box in boxes]).round().astype(numpy.uint8)
+
+
+def buildPalette(frames, colors, sample_size=PALETTE_SAMPLE_SIZE):
+    """
+    Builds one global palette from pixels sampled evenly across all the given frames.
+
+    Args:
+        frames (list): (H, W, 3) uint8 RGB frames.
+
+        colors (int): Most colors the palette may have, at most 256.
+
+        sample_size (int): About how many pixels to sample.
+
+    Returns:
+        (numpy.ndarray): (colors or less, 3) uint8 RGB palette.
+    """
+    pixels_per_frame = max(sample_size // len(frames), 1)
+    samples = []
+
+    for frame in frames:
+        flat = frame.reshape(-1, 3)
+        step = max(len(flat) // pixels_per_frame, 1)
+        samples.append(flat[::step])
+
+    return medianCut(numpy.concatenate(samples), min(colors, 256))
+
+
+def buildLookup(palette):
+    """
+    Builds a table with the nearest palette index for every color, at LOOKUP_BITS per channel.
+    Lets every pixel of a frame be mapped to the palette with a single numpy index.
+
+    Args:
+        palette (numpy.ndarray): (N, 3) uint8 RGB palette.
+
+    Returns:
+        (numpy.ndarray): (2 ** (LOOKUP_BITS * 3),) uint8 palette indices.
+    """
+    levels = 1 << LOOKUP_BITS
+    shift = 8 - LOOKUP_BITS
+    grid = numpy.indices((levels, levels, levels)).reshape(3, -1).T
+    centers = (grid << shift) + (1 << (shift - 1))
+    palette = palette.astype(numpy.int32)
+    lookup = numpy.empty(len(centers), dtype=numpy.uint8)
+
+    # chunked so the distance matrix stays small
+    for start in range(0, len(centers), 4096):
+        chunk = centers[start:start + 4096]
+        distances = ((chunk[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+        lookup[start:start + 4096] = distances.argmin(axis=1)
+
+    return lookup
+
+
+def lookupIndices(pixels, lookup):
+    """
+    Maps the given pixels to their nearest palette index with the lookup table.
+
+    Args:
+        pixels (numpy.ndarray): (..., 3) RGB pixels, any numeric type. Clipped to 0-255.
+
+        lookup (numpy.ndarray): Table returned by buildLookup.
+
+    Returns:
+        (numpy.ndarray): (...) uint8 palette indices.
+    """
+    shift = 8 - LOOKUP_BITS
+    channels = numpy.clip(pixels, 0, 255).astype(numpy.int32) >> shift
+    keys = (channels[..., 0] << (LOOKUP_BITS * 2)) | (channels[..., 1] << LOOKUP_BITS) | channels[..., 2]
+    return lookup[keys]
+
+
+def orderedDither(frames, palette, lookup):
+    """
+    Maps the given frames to the palette, offsetting each pixel by the bayer matrix so flat gradients become patterns.
+
+    Args:
+        frames (numpy.ndarray): (..., H, W, 3) uint8 RGB frames.
+
+        palette (numpy.ndarray): (N, 3) uint8 RGB palette.
+
+        lookup (numpy.ndarray): Table returned by buildLookup.
+
+    Returns:
+        (numpy.ndarray): (..., H, W) uint8 palette indices.
+    """
+    height, width = frames.shape[-3:-1]
+    threshold = numpy.tile(BAYER_MATRIX, (height // 4 + 1, width // 4 + 1))[:height, :width]
+
+    # spread about one palette step, estimated from how many colors fill the rgb cube
+    spread = 256.0 / max(len(palette) ** (1 / 3.0), 1.0)
+    return lookupIndices(frames + threshold[..., None] * spread, lookup)
+
+
+def errorDiffusionDither(frames, palette, lookup):
+    """
+    Maps the given frames to the palette with floyd steinberg error diffusion. Each pixel depends on the pixel to
+    its left and the three above it, so every pixel on the line x + 2y = t only depends on earlier lines.
+    Walking t and handling each line of every frame as one numpy operation keeps the work vectorized.
+
+    Args:
+        frames (numpy.ndarray): (F, H, W, 3) uint8 RGB frames, dithered together to share the per line work.
+
+        palette (numpy.ndarray): (N, 3) uint8 RGB palette.
+
+        lookup (numpy.ndarray): Table returned by buildLookup.
+
+    Returns:
+        (numpy.ndarray): (F, H, W) uint8 palette indices.
+    """
+    count, height, width = frames.shape[:3]
+    padded_width = width + 2
+    image = frames.reshape(count, height * width, 3).astype(numpy.float32)
+    palette = palette.astype(numpy.float32)
+    indices = numpy.empty((count, height * width), dtype=numpy.uint8)
+
+    # padded by one row below and one column each side so error can spill off the edges
+    error = numpy.zeros((count, (height + 1) * padded_width, 3), dtype=numpy.float32)
+    offsets = [row_offset * padded_width + column_offset for row_offset, column_offset, _ in FLOYD_STEINBERG_WEIGHTS]
+    weights = [weight for _, _, weight in FLOYD_STEINBERG_WEIGHTS]
+    rows = numpy.arange(height)
+
+    for t in range(width + 2 * (height - 1)):
+        columns = t - 2 * rows
+        valid = (columns >= 0) & (columns < width)
+        ys = rows[valid]
+        xs = columns[valid]
+        pixel_indices = ys * width + xs
+        error_indices = ys * padded_width + xs + 1
+
+        values = numpy.clip(image[:, pixel_indices] + error[:, error_indices], 0, 255)
+        chosen = lookupIndices(values, lookup)
+        indices[:, pixel_indices] = chosen
+        difference = values - palette[chosen]
+
+        for offset, weight in zip(offsets, weights):
+            error[:, error_indices + offset] += difference * weight
+
+    return indices.reshape(count, height, width)
+
+
+def quantize(frames, palette, lookup, dither='floyd_steinberg'):
+    """
+    Maps the given frames to the palette with the given dithering.
+
+    Args:
+        frames (numpy.ndarray): (F, H, W, 3) uint8 RGB frames.
+
+        palette (numpy.ndarray): (N, 3) uint8 RGB palette.
+
+        lookup (numpy.ndarray): Table returned by buildLookup.
+
+        dither (string): "none", ordered dithering if it starts with "bayer", error diffusion for anything else.
+
+    Returns:
+        (numpy.ndarray): (F, H, W) uint8 palette indices.
+    """
+    if dither == 'none':
+        return lookupIndices(frames, lookup)
+
+    if dither.startswith('bayer'):
+        return orderedDither(frames, palette, lookup)
+
+    return errorDiffusionDither(frames, palette, lookup)
+
+
+def lzwEncode(indices, min_code_size):
+    """
+    Compresses the given palette indices with the variable code size LZW that GIF uses.
+
+    Args:
+        indices (numpy.ndarray): uint8 palette indices, in the order they are drawn.
+
+        min_code_size (int): Bits needed for the palette, at least 2.
+
+    Returns:
+        (bytearray): LZW compressed data, not yet split into sub blocks.
+    """
+    clear_code = 1 << min_code_size
+    end_code = clear_code + 1
+    code_size = min_code_size + 1
+    next_code = end_code + 1
+    table = {}
+    output = bytearray()
+    bit_buffer = clear_code
+    bit_count = code_size
+    data = indices.tobytes()
+
+    if not data:
+        return output
+
+    prefix = data[0]
+    for byte in data[1:]:
+        key = (prefix << 8) | byte
+        code = table.get(key)
+
+        if code is not None:
+            prefix = code
+            continue
+
+        # write the prefix with the current code size
+        bit_buffer |= prefix << bit_count
+        bit_count += code_size
+        while bit_count >= 8:
+            output.append(bit_buffer & 0xFF)
+            bit_buffer >>= 8
+            bit_count -= 8
+
+        if next_code >= (1 << code_size) and code_size < 12:
+            code_size += 1
+
+        if next_code < 4096:
+            table[key] = next_code
+            next_code += 1
+        else:
+            # table is full, write a clear code and start over
+            bit_buffer |= clear_code << bit_count
+            bit_count += code_size
+            table = {}
+            code_size = min_code_size + 1
+            next_code = end_code + 1
+
+        prefix = byte
+
+    for code in (prefix, end_code):
+        bit_buffer |= code << bit_count
+        bit_count += code_size
+        if code == prefix and next_code >= (1 << code_size) and code_size < 12:
+            code_size += 1
+
+    while bit_count > 0:
+        output.append(bit_buffer & 0xFF)
+        bit_buffer >>= 8
+        bit_count -= 8
+
+    return output
+
+
+class GifWriter(object):
+    """
+    Writes a looping GIF89a one frame at a time, with one global palette.
+    """
+    def __init__(self, path, width, height, palette, loop=0):
+        """
+        Args:
+            path (string): Path to write .gif to.
+
+            width (int): Width of the .gif in pixels.
+
+            height (int): Height of the .gif in pixels.
+
+            palette (numpy.ndarray): (N, 3) uint8 RGB palette, N at most 256. Padded to a power of 2.
+
+            loop (int): Times to loop, 0 loops forever.
+        """
+        self.width = width
+        self.height = height
+        self.bits = max(int(numpy.ceil(numpy.log2(max(len(palette), 2)))), 1)
+        self.min_code_size = max(self.bits, 2)
+        padded = numpy.zeros((1 << self.bits, 3), dtype=numpy.uint8)
+        padded[:len(palette)] = palette
+
+        self.file = open(path, 'wb')
+        self.file.write(b'GIF89a')
+        self.file.write(self.pack(width, height) + bytes([0x80 | 0x70 | (self.bits - 1), 0, 0]))
+        self.file.write(padded.tobytes())
+
+        # netscape extension so the .gif loops
+        self.file.write(b'\x21\xFF\x0BNETSCAPE2.0\x03\x01' + self.pack(loop) + b'\x00')
+
+    @staticmethod
+    def pack(*values):
+        """
+        Packs the given values as little endian unsigned shorts, the way GIF stores sizes and positions.
+
+        Args:
+            values (list): Integers from 0 to 65535
+
+        Returns:
+            (bytes): Two bytes per value.
+        """
+        return b''.join(int(value).to_bytes(2, 'little') for value in values)
+
+    def writeFrame(self, indices, delay, left=0, top=0, transparent=None, disposal=1):
+        """
+        Writes one frame, or one rectangle of a frame, of palette indices.
+
+        Args:
+            indices (numpy.ndarray): (H, W) uint8 palette indices.
+
+            delay (int): Hundredths of a second to show the frame for.
+
+            left (int): Pixels from the left of the .gif to draw the rectangle at.
+
+            top (int): Pixels from the top of the .gif to draw the rectangle at.
+
+            transparent (int): Palette index that leaves the pixel below showing. None for no transparency.
+
+            disposal (int): What happens to the frame before the next one is drawn, 1 leaves it in place.
+        """
+        height, width = indices.shape
+        flags = (disposal << 2) | (1 if transparent is not None else 0)
+        self.file.write(b'\x21\xF9\x04' + bytes([flags]) + self.pack(delay) + bytes([transparent or 0, 0]))
+        self.file.write(b'\x2C' + self.pack(left, top, width, height) + b'\x00')
+        self.file.write(bytes([self.min_code_size]))
+
+        data = lzwEncode(numpy.ascontiguousarray(indices), self.min_code_size)
+        for start in range(0, len(data), 255):
+            block = data[start:start + 255]
+            self.file.write(bytes([len(block)]) + block)
+
+        self.file.write(b'\x00')
+
+    def close(self):
+        """
+        Writes the trailer and closes the file.
+        """
+        self.file.write(b'\x3B')
+        self.file.close()
+
+
+def getDelays(count, fps):
+    """
+    Gets how long to show each frame in hundredths of a second, carrying the rounding so the total time stays true.
+
+    Args:
+        count (int): Amount of frames.
+
+        fps (float): Frames per second.
+
+    Returns:
+        (list): Delay of each frame in hundredths of a second.
+    """
+    times = [int(round(index * 100.0 / fps)) for index in range(count + 1)]
+    return [max(end - start, 1) for start, end in zip(times, times[1:])]
+
+
+def getBlockDifference(previous, frame, block_size=DUPLICATE_BLOCK_SIZE):
+    """
+    Gets how much the most changed block of the frame differs from the same block of the frame before it.
+    Going by blocks keeps a small change, like a cursor moving, from being averaged away over the whole frame.
+
+    Args:
+        previous (numpy.ndarray): (H, W, 3) uint8 RGB frame to compare to.
+
+        frame (numpy.ndarray): (H, W, 3) uint8 RGB frame, the same size.
+
+        block_size (int): Pixels wide and high of each block.
+
+    Returns:
+        (float): Mean absolute difference of the most changed block, 0 to 1 of full brightness.
+    """
+    difference = numpy.abs(frame.astype(numpy.int16) - previous).mean(axis=2, dtype=numpy.float32)
+
+    # blocks on the bottom and right edges are filled out with pixels that did not change
+    height, width = difference.shape
+    difference = numpy.pad(difference, ((0, -height % block_size), (0, -width % block_size)), 'constant')
+    blocks = difference.reshape(difference.shape[0] // block_size, block_size, -1, block_size)
+    return float(blocks.mean(axis=(1, 3)).max()) / 255.0
+
+
+def dropDuplicates(frames, delays, threshold):
+    """
+    Drops frames that look the same as the last frame kept, adding their delay to it, so the .gif plays for
+    just as long with fewer frames to encode.
+
+    Args:
+        frames (list): (H, W, 3) uint8 RGB frames, all the same size.
+
+        delays (list): Hundredths of a second to show each frame, see getDelays.
+
+        threshold (float): Most the most changed block of a frame may differ from the last frame kept, 0 to 1 of full
+        brightness, for it to be dropped. 0 only drops exact duplicates.
+
+    Returns:
+        (tuple): List of frames kept, and list of hundredths of a second to show each of them.
+    """
+    kept = frames[:1]
+    kept_delays = delays[:1]
+
+    for frame, delay in zip(frames[1:], delays[1:]):
+        if kept_delays[-1] + delay <= MAX_DELAY and getBlockDifference(kept[-1], frame) <= threshold:
+            kept_delays[-1] += delay
+        else:
+            kept.append(frame)
+            kept_delays.append(delay)
+
+    return kept, kept_delays
+
+
+def encodeGif(frames, path, fps, colors=256, dither='floyd_steinberg', optimize=False, progress=None,
+              is_cancelled=None, delays=None):
+    """
+    Encodes the given frames to a .gif with one palette built from all of them.
+
+    Args:
+        frames (list): (H, W, 3) uint8 RGB frames, all the same size.
+
+        path (string): Path to write .gif to.
+
+        fps (float): Frames per second to play the .gif at.
+
+        colors (int): Most colors the .gif may have, at most 256.
+
+        dither (string): "none", ordered dithering if it starts with "bayer", error diffusion for anything else.
+
+        optimize (boolean): If True, writes only what changed between frames, see FrameOptimizer.
+        Takes one of the colors for transparency.
+
+        progress (function): Called with the amount of frames written after each frame.
+
+        is_cancelled (function): Called before each batch of frames, stops encoding if it returns True.
+
+        delays (list): Hundredths of a second to show each frame, such as from dropDuplicates.
+        If None, every frame is shown for 1 / fps seconds.
+
+    Returns:
+        (boolean): True if every frame was written, False if cancelled.
+    """
+    if not frames:
+        raise ValueError('No frames to encode!')
+
+    height, width = frames[0].shape[:2]
+    colors = min(colors, 256)
+    palette = buildPalette(frames, max(colors - 1, 1) if optimize else colors)
+    lookup = buildLookup(palette)
+    delays = delays or getDelays(len(frames), fps)
+
+    # the optimizer's transparent index is one past the palette, so no pixel is ever mapped to it
+    if optimize:
+        writer = GifWriter(path, width, height, numpy.concatenate([palette, numpy.zeros((1, 3), numpy.uint8)]))
+        optimizer = FrameOptimizer(writer, len(palette))
+    else:
+        writer = GifWriter(path, width, height, palette)
+        optimizer = None
+
+    try:
+        for start in range(0, len(frames), DITHER_BATCH_SIZE):
+            if is_cancelled and is_cancelled():
+                return False
+
+            batch = quantize(numpy.stack(frames[start:start + DITHER_BATCH_SIZE]), palette, lookup, dither)
+
+            for index, indices in enumerate(batch, start):
+                if optimizer:
+                    optimizer.addFrame(indices, delays[index])
+                else:
+                    writer.writeFrame(indices, delays[index])
+
+                if progress:
+                    progress(index + 1)
+
+        if optimizer:
+            optimizer.flush()
+    finally:
+        writer.close()
+
+    return True
+
+
+def readPpmFrames(stream):
+    """
+    Reads frames from a stream of binary .ppm images, such as ffmpeg.exe writes with "-f image2pipe -vcodec ppm"
+
+    Args:
+        stream (file): Binary stream to read from.
+
+    Returns:
+        (generator): (H, W, 3) uint8 RGB frames.
+    """
+    while True:
+        # ffmpeg.exe writes the header as "P6\n<width> <height>\n255\n"
+        magic = stream.readline()
+        if not magic:
+            return
+
+        if magic.strip() != b'P6':
+            raise ValueError('Expected a binary .ppm frame!')
+
+        width, height = (int(value) for value in stream.readline().split())
+        stream.readline()
+        data = stream.read(width * height * 3)
+
+        if len(data) < width * height * 3:
+            return
+
+        yield numpy.frombuffer(data, dtype=numpy.uint8).reshape(height, width, 3)
+
+
+def readOpenCVFrames(source, start, end, fps, width=None, height=None, crop=None):
+    """
+    Reads the frames between start and end of the given video with OpenCV, picking frames to match the given fps.
+    Used when ffmpeg.exe is not available.
+
+    Args:
+        source (string): Path to video.
+
+        start (float): Seconds to start reading from.
+
+        end (float): Seconds to stop reading at. None reads to the end of the video.
+
+        fps (float): Frames per second to pick.
+
+        width (int): Pixels wide to scale frames to, keeping the aspect ratio unless height is also given.
+        None keeps the width of the video, or of the crop.
+
+        height (int): Pixels high to scale frames to, keeping the aspect ratio unless width is also given.
+        None keeps the height of the video, or of the crop.
+
+        crop (list): x, y, width, and height in pixels of the video to keep, cropped before scaling.
+
+    Returns:
+        (generator): (H, W, 3) uint8 RGB frames.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError('OpenCV could not open video! ' + source)
+
+    capture.set(cv2.CAP_PROP_POS_MSEC, start * 1000.0)
+    next_time = start
+
+    try:
+        while True:
+            time = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            read, frame = capture.read()
+
+            if not read or (end is not None and time >= end):
+                return
+
+            # skip frames until the source catches up with the next frame we want
+            if time + 1e-6 < next_time:
+                continue
+
+            next_time += 1.0 / fps
+            if crop:
+                x, y, crop_width, crop_height = crop
+                frame = frame[y:y + crop_height, x:x + crop_width]
+
+            if width or height:
+                size = gifutil.getScaledSize(frame.shape[1], frame.shape[0], width, height)
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    finally:
+        capture.release()
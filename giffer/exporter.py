@@ -0,0 +1,1948 @@
+import os
+import time
+import shutil
+import signal
+import tempfile
+import fractions
+import contextlib
+import threading
+import subprocess
+import giffer.gifutil as gifutil
+from giffer.cache import DiskCache, getFileKey, makeKey
+from giffer.gifstream import joinGifs, padGif
+from giffer.metrics import ExportMetrics, getPathSize, logMetrics
+from giffer.probe import getMetadataCache, probeVideo
+
+
+BACKENDS = ('ffmpeg', 'convert', 'numpy')
+
+# every format but .gif is encoded by ffmpeg.exe in a single pass, whatever the backend
+FORMATS = ('gif', 'webp', 'apng', 'mp4', 'webm')
+
+# format as key, extension of the file it is written to as value
+FORMAT_EXTENSIONS = {'gif': '.gif', 'webp': '.webp', 'apng': '.png', 'mp4': '.mp4', 'webm': '.webm'}
+
+# format as key, ffmpeg.exe output arguments that encode it as value. all of them loop forever when shown
+# as an image or a muted autoplaying <video loop>, and quality is picked to look close to a 256 color .gif
+FORMAT_ARGUMENTS = {'webp': ['-c:v', 'libwebp', '-lossless', '0', '-quality', '75', '-compression_level', '4',
+                             '-loop', '0', '-f', 'webp'],
+                    'apng': ['-c:v', 'apng', '-pix_fmt', 'rgb24', '-plays', '0', '-f', 'apng'],
+                    'mp4': ['-c:v', 'libx264', '-preset', 'medium', '-crf', '23', '-pix_fmt', 'yuv420p',
+                            '-movflags', '+faststart', '-f', 'mp4'],
+                    'webm': ['-c:v', 'libvpx-vp9', '-crf', '32', '-b:v', '0', '-row-mt', '1', '-pix_fmt', 'yuv420p',
+                             '-f', 'webm']}
+
+# how much a frame may differ from the last frame kept, 0 to 1 of full brightness, and still be dropped as a
+# duplicate. about what ffmpeg's mpdecimate drops by default, compression noise is dropped but a moving cursor is not
+DEDUPE_THRESHOLD = 0.05
+
+# (path, size, modified time) of a tool as key, its version as value
+_tool_versions = {}
+
+# palettes are tiny .pngs, this holds thousands of them
+PALETTE_CACHE_SIZE = 32 * 1024 * 1024
+
+# shortest range worth encoding on its own ffmpeg.exe, each one pays to start up and seek
+MIN_SEGMENT_LENGTH = 2.0
+
+# lossless intermediates are big, this holds a few minutes of 1080p
+INTERMEDIATE_CACHE_SIZE = 4 * 1024 * 1024 * 1024
+
+# ffv1 roughly halves the size of raw 4:2:0 frames, used to skip ranges too big to ever stay cached
+INTERMEDIATE_RATIO = 0.5
+
+# finished .gifs are a few megabytes each, this holds a few hundred of them
+RESULT_CACHE_SIZE = 1024 * 1024 * 1024
+
+# bump when giffer's own encoding changes, so .gifs exported by an older giffer.exe are not served from the cache
+RESULT_CACHE_VERSION = 1
+
+# clips of one video further apart than this are decoded on their own, seeking past the gap is cheaper than decoding it
+MAX_CLIP_GAP = 10.0
+
+
+class ExportCancelled(Exception):
+    """
+    Raised by the GifExporter when its export was cancelled before it finished.
+    """
+    pass
+
+
+class ProcessError(subprocess.CalledProcessError):
+    """
+    Raised by the GifExporter when a program it runs fails. Same as CalledProcessError, with what the program
+    wrote to stderr added to the message.
+    """
+    def __str__(self):
+        message = super(ProcessError, self).__str__()
+        return message + ' ' + self.stderr if self.stderr else message
+
+
+def getProcessArguments():
+    """
+    Gets the extra subprocess.Popen arguments that give child processes their own process group,
+    so the whole tree can be killed on cancel. Also keeps console windows from popping up on windows.
+
+    Returns:
+        (dictionary): Keyword arguments for subprocess.Popen
+    """
+    if os.name == 'nt':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.CREATE_NO_WINDOW}
+
+    return {'start_new_session': True}
+
+
+def getPaletteCache():
+    """
+    Gets the cache that holds the palettes ffmpeg.exe generates, shared by every giffer.exe
+
+    Returns:
+        (DiskCache): Cache of palette .pngs.
+    """
+    return DiskCache(gifutil.getCacheDirectory('palettes'), PALETTE_CACHE_SIZE)
+
+
+def getIntermediateCache():
+    """
+    Gets the cache that holds the lossless intermediates ranges are cut into, shared by every giffer.exe
+
+    Returns:
+        (DiskCache): Cache of intermediate .mkvs
+    """
+    return DiskCache(gifutil.getCacheDirectory('intermediates'), INTERMEDIATE_CACHE_SIZE)
+
+
+def getResultCache():
+    """
+    Gets the cache that holds finished .gifs by everything that went into them, shared by every giffer.exe
+    Files are copied in and out, so a .gif the user changes afterwards never changes the cache.
+
+    Returns:
+        (DiskCache): Cache of exported .gifs
+    """
+    return DiskCache(gifutil.getCacheDirectory('results'), RESULT_CACHE_SIZE, link=False)
+
+
+def getToolVersion(path, argument='-version'):
+    """
+    Gets the first line the given tool prints about its version. Remembered for the session by path, size,
+    and modified time, so a tool updated in place is run again.
+
+    Args:
+        path (string): Path to ffmpeg.exe, convert.exe, or gifsicle.exe
+
+        argument (string): Argument that makes the tool print its version, gifsicle.exe uses "--version"
+
+    Returns:
+        (string): Version line, empty if the tool can't be found or run.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return ''
+
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+    if key not in _tool_versions:
+        try:
+            output = subprocess.run([path, argument], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=10,
+                                    **getProcessArguments()).stdout
+        except (OSError, subprocess.SubprocessError):
+            output = b''
+
+        lines = output.decode(errors='replace').splitlines()
+        _tool_versions[key] = lines[0].strip() if lines else ''
+
+    return _tool_versions[key]
+
+
+def describeOutput(result):
+    """
+    Gets how big the exported file came out and how long it took, comparable across formats and with the benchmark.
+
+    Args:
+        result (ExportResult): Result of a finished export, with its metrics.
+
+    Returns:
+        (string): Note such as "Exported 1.84MB .webp in 3.20s"
+    """
+    size = gifutil.formatSize(os.path.getsize(result.path))
+    extension = FORMAT_EXTENSIONS[result.job.format]
+    return f'Exported {size} {extension} in {result.metrics.seconds:0.2f}s'
+
+
+def killProcessTree(process):
+    """
+    Kills the given process and every process it started.
+
+    Args:
+        process (subprocess.Popen): Process started with getProcessArguments()
+    """
+    if process.poll() is not None:
+        return
+
+    if os.name == 'nt':
+        subprocess.call(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                        creationflags=subprocess.CREATE_NO_WINDOW)
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    process.wait()
+
+
+class ExportJob(object):
+    """
+    Describes a single clip to export, independent of any UI. Times are in seconds.
+    """
+    def __init__(self,
+                 source,
+                 output,
+                 start=0.0,
+                 end=None,
+                 fps=None,
+                 colors=256,
+                 backend='ffmpeg',
+                 optimize=False,
+                 stats_mode='full',
+                 dither='sierra2_4a',
+                 stream=False,
+                 width=None,
+                 max_size=None,
+                 height=None,
+                 crop=None,
+                 format='gif',
+                 dedupe=None):
+        """
+        Args:
+            source (string): Path to video that we are grabbing footage from.
+
+            output (string): Path to export .gif to. Will overwrite.
+
+            start (float): Time in seconds where the .gif should start.
+
+            end (float): Time in seconds where the .gif should end. If None, exports until the end of the video.
+
+            fps (float): Frames per second of the .gif. If None, uses the frame rate of the source video.
+
+            colors (int): Must be exponent of 2. Most colors ffmpeg's palette and the built-in encoder may use,
+            and the colors gifsicle.exe reduces to when optimizing.
+
+            backend (string): "ffmpeg" to only use ffmpeg.exe, "convert" to use ffmpeg.exe and convert.exe,
+            or "numpy" to decode with ffmpeg.exe, or OpenCV if ffmpeg.exe is not set, and encode with giffer's encoder.
+
+            optimize (boolean): If True, will optimize the .gif with gifsicle.exe, or with giffer's own optimizer
+            when the backend is "numpy"
+
+            stats_mode (string): ffmpeg's palettegen stats_mode, "full", "diff", or "single"
+
+            dither (string): ffmpeg's paletteuse dither, e.g. "sierra2_4a", "bayer", "floyd_steinberg", or "none"
+
+            stream (boolean): If True, the convert backend pipes frames from ffmpeg.exe into convert.exe,
+            and gifsicle.exe if optimizing, instead of writing a .png for every frame.
+
+            width (int): Pixels wide to scale the .gif to, keeping the aspect ratio unless height is also given.
+            None keeps the width of the video, or of the crop.
+
+            max_size (int): Bytes the .gif has to fit in. If set, colors, fps, and width are lowered as little as
+            needed to fit, see giffer.budget. None exports with the given colors, fps, and width.
+
+            height (int): Pixels high to scale the .gif to, keeping the aspect ratio unless width is also given.
+            None keeps the height of the video, or of the crop.
+
+            crop (list): x, y, width, and height in pixels of the video to keep, cropped before scaling.
+            None keeps the whole frame.
+
+            format (string): One of FORMATS to export. Anything but "gif" is encoded with ffmpeg.exe only,
+            ignoring the backend, colors, optimize, stats mode, dither, and stream.
+
+            dedupe (float): If set, frames that differ from the last frame kept by no more than this, 0 to 1 of full
+            brightness, are dropped and the frame before them is shown for longer instead. 0 only drops exact
+            duplicates, see DEDUPE_THRESHOLD. None keeps every frame.
+        """
+        if backend not in BACKENDS:
+            raise ValueError('Invalid backend "' + str(backend) + '"! Must be one of: ' + ', '.join(BACKENDS))
+
+        if format not in FORMATS:
+            raise ValueError('Invalid format "' + str(format) + '"! Must be one of: ' + ', '.join(FORMATS))
+
+        if crop is not None:
+            crop = [int(value) for value in crop]
+            if len(crop) != 4 or min(crop[:2]) < 0 or min(crop[2:]) <= 0:
+                raise ValueError('Invalid crop ' + str(crop) + '! Must be x, y, width, and height in pixels')
+
+        if dedupe is not None and not 0.0 <= float(dedupe) <= 1.0:
+            raise ValueError('Invalid dedupe threshold ' + str(dedupe) + '! Must be from 0 to 1')
+
+        self.source = source
+        self.output = output
+        self.start = float(start)
+        self.end = None if end is None else float(end)
+        self.fps = fps
+        self.colors = int(colors)
+        self.backend = backend
+        self.optimize = optimize
+        self.stats_mode = stats_mode
+        self.dither = dither
+        self.stream = stream
+        self.width = int(width) if width else None
+        self.max_size = int(max_size) if max_size else None
+        self.height = int(height) if height else None
+        self.crop = crop
+        self.format = format
+        self.dedupe = None if dedupe is None else float(dedupe)
+
+    @property
+    def length(self):
+        """
+        Gets the length of the clip in seconds.
+
+        Returns:
+            (float): Seconds between start and end, None if there is no end.
+        """
+        return None if self.end is None else self.end - self.start
+
+    def toDict(self):
+        """
+        Gets the job as a dictionary so it can be written to .json
+
+        Returns:
+            (dictionary): Argument name as key.
+        """
+        return {'source': self.source,
+                'output': self.output,
+                'start': self.start,
+                'end': self.end,
+                'fps': self.fps,
+                'colors': self.colors,
+                'backend': self.backend,
+                'optimize': self.optimize,
+                'stats_mode': self.stats_mode,
+                'dither': self.dither,
+                'stream': self.stream,
+                'width': self.width,
+                'max_size': self.max_size,
+                'height': self.height,
+                'crop': self.crop,
+                'format': self.format,
+                'dedupe': self.dedupe}
+
+    @classmethod
+    def fromDict(cls, data):
+        """
+        Creates a job from a dictionary such as the one returned by toDict.
+
+        Args:
+            data (dictionary): Argument name as key. Must have "source" and "output".
+
+        Returns:
+            (ExportJob): Job made from given data.
+        """
+        return cls(**data)
+
+
+class ExportResult(object):
+    """
+    What came out of exporting an ExportJob.
+    """
+    def __init__(self, job):
+        self.job = job
+        self.path = job.output
+        self.warnings = []
+        self.notes = []
+        self.metrics = None
+
+        # exception the job failed with when exported along with other clips, None if it exported
+        self.error = None
+
+
+class ExportProgress(object):
+    """
+    Snapshot of how far along an export is, passed to the GifExporter's progress callback.
+    """
+    def __init__(self, stage, frame=0, fps=0.0, percent=None, eta=None):
+        """
+        Args:
+            stage (string): What the exporter is currently running, e.g. "ffmpeg.exe"
+
+            frame (int): Frames written so far by the current stage.
+
+            fps (float): Frames per second the current stage is writing at.
+
+            percent (float): 0 to 100 of how much of the current stage is done. None if unknown.
+
+            eta (float): Seconds until the current stage is done. None if unknown.
+        """
+        self.stage = stage
+        self.frame = frame
+        self.fps = fps
+        self.percent = percent
+        self.eta = eta
+
+
+class GifExporter(object):
+    """
+    Runs ffmpeg.exe, convert.exe, and gifsicle.exe to turn an ExportJob into a .gif without needing any UI.
+    Export may be called from a worker thread and cancelled from another thread.
+    """
+    def __init__(self, ffmpeg_path, convert_path='', gifsicle_path='', progress_callback=None, palette_cache=None,
+                 max_segments=None, intermediate_cache=None, result_cache=None, cut_intermediates=True):
+        """
+        Args:
+            ffmpeg_path (string): Path to ffmpeg.exe
+
+            convert_path (string): Path to imagemagick's convert.exe
+
+            gifsicle_path (string): Path to gifsicle.exe
+
+            progress_callback (function): Called with an ExportProgress as the export runs.
+
+            palette_cache (DiskCache): Cache to reuse palettes from. If None, palettes are generated every export.
+
+            max_segments (int): Most ffmpeg.exe processes to split one export across. If None, one per core.
+
+            intermediate_cache (DiskCache): Cache of lossless intermediates to read ranges from.
+            If None, every export seeks into the source video.
+
+            result_cache (DiskCache): Cache of finished .gifs to copy identical exports from.
+            If None, every export runs the tools.
+
+            cut_intermediates (boolean): If False, ranges are only read from intermediates already in the
+            intermediate cache, never cut, for exports and previews whose range is unlikely to be exported again.
+        """
+        self.ffmpeg_path = ffmpeg_path
+        self.convert_path = convert_path
+        self.gifsicle_path = gifsicle_path
+        self.progress_callback = progress_callback
+        self.palette_cache = palette_cache
+        self.max_segments = max_segments or os.cpu_count() or 1
+        self.intermediate_cache = intermediate_cache
+        self.result_cache = result_cache
+        self.cut_intermediates = cut_intermediates
+        self.processes = []
+        self.trial_exporters = []
+        self.cancelled = False
+
+        # every export's stage timings are written to the metrics log, unless it is only a preview or trial
+        self.metrics = None
+        self.log_metrics = True
+
+    @classmethod
+    def fromSettings(cls, data, progress_callback=None):
+        """
+        Creates an exporter from the cached settings data.
+
+        Args:
+            data (dictionary): Setting name as key, same as Settings.getData()
+
+            progress_callback (function): Called with an ExportProgress as the export runs.
+
+        Returns:
+            (GifExporter): Exporter using the tools set in the settings and the shared caches.
+        """
+        return cls(data['ffmpeg'], data['convert'], data['gifsicle'], progress_callback, getPaletteCache(),
+                   intermediate_cache=getIntermediateCache(), result_cache=getResultCache())
+
+    def cancel(self):
+        """
+        Cancels the running export by killing the running processes and every process they started.
+        The export raises ExportCancelled once its temp directory has been removed.
+        """
+        self.cancelled = True
+
+        for process in list(self.processes):
+            killProcessTree(process)
+
+        for exporter in list(self.trial_exporters):
+            exporter.cancel()
+
+    def reportProgress(self, progress):
+        """
+        Passes the given progress to the progress callback, if there is one.
+
+        Args:
+            progress (ExportProgress): How far along the export is.
+        """
+        if self.metrics:
+            self.metrics.setFrames(progress.frame)
+
+        if self.progress_callback:
+            self.progress_callback(progress)
+
+    def stage(self, name, bytes_in=None, output=None):
+        """
+        Times the code run inside the with block as the given stage of the running export.
+
+        Args:
+            name (string): Name of the stage.
+
+            bytes_in (int): Bytes the stage reads, if known up front.
+
+            output (string or list): File or directory the stage writes, or a list of them.
+
+        Returns:
+            (contextmanager): Records the stage in the export's metrics, does nothing outside of an export.
+        """
+        if not self.metrics:
+            return contextlib.nullcontext()
+
+        return self.metrics.stage(name, bytes_in, output)
+
+    def runProcess(self, command, stage, total_frames=None, length=None):
+        """
+        Runs the given command, reporting progress as it goes. Raises ExportCancelled if cancel is called.
+
+        Args:
+            command (list): Program and arguments to run.
+
+            stage (string): Name of the program running, passed along with the progress.
+
+            total_frames (int): Frames the command will write, used to get percent done. None if unknown.
+
+            length (float): Seconds of footage the command will write, used if total_frames is unknown.
+        """
+        self.runPipeline([command], stage, total_frames, length)
+
+    def runPipeline(self, commands, stage, total_frames=None, length=None):
+        """
+        Runs the given commands at the same time with each command's stdout piped into the next command's stdin,
+        so data streams through them without temp files. Pipes hold a small buffer, so a fast command waits
+        on a slow one rather than filling memory. Reports progress from the first command that writes it.
+        Raises ExportCancelled if cancel is called.
+
+        Args:
+            commands (list): List of commands, each a list of program and arguments.
+
+            stage (string): Name of the programs running, passed along with the progress.
+
+            total_frames (int): Frames the commands will write, used to get percent done. None if unknown.
+
+            length (float): Seconds of footage the commands will write, used if total_frames is unknown.
+        """
+        if self.cancelled:
+            raise ExportCancelled('Export was cancelled!')
+
+        progress_stream = None
+        progress_errors = []
+        error_files = []
+        stdin = subprocess.DEVNULL
+
+        try:
+            for index, command in enumerate(commands):
+                # only ffmpeg.exe reports progress, and only when given "-progress pipe:1" or "-progress pipe:2"
+                progress_url = command[command.index('-progress') + 1] if '-progress' in command else None
+                is_last = index == len(commands) - 1
+                stdout = None if is_last and progress_url != 'pipe:1' else subprocess.PIPE
+
+                # errors written along with the progress are picked out of it, the rest go to a file so a chatty
+                # program can never fill a pipe nobody is reading
+                if progress_url == 'pipe:2' and not progress_stream:
+                    error_files.append(None)
+                    stderr = subprocess.PIPE
+                else:
+                    error_files.append(tempfile.TemporaryFile())
+                    stderr = error_files[-1]
+
+                process = subprocess.Popen(command, stdin=stdin, stdout=stdout, stderr=stderr, **getProcessArguments())
+                self.processes.append(process)
+
+                # the next process owns the pipe now, closing ours lets it know when this process dies
+                if index:
+                    self.processes[index - 1].stdout.close()
+
+                stdin = process.stdout
+                if progress_url and not progress_stream:
+                    progress_stream = process.stdout if progress_url == 'pipe:1' else process.stderr
+
+            self.reportProgress(ExportProgress(stage))
+
+            # cancel may have been called while the processes were starting
+            if self.cancelled:
+                self.cancel()
+
+            if progress_stream:
+                self.readProgress(progress_stream, stage, total_frames, length, progress_errors)
+
+            return_codes = [process.wait() for process in self.processes]
+            errors = [self.readErrors(error_file) if error_file else '\n'.join(progress_errors)
+                      for error_file in error_files]
+        finally:
+            self.closeProcesses()
+            self.closeErrorFiles(error_files)
+
+        self.raiseForReturnCodes(commands, return_codes, errors)
+
+    def runParallel(self, commands, stage, total_frames=None, length=None):
+        """
+        Runs the given ffmpeg.exe commands side by side, each on its own process, reporting their combined progress.
+        Every command must write its progress with "-progress pipe:1". Raises ExportCancelled if cancel is called.
+
+        Args:
+            commands (list): List of commands, each a list of program and arguments.
+
+            stage (string): Name of the programs running, passed along with the progress.
+
+            total_frames (int): Frames all the commands will write together, used to get percent done.
+
+            length (float): Seconds of footage all the commands will write together, used if total_frames is unknown.
+        """
+        if self.cancelled:
+            raise ExportCancelled('Export was cancelled!')
+
+        started = time.time()
+        lock = threading.Lock()
+        frames = [0] * len(commands)
+        fps = [0.0] * len(commands)
+        out_times = [0.0] * len(commands)
+
+        def readStats(index, stream):
+            for stats in self.readProgressBlocks(stream):
+                with lock:
+                    frames[index] = int(stats.get('frame', 0) or 0)
+                    fps[index] = float(stats.get('fps', 0) or 0)
+                    out_times[index] = self.getOutTime(stats) or out_times[index]
+                    progress = self.getProgress(stage, sum(frames), sum(fps), sum(out_times), total_frames, length,
+                                                started)
+                self.reportProgress(progress)
+
+        error_files = []
+
+        try:
+            for command in commands:
+                error_files.append(tempfile.TemporaryFile())
+                process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                           stderr=error_files[-1], **getProcessArguments())
+                self.processes.append(process)
+
+            self.reportProgress(ExportProgress(stage))
+
+            # cancel may have been called while the processes were starting
+            if self.cancelled:
+                self.cancel()
+
+            threads = [threading.Thread(target=readStats, args=(index, process.stdout), daemon=True)
+                       for index, process in enumerate(self.processes)]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+            return_codes = [process.wait() for process in self.processes]
+            errors = [self.readErrors(error_file) for error_file in error_files]
+        finally:
+            self.closeProcesses()
+            self.closeErrorFiles(error_files)
+
+        self.raiseForReturnCodes(commands, return_codes, errors)
+
+    def closeProcesses(self):
+        """
+        Kills the running processes, if they are still running, and closes their pipes.
+        """
+        for process in self.processes:
+            killProcessTree(process)
+
+            for stream in (process.stdout, process.stderr):
+                if stream:
+                    stream.close()
+
+        self.processes = []
+
+    @staticmethod
+    def readErrors(error_file):
+        """
+        Reads what a finished process wrote to the given stderr file.
+
+        Args:
+            error_file (file): tempfile.TemporaryFile the process wrote its stderr to.
+
+        Returns:
+            (string): Errors written, stripped of whitespace.
+        """
+        error_file.seek(0)
+        return error_file.read().decode(errors='replace').strip()
+
+    @staticmethod
+    def closeErrorFiles(error_files):
+        """
+        Closes the stderr files of processes that are done, deleting them.
+
+        Args:
+            error_files (list): tempfile.TemporaryFile for each process, or None for processes without one.
+        """
+        for error_file in error_files:
+            if error_file:
+                error_file.close()
+
+    def raiseForReturnCodes(self, commands, return_codes, errors=None):
+        """
+        Raises ExportCancelled if the export was cancelled, or ProcessError for the first command that failed.
+
+        Args:
+            commands (list): List of commands that ran, each a list of program and arguments.
+
+            return_codes (list): Return code of each command.
+
+            errors (list): What each command wrote to stderr, added to the error's message.
+        """
+        if self.cancelled:
+            raise ExportCancelled('Export was cancelled!')
+
+        for command, return_code, error in zip(commands, return_codes, errors or [''] * len(commands)):
+            if return_code:
+                raise ProcessError(return_code, command, stderr=error)
+
+    @staticmethod
+    def readProgressBlocks(stream, errors=None):
+        """
+        Reads the key=value blocks ffmpeg.exe writes with "-progress" until ffmpeg is done.
+
+        Args:
+            stream (file): stdout or stderr of ffmpeg.exe, whichever progress is written to.
+
+            errors (list): Lines that are not progress, such as errors written to the same stderr, are added to it.
+
+        Returns:
+            (generator): Dictionary of key and value for every block.
+        """
+        stats = {}
+
+        for line in stream:
+            key, separator, value = line.decode(errors='replace').strip().partition('=')
+
+            # progress keys are single words, anything else is ffmpeg.exe logging to the same stream
+            if not separator or not key or ' ' in key:
+                if errors is not None and (key or value):
+                    errors.append(key + separator + value)
+                continue
+
+            # every block ends with progress=continue or progress=end
+            if key != 'progress':
+                stats[key] = value
+                continue
+
+            yield stats
+            stats = {}
+
+    @staticmethod
+    def getOutTime(stats):
+        """
+        Gets how many seconds of footage ffmpeg.exe has written from the given progress block.
+
+        Args:
+            stats (dictionary): Block read by readProgressBlocks.
+
+        Returns:
+            (float): Seconds written, None if ffmpeg.exe has not written any yet.
+        """
+        out_time = stats.get('out_time_us', 'N/A')
+        return None if out_time == 'N/A' else int(out_time) / 1000000.0
+
+    @staticmethod
+    def getProgress(stage, frame, fps, out_time, total_frames, length, started):
+        """
+        Gets the progress of an ffmpeg.exe stage from the frames and seconds of footage written so far.
+
+        Args:
+            stage (string): Name of the program running.
+
+            frame (int): Frames written so far.
+
+            fps (float): Frames per second being written.
+
+            out_time (float): Seconds of footage written so far. None if unknown.
+
+            total_frames (int): Frames the stage will write, used to get percent done. None if unknown.
+
+            length (float): Seconds of footage the stage will write, used if total_frames is unknown.
+
+            started (float): time.time() when the stage started.
+
+        Returns:
+            (ExportProgress): How far along the stage is.
+        """
+        percent = None
+
+        if total_frames:
+            percent = 100.0 * frame / total_frames
+        elif length and out_time is not None:
+            percent = 100.0 * out_time / length
+
+        eta = None
+        if percent:
+            percent = min(percent, 100.0)
+            elapsed = time.time() - started
+            eta = elapsed * (100.0 - percent) / percent
+
+        return ExportProgress(stage, frame, fps, percent, eta)
+
+    def readProgress(self, stream, stage, total_frames=None, length=None, errors=None):
+        """
+        Reads the key=value blocks ffmpeg.exe writes with "-progress" and reports them until ffmpeg is done.
+
+        Args:
+            stream (file): stdout or stderr of ffmpeg.exe, whichever progress is written to.
+
+            stage (string): Name of the program running, passed along with the progress.
+
+            total_frames (int): Frames ffmpeg.exe will write, used to get percent done. None if unknown.
+
+            length (float): Seconds of footage ffmpeg.exe will write, used if total_frames is unknown.
+
+            errors (list): Lines of the stream that are not progress are added to it.
+        """
+        started = time.time()
+
+        for stats in self.readProgressBlocks(stream, errors):
+            frame = int(stats.get('frame', 0) or 0)
+            fps = float(stats.get('fps', 0) or 0)
+            progress = self.getProgress(stage, frame, fps, self.getOutTime(stats), total_frames, length, started)
+            self.reportProgress(progress)
+
+    @staticmethod
+    def validatePath(path, name, gifsicle=False):
+        """
+        Validates the path of ffmpeg, convert, and/or gifsicle.
+
+        Args:
+            path (string): Path to check and see if exists.
+
+            name (string): Name of program we are validating, used in the error message.
+
+            gifsicle (boolean): Adds extra string to tell user we export and unoptimized gif.
+
+        Returns:
+            (string): Error message if path does NOT exist, None if it does.
+        """
+        if path and os.path.exists(path):
+            return None
+
+        error_message = 'Invalid ' + name + ' path! Please set the location of ' + name + ' in the settings!'
+        return error_message + ' Exported UNOPTIMIZED .gif' if gifsicle else error_message
+
+    def export(self, job):
+        """
+        This is where the magic happens. Writes a .gif from the given job using ffmpeg.
+
+        Args:
+            job (ExportJob): Describes the video, range, and settings to export.
+
+        Returns:
+            (ExportResult): Where the .gif was written to and any warnings that came up.
+        """
+        self.validateJob(job)
+        self.cancelled = False
+
+        # the same video, range, and settings exported before are copied from the result cache
+        result_key = self.getResultKey(job) if self.result_cache else None
+        if result_key:
+            result = self.fetchResult(job, result_key)
+            if result:
+                return result
+
+        # exports the job again with the best colors, fps, and width that fit
+        if job.max_size:
+            from giffer.budget import exportToSize
+            result = exportToSize(self, job)
+            self.storeResult(result_key, result)
+            return result
+
+        result = ExportResult(job)
+        result.metrics = self.metrics = ExportMetrics(job)
+        status = 'failed'
+
+        # make temp directory to store everything we could make, removed even if cancelled or failed
+        temp_directory = tempfile.mkdtemp()
+        temp_gif_path = os.path.join(temp_directory, 'Temp' + FORMAT_EXTENSIONS[job.format])
+        temp_gifsicle_path = os.path.join(temp_directory, 'TempOptimized.gif')
+
+        try:
+            # the range is read from its lossless intermediate if there is one, the result still describes the job
+            input_job = self.getInputJob(job, temp_directory)
+
+            # formats other than .gif need no palette, ffmpeg.exe encodes them straight from the filtered frames
+            if job.format != 'gif':
+                self.ffmpegCreateAnimation(input_job, temp_gif_path)
+
+            # if streaming convert, frames go through convert.exe, and gifsicle.exe if optimizing, without temp files
+            elif job.backend == 'convert' and job.stream:
+                self.streamConvertGif(input_job, temp_gif_path, self.canOptimize(job, result), result)
+
+            # if convert, we convert video to .png and then make a .gif from the .pngs
+            elif job.backend == 'convert':
+                png_directory = os.path.join(temp_directory, 'pngs')
+                png_path = os.path.join(png_directory, 'temp_image%04d.png')
+                os.makedirs(png_directory)
+                self.ffmpegVideoToPng(input_job, png_path)
+                self.convertPngToGif(input_job, png_directory, temp_gif_path)
+
+            # if numpy, we decode frames into memory and encode them with giffer's own encoder
+            elif job.backend == 'numpy':
+                self.numpyCreateGif(input_job, temp_gif_path)
+
+            # else we convert video to .gif without extracting each frame
+            else:
+                self.ffmpegCreateGif(input_job, temp_gif_path)
+                self.padDuration(input_job, temp_gif_path, input_job.length)
+
+            # streaming pipes through gifsicle.exe itself, the built-in encoder optimizes while it encodes,
+            # and gifsicle.exe only reads .gifs
+            optimized = job.format != 'gif' or job.backend == 'numpy' or (job.backend == 'convert' and job.stream)
+            self.saveGif(job, result, temp_gif_path, temp_gifsicle_path, optimize=not optimized)
+        except ExportCancelled:
+            status = 'cancelled'
+            raise
+        else:
+            status = 'finished'
+        finally:
+            with self.stage('cleanup'):
+                shutil.rmtree(temp_directory, ignore_errors=True)
+
+            self.metrics.finish()
+            self.metrics = None
+            if self.log_metrics:
+                logMetrics(result.metrics, status)
+
+        result.notes.append(describeOutput(result))
+        self.storeResult(result_key, result)
+        return result
+
+    def getResultKey(self, job):
+        """
+        Gets the key the job's .gif is cached with, from the video's path, size, modified time, and sampled content,
+        every setting that changes the .gif, and the version of every tool the job runs.
+
+        Args:
+            job (ExportJob): Job to get the key of.
+
+        Returns:
+            (string): Key for the result cache.
+        """
+        versions = [RESULT_CACHE_VERSION, getToolVersion(self.ffmpeg_path)]
+        if job.backend == 'convert':
+            versions.append(getToolVersion(self.convert_path))
+
+        if job.optimize and job.backend != 'numpy':
+            versions.append(getToolVersion(self.gifsicle_path, '--version'))
+
+        # only the extension of the output changes what is written
+        settings = dict(job.toDict(), source=None, output=os.path.splitext(job.output)[1].lower())
+
+        return makeKey('result', getFileKey(job.source), settings, versions)
+
+    def fetchResult(self, job, result_key):
+        """
+        Copies the .gif of an identical export from the result cache to the job's output.
+
+        Args:
+            job (ExportJob): Job to export.
+
+            result_key (string): Key returned by getResultKey.
+
+        Returns:
+            (ExportResult): Result with the notes of the export that was cached, None if it is not cached.
+        """
+        if not self.result_cache.contains(result_key):
+            return None
+
+        result = ExportResult(job)
+        result.metrics = self.metrics = ExportMetrics(job)
+
+        try:
+            with self.stage('result cache', output=job.output):
+                if os.path.exists(job.output):
+                    os.remove(job.output)
+
+                fetched = self.result_cache.fetch(result_key, job.output)
+        finally:
+            self.metrics.finish()
+            self.metrics = None
+
+        if not fetched:
+            return None
+
+        data = self.result_cache.fetchJson(makeKey(result_key, 'notes'))
+        result.notes = (data['notes'] if data else []) + ['Exported before, copied from the cache']
+        if self.log_metrics:
+            logMetrics(result.metrics, 'cached')
+
+        return result
+
+    def storeResult(self, result_key, result):
+        """
+        Copies the exported .gif into the result cache, along with its notes. Exports with warnings are not cached,
+        so a tool failing once is not served forever.
+
+        Args:
+            result_key (string): Key returned by getResultKey. If None, nothing is cached.
+
+            result (ExportResult): Result of the export.
+        """
+        if not result_key or result.warnings:
+            return
+
+        self.result_cache.store(result_key, result.path)
+        self.result_cache.storeJson(makeKey(result_key, 'notes'), {'notes': result.notes})
+
+    def validateJob(self, job):
+        """
+        Raises a ValueError to show the user if the job's video or the tools it needs are missing.
+
+        Args:
+            job (ExportJob): Job about to be exported.
+        """
+        if not job.source:
+            raise ValueError('No video has been loaded! Please load video.')
+
+        if not os.path.exists(job.source):
+            raise ValueError('Video does not exist! ' + job.source)
+
+        # an .mp4 or .webm exported over the video it comes from would destroy it
+        if gifutil.isSamePath(job.output, job.source):
+            raise ValueError('Can not export over the video being exported! ' + job.output)
+
+        # ffmpeg.exe is required for gif conversion to work, unless the built-in encoder can decode with OpenCV
+        error_message = self.validatePath(self.ffmpeg_path, 'ffmpeg.exe')
+        if error_message and (job.backend != 'numpy' or job.format != 'gif'):
+            raise ValueError(error_message)
+
+        # fitting to a size trades off colors, which only .gifs have
+        if job.max_size and job.format != 'gif':
+            raise ValueError('Max size only works when exporting .gif, not ' + FORMAT_EXTENSIONS[job.format])
+
+        # dropped frames live on as longer delays, which only .gifs from ffmpeg.exe or the built-in encoder keep
+        if job.dedupe is not None and job.format != 'gif':
+            raise ValueError('Dropping duplicate frames only works when exporting .gif, not ' +
+                             FORMAT_EXTENSIONS[job.format])
+
+        if job.dedupe is not None and job.backend == 'convert':
+            raise ValueError('Dropping duplicate frames only works with the ffmpeg or numpy backend!')
+
+        # validate that convert.exe has been set correctly before doing any work
+        if job.backend == 'convert':
+            error_message = self.validatePath(self.convert_path, 'convert.exe')
+            if error_message:
+                raise ValueError(error_message)
+
+    def saveGif(self, job, result, gif_path, optimized_path, optimize=True):
+        """
+        Optimizes the exported .gif with gifsicle.exe if the job asks for it, then moves it to the job's output.
+
+        Args:
+            job (ExportJob): Job that was exported.
+
+            result (ExportResult): Result to add any warnings to.
+
+            gif_path (string): Path the .gif was exported to.
+
+            optimized_path (string): Path to write the optimized .gif to.
+
+            optimize (boolean): If False, the .gif was already optimized while it was exported.
+        """
+        # gifsicle attempts to optimize .gif size, continue to export unoptimized gif if it fails
+        if optimize and self.canOptimize(job, result):
+            try:
+                self.gifsicleOptimize(self.gifsicle_path, gif_path, optimized_path, job.colors)
+                gif_path = optimized_path
+            except (OSError, subprocess.CalledProcessError):
+                result.warnings.append('gifsicle.exe failed! Exported UNOPTIMIZED .gif')
+
+        with self.stage('move', output=job.output):
+            # this is essentially overwriting the path
+            if os.path.exists(job.output):
+                os.remove(job.output)
+
+            # move exported .gif to desired path
+            shutil.move(gif_path, job.output)
+
+    @staticmethod
+    def canShareDecode(job):
+        """
+        Gets whether the job can be exported in the same ffmpeg.exe pass as other clips of its video.
+
+        Args:
+            job (ExportJob): Job to check.
+
+        Returns:
+            (boolean): True if the job is a .gif exported with ffmpeg.exe only, has an end, and is not fit to a size.
+        """
+        return job.format == 'gif' and job.backend == 'ffmpeg' and job.end is not None and not job.max_size
+
+    @staticmethod
+    def groupClips(jobs):
+        """
+        Groups clips of one video that are close enough together to decode in one pass, in order of start.
+
+        Args:
+            jobs (list): ExportJob for every clip.
+
+        Returns:
+            (list): Lists of ExportJob, clips in a group are no more than MAX_CLIP_GAP seconds apart.
+        """
+        groups = []
+        end = None
+
+        for job in sorted(jobs, key=lambda job: job.start):
+            if groups and job.start - end <= MAX_CLIP_GAP:
+                groups[-1].append(job)
+                end = max(end, job.end)
+            else:
+                groups.append([job])
+                end = job.end
+
+        return groups
+
+    def exportClips(self, jobs):
+        """
+        Exports many clips of one video, decoding the video once for every group of clips close together
+        instead of once per clip. Clips that can't share a pass, see canShareDecode, are exported on their own.
+        Each clip fails on its own, the rest still export.
+
+        Args:
+            jobs (list): ExportJob for every clip, all with the same source.
+
+        Returns:
+            (list): ExportResult for every job, in the same order as the jobs. Jobs that failed have the error set.
+        """
+        if len(set(job.source for job in jobs)) > 1:
+            raise ValueError('Clips exported together must all be from the same video!')
+
+        results = {}
+        for job in jobs:
+            result_key = self.getResultKey(job) if self.result_cache and self.canShareDecode(job) else None
+            result = self.fetchResult(job, result_key) if result_key else None
+            if result:
+                results[id(job)] = result
+
+        shared = [job for job in jobs if self.canShareDecode(job) and id(job) not in results]
+
+        for job in jobs:
+            if job not in shared and id(job) not in results:
+                results[id(job)] = self.tryExport(job)
+
+        for group in self.groupClips(shared):
+            if len(group) == 1:
+                results[id(group[0])] = self.tryExport(group[0])
+                continue
+
+            try:
+                group_results = self.exportGroup(group)
+            except ExportCancelled:
+                raise
+            except Exception:
+                group_results = [None] * len(group)
+
+            # a failed pass leaves no clip exported, a failed clip leaves only that one. exporting them on their own
+            # fails only the bad clip, and never exports a clip that already made it again
+            for job, result in zip(group, group_results):
+                results[id(job)] = result if result and not result.error else self.tryExport(job)
+
+        return [results[id(job)] for job in jobs]
+
+    def tryExport(self, job):
+        """
+        Exports the job, catching any error so the clips exported along with it carry on. Cancelling still raises.
+
+        Args:
+            job (ExportJob): Job to export.
+
+        Returns:
+            (ExportResult): Result of the export, with the error set if it failed.
+        """
+        try:
+            return self.export(job)
+        except ExportCancelled:
+            raise
+        except Exception as error:
+            result = ExportResult(job)
+            result.error = error
+            return result
+
+    def exportGroup(self, jobs):
+        """
+        Exports clips of one video in a single ffmpeg.exe pass, every clip trimmed out of one decode of the video
+        and given its own palette. Raises if the pass fails, a clip that fails to save after it only fails that clip.
+
+        Args:
+            jobs (list): ExportJob for every clip, all able to share a decode.
+
+        Returns:
+            (list): ExportResult for every job, in the same order as the jobs. Clips that failed have the error set.
+        """
+        for job in jobs:
+            self.validateJob(job)
+
+        self.cancelled = False
+        results = [ExportResult(job) for job in jobs]
+        for result in results:
+            result.metrics = ExportMetrics(result.job)
+
+        # the decode is timed once and shared by every clip's metrics
+        self.metrics = ExportMetrics(jobs[0])
+        status = 'failed'
+        temp_directory = tempfile.mkdtemp()
+        gif_paths = [os.path.join(temp_directory, 'Temp' + str(index) + '.gif') for index in range(len(jobs))]
+
+        try:
+            self.ffmpegClipsGif(jobs, gif_paths)
+            decoded = self.metrics.records[-1]
+
+            for index, (job, result) in enumerate(zip(jobs, results)):
+                self.metrics = result.metrics
+                self.metrics.records.append(decoded)
+                optimized_path = os.path.join(temp_directory, 'TempOptimized' + str(index) + '.gif')
+
+                try:
+                    self.saveGif(job, result, gif_paths[index], optimized_path)
+                except ExportCancelled:
+                    raise
+                except Exception as error:
+                    result.error = error
+        except ExportCancelled:
+            status = 'cancelled'
+            raise
+        else:
+            status = 'finished'
+        finally:
+            shutil.rmtree(temp_directory, ignore_errors=True)
+            self.metrics = None
+
+            for result in results:
+                result.metrics.finish()
+                if self.log_metrics:
+                    logMetrics(result.metrics, 'failed' if result.error else status)
+
+        for result in results:
+            if result.error:
+                continue
+
+            result.notes.append(describeOutput(result))
+            if self.result_cache:
+                self.storeResult(self.getResultKey(result.job), result)
+
+        return results
+
+    def getInputJob(self, job, temp_directory):
+        """
+        Gets the job to read frames for. The first time a range is exported it is cut out of the source into a
+        lossless, all intra .mkv held in the intermediate cache, so later exports, previews, and option changes of
+        the same range decode it from the start instead of seeking into a long GOP source again.
+
+        Args:
+            job (ExportJob): Job to export.
+
+            temp_directory (string): Directory the intermediate is placed in for the export.
+
+        Returns:
+            (ExportJob): Job reading the intermediate from 0, or the given job if there is no intermediate cache,
+            no ffmpeg.exe, no end, the range is too big to cache, or it is not cached and cut_intermediates is off.
+        """
+        if not self.intermediate_cache or job.length is None or self.validatePath(self.ffmpeg_path, 'ffmpeg.exe'):
+            return job
+
+        try:
+            info = probeVideo(job.source, self.ffmpeg_path, getMetadataCache())
+        except (OSError, ValueError, ImportError, subprocess.CalledProcessError):
+            return job
+
+        frame_bytes = info.width * info.height * 1.5
+        if frame_bytes * float(info.fps) * job.length * INTERMEDIATE_RATIO > self.intermediate_cache.max_bytes:
+            return job
+
+        key = makeKey('intermediate', getFileKey(job.source), job.start, job.end)
+        intermediate_path = os.path.join(temp_directory, 'intermediate.mkv')
+
+        if not self.intermediate_cache.fetch(key, intermediate_path):
+            if not self.cut_intermediates:
+                return job
+
+            self.ffmpegIntermediate(job, intermediate_path)
+            self.intermediate_cache.store(key, intermediate_path)
+
+        return ExportJob.fromDict(dict(job.toDict(), source=intermediate_path, start=0.0, end=job.length))
+
+    def ffmpegIntermediate(self, job, output):
+        """
+        Cuts the job's range out of the source into a lossless .mkv where every frame is a keyframe,
+        at the source's own size and frame rate so any crop, scale, or fps can be exported from it.
+
+        Args:
+            job (ExportJob): Job with the video and range to cut.
+
+            output (string): Path to write the .mkv to.
+        """
+        # bitexact keeps the .mkv the same every time it is cut, so palettes cached by its hash stay valid
+        command = [self.ffmpeg_path] + self.rangeArguments(job) + ['-i', job.source, '-map', '0:v:0', '-an', '-sn',
+                                                                  '-c:v', 'ffv1', '-level', '3', '-g', '1',
+                                                                  '-fflags', '+bitexact', '-flags:v', '+bitexact']
+        command += self.progressArguments() + [output]
+        with self.stage('intermediate', getPathSize(job.source), output):
+            self.runProcess(command, 'ffmpeg.exe cutting range', length=job.length)
+
+    def canOptimize(self, job, result):
+        """
+        Gets whether the job should be optimized with gifsicle.exe, adding a warning to the result if it can't be.
+
+        Args:
+            job (ExportJob): Job to check if it should be optimized.
+
+            result (ExportResult): Result to add the invalid gifsicle.exe path warning to.
+
+        Returns:
+            (boolean): True if job wants optimizing and gifsicle.exe path is valid.
+        """
+        if not job.optimize:
+            return False
+
+        error_message = self.validatePath(self.gifsicle_path, 'gifsicle.exe', gifsicle=True)
+        if error_message:
+            result.warnings.append(error_message)
+            return False
+
+        return True
+
+    @staticmethod
+    def rangeArguments(job):
+        """
+        Gets the ffmpeg.exe input arguments that seek to the start of the job and limit it to the job's length.
+
+        Args:
+            job (ExportJob): Job to get start and length from.
+
+        Returns:
+            (list): Arguments to place before ffmpeg's "-i"
+        """
+        arguments = ['-ss', str(job.start)]
+        if job.length is not None:
+            arguments += ['-t', str(job.length)]
+
+        return arguments
+
+    @staticmethod
+    def fpsFilter(job):
+        """
+        Gets the ffmpeg.exe filter that sets the frame rate of the job.
+
+        Args:
+            job (ExportJob): Job to get fps from.
+
+        Returns:
+            (string): fps filter, or "null" filter if job should use the source frame rate.
+        """
+        if not job.fps:
+            return 'null'
+
+        # rates like 29.97 are really 30000/1001, passing the fraction keeps frames from drifting on long clips
+        return 'fps=' + str(fractions.Fraction(job.fps).limit_denominator(1001))
+
+    @staticmethod
+    def cropFilter(job):
+        """
+        Gets the ffmpeg.exe filter that crops the job's frames.
+
+        Args:
+            job (ExportJob): Job to get crop from.
+
+        Returns:
+            (string): crop filter, or None if job keeps the whole frame.
+        """
+        if not job.crop:
+            return None
+
+        x, y, width, height = job.crop
+        return 'crop=' + str(width) + ':' + str(height) + ':' + str(x) + ':' + str(y)
+
+    @staticmethod
+    def scaleFilter(job):
+        """
+        Gets the ffmpeg.exe filter that scales the job's frames. A side that is not given keeps the aspect ratio,
+        rounded to an even number of pixels.
+
+        Args:
+            job (ExportJob): Job to get width and height from.
+
+        Returns:
+            (string): scale filter, or None if job keeps its size.
+        """
+        if not job.width and not job.height:
+            return None
+
+        return 'scale=' + str(job.width or -2) + ':' + str(job.height or -2) + ':flags=lanczos'
+
+    @staticmethod
+    def dedupeFilter(job):
+        """
+        Gets the ffmpeg.exe filter that drops frames looking the same as the last frame kept. The .gif muxer
+        shows the frame before for longer in their place, so only the ffmpeg backend drops them in the filter.
+        The built-in encoder merges them itself, see encoder.dropDuplicates.
+
+        Args:
+            job (ExportJob): Job to get dedupe threshold and backend from.
+
+        Returns:
+            (string): mpdecimate filter, or None if job keeps every frame.
+        """
+        if job.dedupe is None or job.backend != 'ffmpeg':
+            return None
+
+        # mpdecimate sums the difference of 8x8 blocks, a block of 64 pixels all off by the threshold is the most
+        # it lets through, and a third of the blocks may be off by less
+        high = int(round(job.dedupe * 255 * 64))
+        return 'mpdecimate=hi=' + str(high) + ':lo=' + str(high * 5 // 12) + ':frac=0.33'
+
+    def videoFilter(self, job, frames=None):
+        """
+        Gets the ffmpeg.exe filter chain applied to every frame before any palette work.
+        Frames are dropped to the fps, then cropped, then scaled, then duplicates dropped, so palettegen and every
+        later stage only ever see the pixels that end up in the .gif
+
+        Args:
+            job (ExportJob): Job to get filters from.
+
+            frames (int): Amount of frames to keep at the job's fps, before duplicates are dropped. None keeps all.
+
+        Returns:
+            (string): Comma separated filters.
+        """
+        trim = 'trim=end_frame=' + str(frames) if frames else None
+        filters = [self.fpsFilter(job), trim, self.cropFilter(job), self.scaleFilter(job), self.dedupeFilter(job)]
+        return ','.join(video_filter for video_filter in filters if video_filter)
+
+    @staticmethod
+    def paletteFilter(job):
+        """
+        Gets the ffmpeg.exe palettegen filter for the job.
+
+        Args:
+            job (ExportJob): Job to get stats mode and colors from.
+
+        Returns:
+            (string): palettegen filter.
+        """
+        palette_filter = 'palettegen=stats_mode=' + job.stats_mode
+        return palette_filter if job.colors >= 256 else palette_filter + ':max_colors=' + str(job.colors)
+
+    def getPaletteKey(self, job):
+        """
+        Gets the key the palette for the given job is cached with. Anything that changes the frames going into
+        palettegen, and palettegen's own options, are part of the key. Things only paletteuse cares about,
+        like dither, are not.
+
+        Args:
+            job (ExportJob): Job to get key for.
+
+        Returns:
+            (string): Key for the palette cache.
+        """
+        return makeKey('palette', getFileKey(job.source), job.start, job.end, self.videoFilter(job),
+                       self.paletteFilter(job))
+
+    @staticmethod
+    def getTotalFrames(job):
+        """
+        Gets how many frames the job will export, if it can be known without opening the video.
+
+        Args:
+            job (ExportJob): Job to get fps and length from.
+
+        Returns:
+            (int): Frames the job will export, None if the job has no fps or no end.
+        """
+        if not job.fps or job.length is None:
+            return None
+
+        return max(int(round(job.fps * job.length)), 1)
+
+    @staticmethod
+    def getWrittenFrames(job):
+        """
+        Gets how many frames ffmpeg.exe will write for the job, which is unknown when duplicates are dropped.
+
+        Args:
+            job (ExportJob): Job to get fps, length, and dedupe from.
+
+        Returns:
+            (int): Frames ffmpeg.exe will write, None if unknown, so progress goes by the seconds written instead.
+        """
+        return None if GifExporter.dedupeFilter(job) else GifExporter.getTotalFrames(job)
+
+    @staticmethod
+    def padDuration(job, path, length):
+        """
+        Lengthens the last frame of a .gif the ffmpeg backend dropped duplicates from. The .gif muxer shows the
+        last frame kept for one frame, however many duplicates came after it.
+
+        Args:
+            job (ExportJob): Job the .gif was exported for.
+
+            path (string): Path to .gif to pad.
+
+            length (float): Seconds the .gif should play for. None if unknown, leaving the .gif as it is.
+        """
+        if GifExporter.dedupeFilter(job) and length:
+            padGif(path, int(round(length * 100)))
+
+    @staticmethod
+    def progressArguments(url='pipe:1'):
+        """
+        Gets the ffmpeg.exe arguments that make it write its progress for readProgress. Only errors are logged to
+        stderr, without the banner, so they can be shown when ffmpeg.exe fails.
+
+        Args:
+            url (string): "pipe:1" to write progress to stdout, or "pipe:2" to write it to stderr when
+            stdout is piping frames to another process.
+
+        Returns:
+            (list): Arguments to place before ffmpeg's output.
+        """
+        return ['-hide_banner', '-loglevel', 'error', '-nostats', '-progress', url]
+
+    def ffmpegCreateGif(self, job, output):
+        """
+        Creates .gif using ffmpeg.exe only
+
+        Args:
+            job (ExportJob): Job with the video and range to grab footage from.
+
+            output (string): Path to export .gif to. NOTE: Will NOT overwrite.
+        """
+        # long ranges are split across cores instead
+        segments = self.getSegments(job)
+        if segments:
+            self.ffmpegSegmentsGif(job, output, segments)
+            return
+
+        video_filter = self.videoFilter(job)
+        palette_gen = self.paletteFilter(job)
+        palette_use = 'paletteuse=dither=' + job.dither
+        command = [self.ffmpeg_path] + self.rangeArguments(job) + ['-i', job.source]
+
+        bytes_in = getPathSize(job.source)
+
+        if not self.palette_cache:
+            filter_graph = '[0:v] ' + video_filter + ',split [a][b];[a] ' + palette_gen + ' [p];[b][p] ' + palette_use
+            command += ['-filter_complex', filter_graph] + self.progressArguments() + [output]
+            with self.stage('palette + gif', bytes_in, output):
+                self.runProcess(command, 'ffmpeg.exe', self.getWrittenFrames(job), job.length)
+            return
+
+        palette_key = self.getPaletteKey(job)
+        palette_path = os.path.join(os.path.dirname(output), 'palette.png')
+
+        # palette is cached, so only run paletteuse with it
+        if self.palette_cache.fetch(palette_key, palette_path):
+            filter_graph = '[0:v] ' + video_filter + ' [x];[x][1:v] ' + palette_use
+            command += ['-i', palette_path, '-filter_complex', filter_graph] + self.progressArguments() + [output]
+            with self.stage('gif', bytes_in, output):
+                self.runProcess(command, 'ffmpeg.exe', self.getWrittenFrames(job), job.length)
+            return
+
+        # palette is not cached, so write it out as a second output of the same pass to cache it
+        filter_graph = '[0:v] ' + video_filter + ',split [a][b];[a] ' + palette_gen + ',split [p][q];' + \
+                       '[b][p] ' + palette_use + ' [out]'
+        command += ['-filter_complex', filter_graph] + self.progressArguments()
+        command += ['-map', '[out]', output, '-map', '[q]', '-frames:v', '1', '-update', '1', palette_path]
+        with self.stage('palette + gif', bytes_in, output):
+            self.runProcess(command, 'ffmpeg.exe', self.getWrittenFrames(job), job.length)
+
+        self.palette_cache.store(palette_key, palette_path)
+
+    def ffmpegCreateAnimation(self, job, output):
+        """
+        Creates an animated .webp, .png, or a looping .mp4 or .webm using ffmpeg.exe only, with the same fps, crop,
+        and scale a .gif of the job would have.
+
+        Args:
+            job (ExportJob): Job with the video, range, and format to export.
+
+            output (string): Path to export to. NOTE: Will NOT overwrite.
+        """
+        video_filter = self.videoFilter(job)
+
+        # 4:2:0 video needs even sizes, drop the odd pixel a crop or the video may have
+        if job.format in ('mp4', 'webm'):
+            video_filter += ',crop=trunc(iw/2)*2:trunc(ih/2)*2'
+
+        command = [self.ffmpeg_path] + self.rangeArguments(job) + ['-i', job.source, '-map', '0:v:0', '-an', '-sn']
+        command += ['-vf', video_filter] + FORMAT_ARGUMENTS[job.format] + self.progressArguments() + [output]
+        with self.stage(job.format, getPathSize(job.source), output):
+            self.runProcess(command, 'ffmpeg.exe', self.getTotalFrames(job), job.length)
+
+    def ffmpegClipsGif(self, jobs, outputs):
+        """
+        Creates a .gif for every clip with a single ffmpeg.exe, reading the video from the first start to the last end
+        once and splitting it into a trim, filters, and palette for each clip.
+
+        Args:
+            jobs (list): ExportJob for every clip of the same video.
+
+            outputs (list): Path to export each clip's .gif to.
+        """
+        start = min(job.start for job in jobs)
+        end = max(job.end for job in jobs)
+        source = jobs[0].source
+        labels = ''.join('[v' + str(index) + ']' for index in range(len(jobs)))
+        filter_graph = '[0:v] split=' + str(len(jobs)) + ' ' + labels
+
+        for index, job in enumerate(jobs):
+            clip = str(index)
+            trim = 'trim=start=' + str(job.start - start) + ':end=' + str(job.end - start) + ',setpts=PTS-STARTPTS'
+            filter_graph += ';[v' + clip + '] ' + trim + ',' + self.videoFilter(job) + ',split [a' + clip + '][b' + \
+                            clip + '];[a' + clip + '] ' + self.paletteFilter(job) + ' [p' + clip + '];[b' + clip + \
+                            '][p' + clip + '] paletteuse=dither=' + job.dither + ' [out' + clip + ']'
+
+        command = [self.ffmpeg_path, '-ss', str(start), '-t', str(end - start), '-i', source]
+        command += ['-filter_complex', filter_graph] + self.progressArguments()
+        for index, output in enumerate(outputs):
+            command += ['-map', '[out' + str(index) + ']', output]
+
+        with self.stage('clips', getPathSize(source), outputs):
+            self.runProcess(command, 'ffmpeg.exe ' + str(len(jobs)) + ' clips', length=end - start)
+
+        for job, output in zip(jobs, outputs):
+            self.padDuration(job, output, job.length)
+
+    def getSegments(self, job):
+        """
+        Splits the job's range into segments to encode side by side, up to one per max_segments, each at least
+        MIN_SEGMENT_LENGTH long. Segments start on a frame of the job's fps, so the frames match a single pass.
+
+        Args:
+            job (ExportJob): Job to split.
+
+        Returns:
+            (list): (start seconds, amount of frames) of each segment. Empty if the job is not worth splitting,
+            or has no fps or end to split by.
+        """
+        total_frames = self.getTotalFrames(job)
+        if not total_frames:
+            return []
+
+        count = min(self.max_segments, int(job.length // MIN_SEGMENT_LENGTH), total_frames)
+        if count < 2:
+            return []
+
+        bounds = [total_frames * index // count for index in range(count + 1)]
+        return [(job.start + first / job.fps, last - first) for first, last in zip(bounds, bounds[1:])]
+
+    def ffmpegPalette(self, job, palette_path):
+        """
+        Generates the palette for the job's range with ffmpeg.exe, or fetches it from the palette cache.
+
+        Args:
+            job (ExportJob): Job with the video, range, and stats mode to generate the palette from.
+
+            palette_path (string): Path to write palette .png to.
+        """
+        palette_key = self.getPaletteKey(job) if self.palette_cache else None
+        if palette_key and self.palette_cache.fetch(palette_key, palette_path):
+            return
+
+        palette_filter = self.videoFilter(job) + ',' + self.paletteFilter(job)
+        command = [self.ffmpeg_path] + self.rangeArguments(job) + ['-i', job.source, '-vf', palette_filter]
+        command += self.progressArguments() + ['-frames:v', '1', '-update', '1', palette_path]
+        with self.stage('palette', getPathSize(job.source), palette_path):
+            self.runProcess(command, 'ffmpeg.exe palette', length=job.length)
+
+        if palette_key:
+            self.palette_cache.store(palette_key, palette_path)
+
+    def ffmpegSegmentsGif(self, job, output, segments):
+        """
+        Creates .gif using ffmpeg.exe, one process per segment all using the same palette, then joins the segments.
+        The palette is generated once for the whole range, so colors do not jump between segments.
+
+        Args:
+            job (ExportJob): Job with the video and range to grab footage from.
+
+            output (string): Path to export .gif to. NOTE: Will NOT overwrite.
+
+            segments (list): (start seconds, amount of frames) of each segment, returned by getSegments.
+        """
+        temp_directory = os.path.dirname(output)
+        palette_path = os.path.join(temp_directory, 'palette.png')
+        self.ffmpegPalette(job, palette_path)
+
+        commands = []
+        segment_paths = []
+
+        for index, (start, frames) in enumerate(segments):
+            segment_path = os.path.join(temp_directory, 'segment' + str(index).zfill(3) + '.gif')
+            segment_paths.append(segment_path)
+
+            # decode one frame past the segment so the fps filter never runs short, then trim to its last frame
+            # before any duplicates are dropped, which leaves fewer frames than the segment has
+            filter_graph = '[0:v] ' + self.videoFilter(job, frames) + ' [x];[x][1:v] paletteuse=dither=' + job.dither
+            command = [self.ffmpeg_path, '-ss', str(start), '-t', str((frames + 1) / job.fps), '-i', job.source]
+            command += ['-i', palette_path, '-filter_complex', filter_graph]
+            command += self.progressArguments() + [segment_path]
+            commands.append(command)
+
+        stage = 'ffmpeg.exe x' + str(len(segments))
+        total_frames = None if self.dedupeFilter(job) else sum(frames for _, frames in segments)
+        with self.stage('segments', getPathSize(job.source), segment_paths):
+            self.runParallel(commands, stage, total_frames, job.length)
+
+        for segment_path, (_, frames) in zip(segment_paths, segments):
+            self.padDuration(job, segment_path, frames / job.fps)
+
+        with self.stage('join', getPathSize(segment_paths), output):
+            joinGifs(segment_paths, output)
+
+    def ffmpegVideoToPng(self, job, output):
+        """
+        Converts the job's video range to a .png image sequence.
+
+        Args:
+            job (ExportJob): Job with the video and range to grab footage from.
+
+            output (string): Path to export .png image sequence to. NOTE the file name convention, e.g: temp_image%04d.png
+        """
+        command = [self.ffmpeg_path] + self.rangeArguments(job) + ['-i', job.source, '-vf', self.videoFilter(job)]
+        command += self.progressArguments() + [output]
+        with self.stage('extract pngs', getPathSize(job.source), os.path.dirname(output)):
+            self.runProcess(command, 'ffmpeg.exe', self.getTotalFrames(job), job.length)
+
+    def streamConvertGif(self, job, output_gif, optimize, result):
+        """
+        Pipes raw frames from ffmpeg.exe straight into convert.exe, and on into gifsicle.exe if optimizing,
+        so no .png is ever written to disk. If gifsicle.exe fails, streams again without it to export unoptimized.
+
+        Args:
+            job (ExportJob): Job with the video and range to grab footage from.
+
+            output_gif (string): Path to export .gif to.
+
+            optimize (boolean): If True, pipes the .gif from convert.exe into gifsicle.exe
+
+            result (ExportResult): Result to add the gifsicle.exe failed warning to.
+        """
+        ffmpeg_command = [self.ffmpeg_path] + self.rangeArguments(job) + ['-i', job.source, '-vf', self.videoFilter(job)]
+        ffmpeg_command += self.progressArguments('pipe:2') + ['-f', 'image2pipe', '-vcodec', 'ppm', '-']
+
+        if not optimize:
+            commands = [ffmpeg_command, self.convertCommand(job, 'ppm:-', output_gif)]
+            with self.stage('ffmpeg > convert', getPathSize(job.source), output_gif):
+                self.runPipeline(commands, 'ffmpeg.exe > convert.exe', self.getTotalFrames(job), job.length)
+            return
+
+        commands = [ffmpeg_command,
+                    self.convertCommand(job, 'ppm:-', 'gif:-'),
+                    self.gifsicleCommand(self.gifsicle_path, '-', output_gif, job.colors)]
+
+        try:
+            with self.stage('ffmpeg > convert > gifsicle', getPathSize(job.source), output_gif):
+                self.runPipeline(commands, 'ffmpeg.exe > convert.exe > gifsicle.exe', self.getTotalFrames(job),
+                                 job.length)
+        except subprocess.CalledProcessError as error:
+            if error.cmd[0] != self.gifsicle_path:
+                raise
+
+            result.warnings.append('gifsicle.exe failed! Exported UNOPTIMIZED .gif')
+            self.streamConvertGif(job, output_gif, False, result)
+
+    def readFfmpegFrames(self, job):
+        """
+        Decodes the job's video range into memory with ffmpeg.exe, piping frames as .ppm images.
+
+        Args:
+            job (ExportJob): Job with the video, range, and fps to decode.
+
+        Returns:
+            (list): (H, W, 3) uint8 RGB frames.
+        """
+        from giffer import encoder
+
+        command = [self.ffmpeg_path] + self.rangeArguments(job) + ['-i', job.source, '-vf', self.videoFilter(job)]
+        command += ['-hide_banner', '-loglevel', 'error', '-f', 'image2pipe', '-vcodec', 'ppm', '-']
+        error_file = tempfile.TemporaryFile()
+        process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=error_file,
+                                   **getProcessArguments())
+        self.processes.append(process)
+
+        try:
+            frames = self.collectFrames(encoder.readPpmFrames(process.stdout), job)
+            return_code = process.wait()
+            error = self.readErrors(error_file)
+        finally:
+            killProcessTree(process)
+            process.stdout.close()
+            error_file.close()
+            self.processes.remove(process)
+
+        self.raiseForReturnCodes([command], [return_code], [error])
+        return frames
+
+    def collectFrames(self, frames, job):
+        """
+        Gathers the given frames into a list, reporting decode progress. Stops early if cancelled.
+
+        Args:
+            frames (generator): (H, W, 3) uint8 RGB frames.
+
+            job (ExportJob): Job the frames are for, used to get percent done.
+
+        Returns:
+            (list): (H, W, 3) uint8 RGB frames.
+        """
+        total_frames = self.getTotalFrames(job)
+        started = time.time()
+        collected = []
+
+        for frame in frames:
+            if self.cancelled:
+                break
+
+            collected.append(frame)
+            self.reportProgress(self.getFrameProgress('decoding', len(collected), total_frames, started))
+
+        return collected
+
+    @staticmethod
+    def getFrameProgress(stage, frame, total_frames, started):
+        """
+        Gets the progress of a stage that handles one frame at a time in python.
+
+        Args:
+            stage (string): Name of what is running.
+
+            frame (int): Frames handled so far.
+
+            total_frames (int): Frames the stage will handle. None if unknown.
+
+            started (float): time.time() when the stage started.
+
+        Returns:
+            (ExportProgress): How far along the stage is.
+        """
+        elapsed = max(time.time() - started, 1e-6)
+        fps = frame / elapsed
+        percent = min(100.0 * frame / total_frames, 100.0) if total_frames else None
+        eta = (total_frames - frame) / fps if total_frames and fps else None
+        return ExportProgress(stage, frame, fps, percent, eta)
+
+    def numpyCreateGif(self, job, output):
+        """
+        Creates .gif with giffer's own encoder, without convert.exe or gifsicle.exe. Frames are decoded with
+        ffmpeg.exe, or OpenCV if ffmpeg.exe is not set, and held in memory, so this suits short clips.
+        If the job is optimized, frames are optimized as they are encoded instead of with gifsicle.exe afterwards.
+
+        Args:
+            job (ExportJob): Job with the video, range, fps, colors, and dither to export.
+
+            output (string): Path to export .gif to.
+        """
+        # numpy is only needed by the built-in encoder, so only import it when using it
+        from giffer import encoder
+
+        if not job.fps:
+            raise ValueError('An fps is required to export with the built-in encoder!')
+
+        with self.stage('decode', getPathSize(job.source)):
+            if self.validatePath(self.ffmpeg_path, 'ffmpeg.exe'):
+                frames = encoder.readOpenCVFrames(job.source, job.start, job.end, job.fps, job.width, job.height,
+                                                  job.crop)
+                frames = self.collectFrames(frames, job)
+            else:
+                frames = self.readFfmpegFrames(job)
+
+        if self.cancelled:
+            raise ExportCancelled('Export was cancelled!')
+
+        # duplicates are merged into the frame before them, so the .gif plays for as long with fewer frames
+        delays = None
+        if job.dedupe is not None:
+            with self.stage('dedupe', sum(frame.nbytes for frame in frames)):
+                frames, delays = encoder.dropDuplicates(frames, encoder.getDelays(len(frames), job.fps), job.dedupe)
+
+        started = time.time()
+
+        def reportEncoded(frame):
+            self.reportProgress(self.getFrameProgress('encoding', frame, len(frames), started))
+
+        with self.stage('encode', sum(frame.nbytes for frame in frames), output):
+            encoded = encoder.encodeGif(frames, output, job.fps, job.colors, job.dither, job.optimize, reportEncoded,
+                                        lambda: self.cancelled, delays)
+
+        if not encoded:
+            raise ExportCancelled('Export was cancelled!')
+
+    def convertCommand(self, job, images, output_gif):
+        """
+        Gets the convert.exe command that turns the given images into a .gif playing at the job's fps.
+
+        Args:
+            job (ExportJob): Job with the fps to play the images at.
+
+            images (string): Images to convert, e.g. "*.png" path, or "ppm:-" to read from stdin.
+
+            output_gif (string): Path to export .gif to, or "gif:-" to write to stdout.
+
+        Returns:
+            (list): convert.exe and its arguments.
+        """
+        if not job.fps:
+            raise ValueError('An fps is required to export with convert.exe!')
+
+        return [self.convert_path,
+                '-background', 'gray',
+                '-alpha', 'remove',
+                '-alpha', 'off',
+                '-delay', '1x' + str(int(round(job.fps))),
+                images,
+                output_gif]
+
+    def convertPngToGif(self, job, png_directory, output_gif):
+        """
+        Converts a directory filled with an image sequence to .gif using convert.exe
+
+        Args:
+            job (ExportJob): Job with the fps to play the image sequence at.
+
+            png_directory (string): Path to directory with image sequence in it.
+
+            output_gif (string): Path to export .gif to.
+        """
+        command = self.convertCommand(job, os.path.join(png_directory, '*.png'), output_gif)
+        with self.stage('convert', getPathSize(png_directory), output_gif):
+            self.runProcess(command, 'convert.exe')
+
+    @staticmethod
+    def gifsicleCommand(gifsicle_path, input_path, output_path, colors=256):
+        """
+        Gets the gifsicle.exe command that optimizes the given input_path .gif
+
+        Args:
+            gifsicle_path (string): Path to gifsicle.exe
+
+            input_path (string): Path of .gif to optimize, or "-" to read from stdin.
+
+            output_path (string): Path to export .gif to. Must be different than input path.
+
+            colors (int): Must be exponent of 2. Colors that final .gif will have.
+
+        Returns:
+            (list): gifsicle.exe and its arguments.
+        """
+        return [gifsicle_path, '-i', input_path, '-O3', '--colors', str(colors), '-o', output_path]
+
+    def gifsicleOptimize(self, gifsicle_path, input_path, output_path, colors=256):
+        """
+        Runs gifsicle.exe on given input_path .gif to optimize it. Works sometimes. Especially if colors is <= 64
+
+        Args:
+            gifsicle_path (string): Path to gifsicle.exe
+
+            input_path (string): Path of .gif to optimize.
+
+            output_path (string): Path to export .gif to. NOTE: will NOT overwrite, must be different than input path.
+
+            colors (int): Must be exponent of 2. Colors that final .gif will have.
+        """
+        with self.stage('gifsicle', getPathSize(input_path), output_path):
+            self.runProcess(self.gifsicleCommand(gifsicle_path, input_path, output_path, colors), 'gifsicle.exe')
@@ -0,0 +1,585 @@
+import os
+import time
+import uuid
+import functools
+import giffer.gifutil as gifutil
+from giffer.exporter import ExportJob, GifExporter, getIntermediateCache, getPaletteCache, getResultCache
+from giffer.worker import ClipsWorker, ExportWorker
+from PySide2 import QtWidgets, QtGui, QtCore
+
+
+# seconds between showing the progress of a job, the built-in encoder reports progress every frame
+PROGRESS_INTERVAL = 0.1
+
+
+class QueuedJob(object):
+    """
+    An ExportJob waiting in, or done with, the export queue. Holds the tool paths from when it was queued,
+    so changing the settings does not change jobs that are already queued.
+    """
+    QUEUED = 'Queued'
+    EXPORTING = 'Exporting'
+    FINISHED = 'Finished'
+    FAILED = 'Failed'
+    CANCELLED = 'Cancelled'
+
+    def __init__(self, job, tools, status=QUEUED, message='', notes='', batch=''):
+        """
+        Args:
+            job (ExportJob): Job to export.
+
+            tools (dictionary): "ffmpeg", "convert", and "gifsicle" as keys, path to each as value.
+
+            status (string): One of the QueuedJob status names, e.g. QueuedJob.QUEUED
+
+            message (string): Progress, warning, or error to show the user.
+
+            notes (string): What the export chose to show the user once finished, e.g. the colors it fit to size with.
+
+            batch (string): Shared by clips of one video queued together, which export in one pass. Empty if none.
+        """
+        self.job = job
+        self.tools = tools
+        self.status = status
+        self.message = message
+        self.notes = notes
+        self.batch = batch
+        self.percent = None
+        self.worker = None
+        self.metrics = None
+        self.reported = 0.0
+
+    def isDone(self):
+        """
+        Gets whether the job has stopped for good, either finished, failed, or cancelled.
+
+        Returns:
+            (boolean): True if job will not export again.
+        """
+        return self.status in (QueuedJob.FINISHED, QueuedJob.FAILED, QueuedJob.CANCELLED)
+
+    def toDict(self):
+        """
+        Gets the queued job as a dictionary so it can be written to .json
+
+        Returns:
+            (dictionary): Job, tools, status, message, notes, and batch as keys.
+        """
+        return {'job': self.job.toDict(),
+                'tools': self.tools,
+                'status': self.status,
+                'message': self.message,
+                'notes': self.notes,
+                'batch': self.batch}
+
+    @classmethod
+    def fromDict(cls, data):
+        """
+        Creates a queued job from a dictionary such as the one returned by toDict.
+
+        Args:
+            data (dictionary): Job, tools, status, message, notes, and batch as keys.
+            Queues saved before notes and batches have none.
+
+        Returns:
+            (QueuedJob): Queued job made from given data.
+        """
+        return cls(ExportJob.fromDict(data['job']), data['tools'], data['status'], data['message'],
+                   data.get('notes', ''), data.get('batch', ''))
+
+
+class ExportQueue(QtCore.QObject):
+    """
+    Exports queued jobs in the background, running up to max_workers exports at the same time.
+    The queue is saved to .json whenever it changes, so jobs left when giffer.exe closes export on next launch.
+    """
+    changed = QtCore.Signal()
+    progressed = QtCore.Signal(object)
+    done = QtCore.Signal(object)
+
+    def __init__(self, path, max_workers=2, parent=None):
+        """
+        Args:
+            path (string): Path to .json the queue is saved to and loaded from.
+
+            max_workers (int): Amount of exports to run at the same time.
+
+            parent (QObject): Parent of the queue.
+        """
+        super(ExportQueue, self).__init__(parent=parent)
+        self.path = path
+        self.max_workers = max(int(max_workers), 1)
+        self.jobs = []
+        self.stopping = False
+
+    def load(self):
+        """
+        Loads the queue saved in the .json, re-queuing any jobs that were exporting when giffer.exe closed.
+        """
+        if not os.path.exists(self.path):
+            return
+
+        for data in gifutil.readJson(self.path):
+            queued_job = QueuedJob.fromDict(data)
+
+            if queued_job.status == QueuedJob.EXPORTING:
+                queued_job.status = QueuedJob.QUEUED
+                queued_job.message = ''
+
+            self.jobs.append(queued_job)
+
+        self.changed.emit()
+        self.startNext()
+
+    def save(self):
+        """
+        Writes the queue to the .json
+        """
+        gifutil.writeJson(self.path, [queued_job.toDict() for queued_job in self.jobs])
+
+    def add(self, job, tools):
+        """
+        Adds the given job to the end of the queue, starting it right away if there is a free worker.
+
+        Args:
+            job (ExportJob): Job to export.
+
+            tools (dictionary): "ffmpeg", "convert", and "gifsicle" as keys, path to each as value.
+
+        Returns:
+            (QueuedJob): Job as it sits in the queue.
+        """
+        queued_job = QueuedJob(job, tools)
+        self.jobs.append(queued_job)
+        self.save()
+        self.changed.emit()
+        self.startNext()
+        return queued_job
+
+    def addClips(self, jobs, tools):
+        """
+        Adds clips of one video to the end of the queue as one batch, exported in a single pass that decodes
+        the video once. Each clip still has its own row, status, and .gif
+
+        Args:
+            jobs (list): ExportJob for every clip, all with the same source.
+
+            tools (dictionary): "ffmpeg", "convert", and "gifsicle" as keys, path to each as value.
+
+        Returns:
+            (list): QueuedJob for every clip as they sit in the queue.
+        """
+        batch = uuid.uuid4().hex if len(jobs) > 1 else ''
+        queued_jobs = [QueuedJob(job, tools, batch=batch) for job in jobs]
+        self.jobs += queued_jobs
+        self.save()
+        self.changed.emit()
+        self.startNext()
+        return queued_jobs
+
+    def getRunning(self):
+        """
+        Gets the jobs that are currently exporting.
+
+        Returns:
+            (list): QueuedJob that are exporting.
+        """
+        return [queued_job for queued_job in self.jobs if queued_job.status == QueuedJob.EXPORTING]
+
+    def isBusy(self):
+        """
+        Gets whether the queue has jobs waiting or exporting.
+
+        Returns:
+            (boolean): True if any job is not done.
+        """
+        return any(not queued_job.isDone() for queued_job in self.jobs)
+
+    def getUniquePath(self, path):
+        """
+        Gets a path that no job that is not done is exporting to, adding a number to the file name if needed.
+        Lets the user queue many clips from the same video without them overwriting each other.
+
+        Args:
+            path (string): Path the user would like to export to.
+
+        Returns:
+            (string): Given path, or given path with a number added to the file name.
+        """
+        taken = [queued_job.job.output for queued_job in self.jobs if not queued_job.isDone()]
+        file_name, extension = os.path.splitext(path)
+        unique_path = path
+        number = 1
+
+        while unique_path in taken:
+            unique_path = file_name + '_' + str(number) + extension
+            number += 1
+
+        return unique_path
+
+    def setMaxWorkers(self, max_workers):
+        """
+        Sets the amount of exports to run at the same time, starting more exports if there are free workers.
+
+        Args:
+            max_workers (int): Amount of exports to run at the same time.
+        """
+        self.max_workers = max(int(max_workers), 1)
+        self.startNext()
+
+    def startNext(self):
+        """
+        Starts exporting queued jobs in order until all workers are busy.
+        """
+        if self.stopping:
+            return
+
+        for queued_job in self.jobs:
+            # a batch of clips runs on one worker
+            if len(set(running.worker for running in self.getRunning())) >= self.max_workers:
+                return
+
+            if queued_job.status == QueuedJob.QUEUED:
+                self.start(queued_job)
+
+    def start(self, queued_job):
+        """
+        Starts exporting the given job on its own ExportWorker, along with every queued clip of its batch.
+
+        Args:
+            queued_job (QueuedJob): Job to start exporting.
+        """
+        tools = queued_job.tools
+        batch = [queued_job]
+        if queued_job.batch:
+            batch = [other for other in self.jobs if other.batch == queued_job.batch and other.status == QueuedJob.QUEUED]
+
+        # share the cores between the exports running at the same time
+        max_segments = max((os.cpu_count() or 1) // self.max_workers, 1)
+        exporter = GifExporter(tools['ffmpeg'], tools['convert'], tools['gifsicle'], palette_cache=getPaletteCache(),
+                               max_segments=max_segments, intermediate_cache=getIntermediateCache(),
+                               result_cache=getResultCache())
+        if len(batch) > 1:
+            worker = ClipsWorker(exporter, [other.job for other in batch], parent=self)
+        else:
+            worker = ExportWorker(exporter, queued_job.job, parent=self)
+
+        worker.progressed.connect(functools.partial(self.onBatchProgressed, batch))
+        worker.succeeded.connect(functools.partial(self.onBatchSucceeded, batch))
+        worker.failed.connect(functools.partial(self.onBatchFailed, batch))
+        worker.cancelled.connect(functools.partial(self.onBatchCancelled, batch))
+
+        for other in batch:
+            other.worker = worker
+            other.status = QueuedJob.EXPORTING
+            other.message = ''
+            other.percent = None
+
+        self.save()
+        self.changed.emit()
+        worker.start()
+
+    def onBatchProgressed(self, batch, progress):
+        """
+        Updates the message of every job exporting on the worker that made progress.
+
+        Args:
+            batch (list): QueuedJob exporting on the worker.
+
+            progress (ExportProgress): How far along the worker is.
+        """
+        for queued_job in batch:
+            self.onProgressed(queued_job, progress)
+
+    def onBatchSucceeded(self, batch, result):
+        """
+        Called when the worker is done with one of its jobs. Clips of a batch fail on their own.
+
+        Args:
+            batch (list): QueuedJob exporting on the worker.
+
+            result (ExportResult): Result of the job, with the error set if it failed.
+        """
+        for queued_job in batch:
+            if queued_job.job is not result.job:
+                continue
+
+            if result.error:
+                self.onFailed(queued_job, result.error)
+            else:
+                self.onSucceeded(queued_job, result)
+
+    def onBatchFailed(self, batch, error):
+        """
+        Called when the worker failed, failing every job it had not exported yet.
+
+        Args:
+            batch (list): QueuedJob exporting on the worker.
+
+            error (Exception): Error the exporter raised.
+        """
+        for queued_job in batch:
+            if queued_job.status == QueuedJob.EXPORTING:
+                self.onFailed(queued_job, error)
+
+    def onBatchCancelled(self, batch):
+        """
+        Called when the worker was cancelled, cancelling every job it had not exported yet.
+
+        Args:
+            batch (list): QueuedJob exporting on the worker.
+        """
+        for queued_job in batch:
+            if queued_job.status == QueuedJob.EXPORTING:
+                self.onCancelled(queued_job)
+
+    def onProgressed(self, queued_job, progress):
+        """
+        Updates the message of the given job with the given progress, emitting progressed with the job at most
+        once every PROGRESS_INTERVAL seconds.
+
+        Args:
+            queued_job (QueuedJob): Job that made progress.
+
+            progress (ExportProgress): How far along the job is.
+        """
+        message = progress.stage + ' - frame ' + str(progress.frame) + f' ({progress.fps:0.1f} fps)'
+        if progress.eta is not None:
+            message += f' - {progress.eta:0.0f}s left'
+
+        queued_job.message = message
+        queued_job.percent = progress.percent
+
+        now = time.time()
+        if now - queued_job.reported >= PROGRESS_INTERVAL:
+            queued_job.reported = now
+            self.progressed.emit(queued_job)
+
+    def onFinished(self, queued_job, status, message):
+        """
+        Marks the given job as done with the given status, then starts the next queued job.
+
+        Args:
+            queued_job (QueuedJob): Job that stopped exporting.
+
+            status (string): One of the QueuedJob done status names.
+
+            message (string): Warning or error to show the user.
+        """
+        queued_job.worker = None
+
+        # jobs stopped by giffer.exe closing stay queued so they export on next launch
+        if self.stopping:
+            return
+
+        queued_job.status = status
+        queued_job.message = message
+        queued_job.percent = 100 if status == QueuedJob.FINISHED else None
+        self.save()
+        self.changed.emit()
+        self.done.emit(queued_job)
+        self.startNext()
+
+    def onSucceeded(self, queued_job, result):
+        """
+        Called when the given job's worker successfully exported.
+
+        Args:
+            queued_job (QueuedJob): Job that exported.
+
+            result (ExportResult): Where the .gif was written to and any warnings that came up.
+        """
+        queued_job.notes = ' '.join(result.notes)
+        queued_job.metrics = result.metrics
+        self.onFinished(queued_job, QueuedJob.FINISHED, ' '.join(result.warnings))
+
+    def onFailed(self, queued_job, error):
+        """
+        Called when the given job's worker failed to export.
+
+        Args:
+            queued_job (QueuedJob): Job that failed.
+
+            error (Exception): Error the exporter raised.
+        """
+        self.onFinished(queued_job, QueuedJob.FAILED, str(error))
+
+    def onCancelled(self, queued_job):
+        """
+        Called when the given job's worker was cancelled.
+
+        Args:
+            queued_job (QueuedJob): Job that was cancelled.
+        """
+        self.onFinished(queued_job, QueuedJob.CANCELLED, '')
+
+    def cancel(self, queued_job):
+        """
+        Cancels the given job, killing its export if it is exporting. Clips exporting in one pass are cancelled together.
+
+        Args:
+            queued_job (QueuedJob): Job to cancel.
+        """
+        if queued_job.status == QueuedJob.QUEUED:
+            self.onFinished(queued_job, QueuedJob.CANCELLED, '')
+        elif queued_job.worker:
+            queued_job.worker.cancel()
+
+    def clearDone(self):
+        """
+        Removes all the finished, failed, and cancelled jobs from the queue.
+        """
+        self.jobs = [queued_job for queued_job in self.jobs if not queued_job.isDone()]
+        self.save()
+        self.changed.emit()
+
+    def stop(self):
+        """
+        Stops every running export and saves them as queued so they export next time the queue is loaded.
+        """
+        self.stopping = True
+
+        for queued_job in self.getRunning():
+            worker = queued_job.worker
+            worker.cancel()
+            worker.wait()
+            queued_job.status = QueuedJob.QUEUED
+            queued_job.message = ''
+
+        self.save()
+
+
+class QueueWindow(QtWidgets.QWidget):
+    """
+    Shows every job in the export queue and its status, lets the user cancel jobs and clear the done ones.
+    """
+    def __init__(self, export_queue, parent=None):
+        super(QueueWindow, self).__init__(parent=parent)
+        self.setWindowTitle('Export Queue')
+        self.setWindowFlags(QtCore.Qt.Tool)
+        self.setMinimumWidth(600)
+        self.export_queue = export_queue
+        self.table = None
+        self.stats = None
+        self.build()
+        self.updateDisplay()
+        self.export_queue.changed.connect(self.updateDisplay)
+        self.export_queue.progressed.connect(self.updateJob)
+
+    def build(self):
+        """
+        Builds the UI.
+        """
+        main_layout = QtWidgets.QVBoxLayout(self)
+        button_layout = QtWidgets.QHBoxLayout()
+
+        # one row per job
+        self.table = QtWidgets.QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(['Video', 'Start', 'End', 'Progress', 'Status', 'Exporting to'])
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setVisible(False)
+        self.table.itemSelectionChanged.connect(self.updateStats)
+        main_layout.addWidget(self.table)
+
+        # how long each stage of the selected job took, hidden until asked for
+        self.stats = QtWidgets.QPlainTextEdit()
+        self.stats.setReadOnly(True)
+        self.stats.setMaximumHeight(120)
+        self.stats.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+        self.stats.setVisible(False)
+        main_layout.addWidget(self.stats)
+
+        # show stats toggle
+        stats_button = QtWidgets.QPushButton('Stats')
+        stats_button.setCheckable(True)
+        stats_button.toggled.connect(self.stats.setVisible)
+        button_layout.addWidget(stats_button)
+
+        # cancel selected jobs button
+        cancel_button = QtWidgets.QPushButton('Cancel Selected')
+        cancel_button.clicked.connect(self.cancelSelected)
+        button_layout.addWidget(cancel_button)
+
+        # clear done jobs button
+        clear_button = QtWidgets.QPushButton('Clear Done')
+        clear_button.clicked.connect(self.export_queue.clearDone)
+        button_layout.addWidget(clear_button)
+        main_layout.addLayout(button_layout)
+
+    def updateDisplay(self):
+        """
+        Updates the table with the status of every job in the queue.
+        """
+        jobs = self.export_queue.jobs
+        self.table.setRowCount(len(jobs))
+
+        for row, queued_job in enumerate(jobs):
+            job = queued_job.job
+            end = '' if job.end is None else f'{job.end:0.3f}'
+            columns = [os.path.basename(job.source), f'{job.start:0.3f}', end, '', '', job.output]
+
+            for column, text in enumerate(columns):
+                self.table.setItem(row, column, QtWidgets.QTableWidgetItem(text))
+
+            self.updateRow(row, queued_job)
+
+        self.updateStats()
+
+    def updateJob(self, queued_job):
+        """
+        Updates only the row of the given job, such as when it made progress.
+
+        Args:
+            queued_job (QueuedJob): Job whose status or progress changed.
+        """
+        jobs = self.export_queue.jobs
+        if queued_job in jobs:
+            self.updateRow(jobs.index(queued_job), queued_job)
+
+    def updateRow(self, row, queued_job):
+        """
+        Updates the status and progress bar of the given row.
+
+        Args:
+            row (int): Row of the job in the table.
+
+            queued_job (QueuedJob): Job shown in the row.
+        """
+        message = queued_job.message or queued_job.notes
+        status = queued_job.status + (': ' + message if message else '')
+        status_item = self.table.item(row, 4)
+        if status_item.text() != status:
+            status_item.setText(status)
+
+        # progress bar stays busy while exporting until ffmpeg.exe reports how far along it is
+        progress_bar = self.table.cellWidget(row, 3)
+        if not progress_bar:
+            progress_bar = QtWidgets.QProgressBar()
+            self.table.setCellWidget(row, 3, progress_bar)
+
+        exporting = queued_job.status == QueuedJob.EXPORTING
+        progress_bar.setRange(0, 0 if exporting and queued_job.percent is None else 100)
+        progress_bar.setValue(int(queued_job.percent or 0))
+
+    def updateStats(self):
+        """
+        Shows how long each stage of the first selected job took, if it exported since giffer.exe opened.
+        """
+        rows = sorted(index.row() for index in self.table.selectionModel().selectedRows())
+        jobs = self.export_queue.jobs
+        metrics = jobs[rows[0]].metrics if rows and rows[0] < len(jobs) else None
+
+        if metrics:
+            self.stats.setPlainText(f'{metrics.seconds:0.2f}s total\n' + metrics.describe())
+        else:
+            self.stats.setPlainText('Select a job exported since giffer opened to see how long each stage took.')
+
+    def cancelSelected(self):
+        """
+        Cancels every job the user has selected in the table.
+        """
+        rows = set(index.row() for index in self.table.selectionModel().selectedRows())
+        for row in sorted(rows):
+            self.export_queue.cancel(self.export_queue.jobs[row])
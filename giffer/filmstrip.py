@@ -0,0 +1,228 @@
+import functools
+from giffer.cache import MemoryCache
+from giffer.thumbnails import getFillOrder, getThumbnailTimes, THUMBNAIL_HEIGHT
+from giffer.worker import ThumbnailWorker
+from PySide2 import QtWidgets, QtGui, QtCore
+
+
+# thumbnails shown across the strip, made once per video no matter how wide the window is
+THUMBNAIL_COUNT = 24
+
+# thumbnails held in memory, enough for the strips of the last few videos opened
+PIXMAP_CACHE_SIZE = THUMBNAIL_COUNT * 8
+
+
+class Filmstrip(QtWidgets.QWidget):
+    """
+    Strip of thumbnails along the whole video, shown above the sliders. Thumbnails are made in the background,
+    coarse to fine, and drawn as they arrive. Scene cuts and high motion are marked once the video is analyzed.
+    Clicking or dragging on the strip scrubs the video.
+    """
+    scrubbed = QtCore.Signal(int)
+
+    def __init__(self, parent=None):
+        """
+        Args:
+            parent (QWidget): Parent of the filmstrip.
+        """
+        super(Filmstrip, self).__init__(parent=parent)
+        self.setFixedHeight(THUMBNAIL_HEIGHT)
+        self.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
+        self.path = ''
+        self.duration = 0
+        self.position = 0
+        self.times = []
+        self.clips = []
+        self.scenes = None
+        self.pixmaps = MemoryCache(PIXMAP_CACHE_SIZE)
+        self.workers = []
+
+    def setVideo(self, path, duration, ffmpeg_path):
+        """
+        Shows the thumbnails of the given video, making the ones not in memory in the background.
+
+        Args:
+            path (string): Path to video.
+
+            duration (float): Seconds the video plays for. If None or 0, the strip is left empty.
+
+            ffmpeg_path (string): Path to ffmpeg.exe, if empty the strip is left empty.
+        """
+        self.cancel()
+        self.path = path
+        self.duration = duration or 0
+        self.position = 0
+        self.clips = []
+        self.scenes = None
+        self.times = getThumbnailTimes(self.duration, THUMBNAIL_COUNT) if self.duration else []
+        self.update()
+
+        order = [index for index in getFillOrder(len(self.times)) if (path, self.times[index]) not in self.pixmaps]
+        if not order or not ffmpeg_path:
+            return
+
+        worker = ThumbnailWorker(path, self.times, order, ffmpeg_path, parent=self)
+        worker.thumbnailReady.connect(self.onThumbnailReady)
+        worker.finished.connect(functools.partial(self.onWorkerFinished, worker))
+        self.workers.append(worker)
+        worker.start()
+
+    def onThumbnailReady(self, path, index, image):
+        """
+        Holds the given thumbnail in memory and draws it, unless another video was opened while it was being made.
+
+        Args:
+            path (string): Path to video the thumbnail is of.
+
+            index (int): Index of the thumbnail along the strip.
+
+            image (bytes): .png of the thumbnail.
+        """
+        if path != self.path:
+            return
+
+        pixmap = QtGui.QPixmap()
+        if pixmap.loadFromData(image, 'PNG'):
+            self.pixmaps.set((path, self.times[index]), pixmap)
+            self.update()
+
+    def onWorkerFinished(self, worker):
+        """
+        Lets go of the given thumbnail worker once its thread is done.
+
+        Args:
+            worker (ThumbnailWorker): Worker that finished.
+        """
+        self.workers.remove(worker)
+        worker.deleteLater()
+
+    def cancel(self):
+        """
+        Stops making thumbnails. Workers finish the thumbnail they are making, then stop.
+        """
+        for worker in self.workers:
+            worker.cancel()
+
+    def wait(self):
+        """
+        Stops making thumbnails and waits for the workers to stop, so their threads can be destroyed.
+        """
+        self.cancel()
+        for worker in self.workers:
+            worker.wait()
+
+    def setPosition(self, position):
+        """
+        Moves the line showing where the video is at.
+
+        Args:
+            position (int): Time in milliseconds video is at.
+        """
+        self.position = position
+        self.update()
+
+    def setClips(self, clips):
+        """
+        Shades the clips about to be exported together.
+
+        Args:
+            clips (list): Start and end in seconds of every clip.
+        """
+        self.clips = list(clips)
+        self.update()
+
+    def setScenes(self, scenes):
+        """
+        Marks the scene cuts and high motion of the video.
+
+        Args:
+            scenes (SceneAnalysis): Cuts and high motion segments. None clears the marks.
+        """
+        self.scenes = scenes
+        self.update()
+
+    def getPosition(self, x):
+        """
+        Gets the time in the video under the given point on the strip.
+
+        Args:
+            x (int): Pixels from the left of the strip.
+
+        Returns:
+            (int): Time in milliseconds.
+        """
+        ratio = min(max(x / float(max(self.width(), 1)), 0.0), 1.0)
+        return int(ratio * self.duration * 1000.0)
+
+    def mousePressEvent(self, event):
+        """
+        Overwriting mouse press event to scrub the video to where the strip was clicked.
+
+        Args:
+            event (QMouseEvent): Where the strip was clicked.
+        """
+        if self.duration and event.button() == QtCore.Qt.LeftButton:
+            self.scrubbed.emit(self.getPosition(event.x()))
+
+    def mouseMoveEvent(self, event):
+        """
+        Overwriting mouse move event to scrub the video while dragging on the strip.
+
+        Args:
+            event (QMouseEvent): Where the mouse is.
+        """
+        if self.duration and event.buttons() & QtCore.Qt.LeftButton:
+            self.scrubbed.emit(self.getPosition(event.x()))
+
+    def paintEvent(self, event):
+        """
+        Overwriting paint event to draw each thumbnail cropped to fit its cell, gray cells for the ones not made yet,
+        high motion and scene cuts, the clips about to be exported, and a line where the video is at.
+
+        Args:
+            event (QPaintEvent): Area to paint.
+        """
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), QtGui.QColor(40, 40, 40))
+
+        count = len(self.times)
+        for index, seconds in enumerate(self.times):
+            left = self.width() * index // count
+            cell = QtCore.QRect(left, 0, self.width() * (index + 1) // count - left, self.height())
+            pixmap = self.pixmaps.get((self.path, seconds))
+
+            if not pixmap:
+                painter.fillRect(cell.adjusted(1, 1, -1, -1), QtGui.QColor(70, 70, 70))
+                continue
+
+            # crop the middle of the thumbnail to the cell's aspect ratio
+            scaled = pixmap.scaled(cell.size(), QtCore.Qt.KeepAspectRatioByExpanding, QtCore.Qt.SmoothTransformation)
+            source = QtCore.QRect((scaled.width() - cell.width()) // 2, (scaled.height() - cell.height()) // 2,
+                                  cell.width(), cell.height())
+            painter.drawPixmap(cell, scaled, source)
+
+        # high motion shaded along the top of the strip, a line at every cut
+        if self.duration and self.scenes:
+            for start, end in self.scenes.motion:
+                left = int(start / self.duration * self.width())
+                right = int(end / self.duration * self.width())
+                painter.fillRect(left, 0, max(right - left, 2), 6, QtGui.QColor(255, 150, 40, 200))
+
+            painter.setPen(QtGui.QPen(QtGui.QColor(255, 220, 60), 1))
+            for cut in self.scenes.cuts:
+                x = int(cut / self.duration * self.width())
+                painter.drawLine(x, 0, x, self.height())
+
+        # clips shaded along the bottom of the strip
+        if self.duration:
+            for start, end in self.clips:
+                left = int(start / self.duration * self.width())
+                right = int(end / self.duration * self.width())
+                painter.fillRect(left, self.height() - 8, max(right - left, 2), 8, QtGui.QColor(60, 160, 255, 200))
+
+        if self.duration:
+            x = int(self.position / (self.duration * 1000.0) * self.width())
+            painter.setPen(QtGui.QPen(QtGui.QColor(255, 60, 60), 2))
+            painter.drawLine(x, 0, x, self.height())
+
+        painter.end()
@@ -0,0 +1,239 @@
+import os
+import math
+import bisect
+import subprocess
+import giffer.gifutil as gifutil
+from giffer.cache import DiskCache, makeKey
+from giffer.probe import getFfprobePath
+
+
+# an hour of 60 fps video is about 3MB of .json, this holds a couple dozen long videos
+FRAME_INDEX_CACHE_SIZE = 64 * 1024 * 1024
+
+# positions reach us in whole milliseconds, so a position this close to a frame counts as on it
+TOLERANCE = 0.0005
+
+
+class FrameIndex(object):
+    """
+    When every frame of a video is shown, and where its keyframes are, so positions can be snapped to exact frames
+    and stepped frame by frame without decoding. Times are seconds from the first frame, the way players count.
+    """
+    def __init__(self, times, keyframes=None):
+        """
+        Args:
+            times (list): Seconds each frame is shown at, from the first frame, in order.
+
+            keyframes (list): Seconds of each keyframe, from the first frame, in order.
+        """
+        self.times = times
+        self.keyframes = keyframes or []
+
+    def __len__(self):
+        return len(self.times)
+
+    def getFrame(self, seconds):
+        """
+        Gets the frame showing at the given time.
+
+        Args:
+            seconds (float): Time from the first frame.
+
+        Returns:
+            (int): Index of the frame, 0 if before the first frame.
+        """
+        return max(bisect.bisect_right(self.times, seconds + TOLERANCE) - 1, 0)
+
+    def getTime(self, frame):
+        """
+        Gets when the given frame is shown, clamped to the first and last frame.
+
+        Args:
+            frame (int): Index of the frame.
+
+        Returns:
+            (float): Seconds from the first frame.
+        """
+        return self.times[min(max(frame, 0), len(self.times) - 1)]
+
+    def snap(self, seconds):
+        """
+        Gets when the frame showing at the given time starts.
+
+        Args:
+            seconds (float): Time from the first frame.
+
+        Returns:
+            (float): Seconds from the first frame.
+        """
+        return self.getTime(self.getFrame(seconds))
+
+    def step(self, seconds, frames):
+        """
+        Gets when the frame the given amount of frames away from the one showing at the given time starts.
+
+        Args:
+            seconds (float): Time from the first frame.
+
+            frames (int): Frames to step, negative steps back.
+
+        Returns:
+            (float): Seconds from the first frame.
+        """
+        return self.getTime(self.getFrame(seconds) + frames)
+
+    def getKeyframe(self, seconds):
+        """
+        Gets the last keyframe at or before the given time, which is where decoding that frame has to start.
+
+        Args:
+            seconds (float): Time from the first frame.
+
+        Returns:
+            (float): Seconds from the first frame, 0 if there is no keyframe before.
+        """
+        index = bisect.bisect_right(self.keyframes, seconds + TOLERANCE) - 1
+        return self.keyframes[index] if index >= 0 else 0.0
+
+    def toDict(self):
+        """
+        Gets the frame index as a dictionary so it can be written to .json
+
+        Returns:
+            (dictionary): Times and keyframes as keys.
+        """
+        return {'times': self.times, 'keyframes': self.keyframes}
+
+    @classmethod
+    def fromDict(cls, data):
+        """
+        Creates a frame index from a dictionary such as the one returned by toDict.
+
+        Args:
+            data (dictionary): Times and keyframes as keys.
+
+        Returns:
+            (FrameIndex): Frame index made from given data.
+        """
+        return cls(data['times'], data['keyframes'])
+
+
+def toMilliseconds(seconds, round_up=False):
+    """
+    Converts the given time to whole milliseconds, such as QMediaPlayer positions and sliders use.
+
+    Args:
+        seconds (float): Time to convert.
+
+        round_up (boolean): If True, rounds up so the position lands on the frame starting at the given time.
+        If False, rounds down so seeking with ffmpeg.exe from the position still includes that frame.
+
+    Returns:
+        (int): Milliseconds.
+    """
+    milliseconds = round(seconds * 1000.0, 6)
+    return int(math.ceil(milliseconds) if round_up else math.floor(milliseconds))
+
+
+def getFrameIndexCache():
+    """
+    Gets the cache that holds frame indexes, shared by every giffer.exe
+
+    Returns:
+        (DiskCache): Cache of frame index .json
+    """
+    return DiskCache(gifutil.getCacheDirectory('frame_indexes'), FRAME_INDEX_CACHE_SIZE)
+
+
+def buildFrameIndex(path, ffprobe_path, is_cancelled=None):
+    """
+    Builds the frame index of the given video with ffprobe.exe, reading packets without decoding them.
+    Packets come in decode order, so their times are sorted into the order frames are shown in.
+
+    Args:
+        path (string): Path to video.
+
+        ffprobe_path (string): Path to ffprobe.exe
+
+        is_cancelled (callable): Called for every packet read, kills ffprobe.exe and stops if it returns True.
+
+    Returns:
+        (FrameIndex): Times of every frame and keyframe of the video's first video stream, None if cancelled.
+    """
+    command = [ffprobe_path, '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags',
+               '-of', 'csv=p=0', path]
+    creation_flags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, creationflags=creation_flags)
+
+    times = []
+    keyframes = []
+
+    try:
+        for line in process.stdout:
+            if is_cancelled and is_cancelled():
+                return None
+
+            pts_time, _, flags = line.decode(errors='replace').strip().partition(',')
+
+            try:
+                seconds = float(pts_time)
+            except ValueError:
+                continue
+
+            times.append(seconds)
+            if 'K' in flags:
+                keyframes.append(seconds)
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+        process.stdout.close()
+        return_code = process.wait()
+
+    if return_code:
+        raise subprocess.CalledProcessError(return_code, command)
+
+    if not times:
+        raise ValueError('No video frames found in ' + path)
+
+    times.sort()
+    keyframes.sort()
+    first = times[0]
+    return FrameIndex([round(time - first, 6) for time in times], [round(time - first, 6) for time in keyframes])
+
+
+def getFrameIndex(path, ffmpeg_path='', cache=None, is_cancelled=None):
+    """
+    Gets the frame index of the given video, from the given cache if it has been built before.
+    Cached by path, size, and modified time. Reading every packet of a long video takes a moment,
+    so call from a worker thread.
+
+    Args:
+        path (string): Path to video.
+
+        ffmpeg_path (string): Path to ffmpeg.exe, ffprobe.exe is looked for next to it.
+
+        cache (DiskCache): Cache to keep frame indexes in between sessions. If None, always builds.
+
+        is_cancelled (callable): Called for every packet read, stops building if it returns True.
+
+    Returns:
+        (FrameIndex): Frame index of the video, None if cancelled.
+    """
+    stat = os.stat(path)
+    key = makeKey('frame_index', os.path.abspath(path), stat.st_size, stat.st_mtime)
+
+    data = cache.fetchJson(key) if cache else None
+    if data:
+        return FrameIndex.fromDict(data)
+
+    ffprobe_path = getFfprobePath(ffmpeg_path)
+    if not ffprobe_path:
+        raise ValueError('ffprobe.exe is needed next to ffmpeg.exe to step through exact frames!')
+
+    frame_index = buildFrameIndex(path, ffprobe_path, is_cancelled)
+
+    if cache and frame_index:
+        cache.storeJson(key, frame_index.toDict())
+
+    return frame_index
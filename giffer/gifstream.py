@@ -0,0 +1,211 @@
+import struct
+
+
+# block introducers and labels of the GIF89a format
+EXTENSION = 0x21
+IMAGE = 0x2C
+TRAILER = 0x3B
+GRAPHIC_CONTROL_LABEL = 0xF9
+APPLICATION_LABEL = 0xFF
+COMMENT_LABEL = 0xFE
+
+# longest a frame can be shown for, in hundredths of a second
+MAX_DELAY = 0xFFFF
+
+
+class GifStream(object):
+    """
+    A .gif split into its header, global color table, and blocks, without decoding any image data.
+    Enough to join .gifs together block by block.
+    """
+    def __init__(self, header, screen, color_table, blocks):
+        """
+        Args:
+            header (bytes): "GIF89a" or "GIF87a"
+
+            screen (bytes): 7 byte logical screen descriptor.
+
+            color_table (bytes): Global color table, empty if the .gif has none.
+
+            blocks (list): (introducer, label, data) for every extension and image, data includes the introducer.
+            Label is None for images.
+        """
+        self.header = header
+        self.screen = screen
+        self.color_table = color_table
+        self.blocks = blocks
+
+    @classmethod
+    def fromBytes(cls, data):
+        """
+        Parses the given .gif into its blocks.
+
+        Args:
+            data (bytes): Whole .gif file.
+
+        Returns:
+            (GifStream): Header, global color table, and blocks of the .gif
+        """
+        if data[:3] != b'GIF':
+            raise ValueError('Not a .gif!')
+
+        header = data[:6]
+        screen = data[6:13]
+        position = 13
+        color_table = b''
+
+        if screen[4] & 0x80:
+            position += 3 << ((screen[4] & 0x07) + 1)
+            color_table = data[13:position]
+
+        blocks = []
+        while position < len(data) and data[position] != TRAILER:
+            start = position
+            introducer = data[position]
+
+            if introducer == EXTENSION:
+                label = data[position + 1]
+                position = cls.skipSubBlocks(data, position + 2)
+            elif introducer == IMAGE:
+                label = None
+                packed = data[position + 9]
+                position += 10
+
+                # local color table, then lzw minimum code size, then the image data
+                if packed & 0x80:
+                    position += 3 << ((packed & 0x07) + 1)
+
+                position = cls.skipSubBlocks(data, position + 1)
+            else:
+                raise ValueError('Unknown .gif block ' + hex(introducer) + ' at byte ' + str(position))
+
+            blocks.append((introducer, label, data[start:position]))
+
+        return cls(header, screen, color_table, blocks)
+
+    @classmethod
+    def fromFile(cls, path):
+        """
+        Parses the .gif at the given path into its blocks.
+
+        Args:
+            path (string): Path to .gif
+
+        Returns:
+            (GifStream): Header, global color table, and blocks of the .gif
+        """
+        with open(path, 'rb') as gif_file:
+            return cls.fromBytes(gif_file.read())
+
+    @staticmethod
+    def skipSubBlocks(data, position):
+        """
+        Gets the position after the sub-blocks starting at the given position.
+
+        Args:
+            data (bytes): Whole .gif file.
+
+            position (int): Position of the first sub-block's size byte.
+
+        Returns:
+            (int): Position after the zero size block that ends the sub-blocks.
+        """
+        while data[position]:
+            position += data[position] + 1
+
+        return position + 1
+
+    def getDelays(self):
+        """
+        Gets how long every frame is shown for, from the graphic control extension in front of it.
+
+        Returns:
+            (list): Hundredths of a second of every frame that has a graphic control extension, in order.
+        """
+        return [struct.unpack('<H', data[4:6])[0] for _, label, data in self.blocks if label == GRAPHIC_CONTROL_LABEL]
+
+    def toBytes(self):
+        """
+        Gets the .gif put back together from its blocks.
+
+        Returns:
+            (bytes): Whole .gif file.
+        """
+        blocks = b''.join(data for _, _, data in self.blocks)
+        return self.header + self.screen + self.color_table + blocks + bytes([TRAILER])
+
+    def getImages(self, color_table=None):
+        """
+        Gets the image blocks, and the graphic control extensions in front of them, ready to place in another .gif
+
+        Args:
+            color_table (bytes): Global color table of the .gif the images are going into. Images that use this
+            .gif's global color table get it as their local color table if the two are different.
+
+        Returns:
+            (list): Block bytes, without application or comment extensions.
+        """
+        blocks = []
+        needs_table = self.color_table and color_table is not None and color_table != self.color_table
+
+        for introducer, label, data in self.blocks:
+            if label in (APPLICATION_LABEL, COMMENT_LABEL):
+                continue
+
+            if introducer == IMAGE and needs_table and not data[9] & 0x80:
+                size_bits = (len(self.color_table) // 3).bit_length() - 2
+                data = data[:9] + struct.pack('B', data[9] | 0x80 | size_bits) + self.color_table + data[10:]
+
+            blocks.append(data)
+
+        return blocks
+
+
+def padGif(path, duration):
+    """
+    Lengthens the last frame of the .gif so the whole .gif plays for the given time.
+
+    Args:
+        path (string): Path to .gif to pad in place.
+
+        duration (int): Hundredths of a second the .gif should play for. A .gif already as long is left alone.
+    """
+    stream = GifStream.fromFile(path)
+    controls = [index for index, (_, label, _) in enumerate(stream.blocks) if label == GRAPHIC_CONTROL_LABEL]
+    missing = duration - sum(stream.getDelays())
+    if not controls or missing <= 0:
+        return
+
+    introducer, label, data = stream.blocks[controls[-1]]
+    delay = min(struct.unpack('<H', data[4:6])[0] + missing, MAX_DELAY)
+    stream.blocks[controls[-1]] = (introducer, label, data[:4] + struct.pack('<H', delay) + data[6:])
+
+    with open(path, 'wb') as gif_file:
+        gif_file.write(stream.toBytes())
+
+
+def joinGifs(paths, output):
+    """
+    Joins the given .gifs one after the other into a single .gif, taking the screen size, global color table,
+    and looping from the first. Each .gif's first frame must cover the whole screen, as it is drawn on top of the
+    last frame of the .gif before it.
+
+    Args:
+        paths (list): Paths to .gifs to join, in order.
+
+        output (string): Path to write the joined .gif to.
+    """
+    first = GifStream.fromFile(paths[0])
+
+    with open(output, 'wb') as output_file:
+        output_file.write(first.header + first.screen + first.color_table)
+
+        # the first .gif keeps its application extensions, which hold the loop count
+        for _, _, data in first.blocks:
+            output_file.write(data)
+
+        for path in paths[1:]:
+            for data in GifStream.fromFile(path).getImages(first.color_table):
+                output_file.write(data)
+
+        output_file.write(bytes([TRAILER]))
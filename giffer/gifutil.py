@@ -1,13 +1,59 @@
+import os
 import sys
 import json
-import winreg
+import tempfile
+import contextlib
 import webbrowser
 
+try:
+    import winreg
+except ImportError:
+    # registry shortcuts are only available on windows, everything else in gifutil is still usable headless
+    winreg = None
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
 
 def getCurrentPath():
     return sys.executable if getattr(sys, 'frozen', False) else __file__
 
 
+def getDataPath():
+    """
+    Gets the path to the .json that caches giffer.exe settings.
+
+    Returns:
+        (string): Path to giffer_data.json next to giffer.exe
+    """
+    return os.path.join(os.path.dirname(getCurrentPath()), 'giffer_data.json')
+
+
+def getQueuePath():
+    """
+    Gets the path to the .json that saves giffer.exe's export queue.
+
+    Returns:
+        (string): Path to giffer_queue.json next to giffer.exe
+    """
+    return os.path.join(os.path.dirname(getCurrentPath()), 'giffer_queue.json')
+
+
+def getCacheDirectory(name):
+    """
+    Gets the directory giffer.exe caches the given kind of files in.
+
+    Args:
+        name (string): Kind of files cached, e.g. "palettes"
+
+    Returns:
+        (string): Path to directory inside giffer_cache next to giffer.exe, may not exist yet.
+    """
+    return os.path.join(os.path.dirname(getCurrentPath()), 'giffer_cache', name)
+
+
 def openDocumentation():
     webbrowser.open('https://github.com/MongoWobbler/giffer', new=2)
 
@@ -21,6 +67,90 @@ def subtractStrings(a, b):
     return f'{float(a) - float(b):0.3}'
 
 
+def getScaledSize(source_width, source_height, width=None, height=None):
+    """
+    Gets the size frames are scaled to, the same way ffmpeg's scale filter does with -2 for a side not given.
+
+    Args:
+        source_width (int): Pixels wide the frame is.
+
+        source_height (int): Pixels high the frame is.
+
+        width (int): Pixels wide to scale to. None keeps the aspect ratio.
+
+        height (int): Pixels high to scale to. None keeps the aspect ratio.
+
+    Returns:
+        (tuple): Width and height in pixels.
+    """
+    if not width and not height:
+        return source_width, source_height
+
+    if not height:
+        height = max(int(round(source_height * width / float(source_width) / 2.0)) * 2, 2)
+    elif not width:
+        width = max(int(round(source_width * height / float(source_height) / 2.0)) * 2, 2)
+
+    return width, height
+
+
+def formatSize(size):
+    """
+    Gets the given bytes as text a person can read.
+
+    Args:
+        size (int): Bytes.
+
+    Returns:
+        (string): Size such as "7.84MB"
+    """
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:0.2f}{unit}' if unit != 'B' else str(int(size)) + unit
+
+        size /= 1024.0
+
+    return f'{size:0.2f}GB'
+
+
+def isSamePath(first, second):
+    """
+    Gets whether the given paths are the same file, even if they are written differently or do not exist yet.
+
+    Args:
+        first (string): Path to file.
+
+        second (string): Path to file.
+
+    Returns:
+        (boolean): True if both paths point at the same file.
+    """
+    if os.path.exists(first) and os.path.exists(second):
+        return os.path.samefile(first, second)
+
+    return os.path.normcase(os.path.abspath(first)) == os.path.normcase(os.path.abspath(second))
+
+
+def getExportName(source, directory, extension):
+    """
+    Gets the path to export the given video to, named after the video. Exporting an .mp4 next to the .mp4 it came
+    from would write over the video, so "_clip" is added to the name when the path is the video itself.
+
+    Args:
+        source (string): Path to video.
+
+        directory (string): Directory to export to.
+
+        extension (string): Extension of the format exported, e.g. ".gif"
+
+    Returns:
+        (string): Path to export to.
+    """
+    name = os.path.splitext(os.path.basename(source))[0]
+    path = os.path.join(directory, name + extension)
+    return os.path.join(directory, name + '_clip' + extension) if isSamePath(path, source) else path
+
+
 def isAdmin():
     """
     Gets whether the user is an admin or not.
@@ -105,8 +235,17 @@ def writeJson(file_name, data):
     Returns:
         (string): full path where json file is.
     """
-    with open(file_name, 'w') as open_file:
-        json.dump(data, open_file, indent=4)
+    # write to a temp file next to it first, so a crash or another giffer.exe never sees half a file
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_name)), suffix='.tmp')
+
+    try:
+        with os.fdopen(handle, 'w') as open_file:
+            json.dump(data, open_file, indent=4)
+
+        os.replace(temp_path, file_name)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
     return file_name
 
@@ -127,3 +266,30 @@ def readJson(file_name, hook=None):
         data = json.load(open_file, object_pairs_hook=hook)
 
     return data
+
+
+@contextlib.contextmanager
+def lockFile(file_name):
+    """
+    Holds an exclusive lock on a .lock file next to the given file, waiting for any other giffer.exe holding it.
+    Use around reading and writing a file that many giffer.exe may change at the same time.
+
+    Args:
+        file_name (string): Path to the file to lock.
+    """
+    with open(file_name + '.lock', 'a+') as lock_file:
+        if os.name == 'nt':
+            # LK_LOCK retries once a second for 10 seconds before raising OSError
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -1,12 +1,19 @@
 import os
-import cv2
-import shutil
-import tempfile
+import functools
 import threading
 import subprocess
 import giffer.gifutil as gifutil
 from giffer.about import AboutWindow
+from giffer.crop import CropSelector
+from giffer.exporter import DEDUPE_THRESHOLD, FORMAT_EXTENSIONS, ExportJob
+from giffer.exportqueue import ExportQueue, QueuedJob, QueueWindow
+from giffer.filmstrip import Filmstrip
+from giffer.frameindex import toMilliseconds
+from giffer.preview import Previewer
+from giffer.probe import getMetadataCache, probeVideo
 from giffer.settings import Settings
+from giffer.settingsstore import SettingsStore
+from giffer.worker import FrameIndexWorker, SceneWorker
 from PySide2 import QtWidgets, QtGui, QtCore, QtMultimedia, QtMultimediaWidgets
 
 
@@ -17,26 +24,10 @@ from PySide2 import QtWidgets, QtGui, QtCore, QtMultimedia, QtMultimediaWidgets
 
 # Future features:
 # multi threading so slider updates constantly
-# specify other formats to export, rather than just .gif
 # Create a custom slider than has start frame and end frame slider marker
 # Add ability to add more of these custom sliders so user can export multiple clips to multiple paths in multiple formats
 # move everything over to c++?
 
-class ExportingWindow(QtWidgets.QWidget):
-    """
-    Temporary solution to notify user of export happening until threading gets rolled out.
-    """
-    def __init__(self, parent=None):
-        super(ExportingWindow, self).__init__(parent=parent)
-        self.setWindowTitle('Exporting')
-        self.setWindowFlags(QtCore.Qt.Tool)
-        exporting = QtWidgets.QPushButton('Exporting')
-        exporting.setEnabled(False)
-
-        main_layout = QtWidgets.QVBoxLayout(self)
-        main_layout.addWidget(exporting)
-
-
 class MainWindow(QtWidgets.QDialog):
     """
     Main window of giffer.exe
@@ -51,16 +42,24 @@ class MainWindow(QtWidgets.QDialog):
         self.video_fpms = 1000.0 / float(self.video_fps)
         self.skip_range = 5000
         self.current_video = starting_video
-        self.exporting_window = ExportingWindow()
+        self.frame_index = None
+        self.frame_index_workers = []
+        self.scenes = None
+        self.scene_workers = []
+        self.clips = []
 
         # all variables that class will define
         self.player = None
+        self.crop_selector = None
+        self.filmstrip = None
+        self.previewer = None
         self.start_slider = None
         self.slider = None
         self.end_slider = None
         self.play_button = None
         self.start_label = None
         self.current_length_label = None
+        self.clips_label = None
         self.end_label = None
         self.current_time = None
         self.video_duration_label = None
@@ -68,13 +67,79 @@ class MainWindow(QtWidgets.QDialog):
         self.export_line = None
         self.info_label = None
         self.timer = None
-
-        # settings and about window ready, build ui and play video if any
-        self.settings = Settings(self.updateDisplayInfo, self.clearInfoDisplay)
-        self.about = AboutWindow()
+        self.started = False
+
+        # settings, about, and export queue windows are only built the first time they are shown
+        self.settings = None
+        self.about = None
+        self.queue_window = None
+
+        # settings and export queue ready, build ui, the video plays once the window is showing
+        self.settings_store = SettingsStore(gifutil.getDataPath(), Settings.getDefaultData())
+        max_exports = self.settings_store.getData()['max_exports']
+        self.export_queue = ExportQueue(gifutil.getQueuePath(), max_exports, parent=self)
+        self.export_queue.done.connect(self.finishedExporting)
         self.build()
+
+    def showEvent(self, event):
+        """
+        Overwriting show event to start up once the window is first showing, so giffer.exe appears right away
+        instead of after the video is probed and the export queue is loaded.
+
+        Args:
+            event (QEvent): Passed along to the dialog's show event.
+        """
+        super(MainWindow, self).showEvent(event)
+
+        if not self.started:
+            self.started = True
+            QtCore.QTimer.singleShot(0, self.startUp)
+
+    def startUp(self):
+        """
+        Plays the video giffer.exe was launched with, if any, and starts exports left in the queue.
+        """
         self.setVideoAndPlay(self.current_video)
 
+        # exports left in the queue last time giffer.exe closed start exporting again
+        self.export_queue.load()
+
+    def getSettings(self):
+        """
+        Gets the settings window, building it the first time.
+
+        Returns:
+            (Settings): Settings window, sharing the main window's settings store.
+        """
+        if not self.settings:
+            self.settings = Settings(self.updateDisplayInfo, self.clearInfoDisplay, self.settings_store)
+
+        return self.settings
+
+    def showSettings(self):
+        """
+        Shows the settings window.
+        """
+        self.getSettings().show()
+
+    def showAbout(self):
+        """
+        Shows the about window, building it the first time.
+        """
+        if not self.about:
+            self.about = AboutWindow()
+
+        self.about.show()
+
+    def showQueue(self):
+        """
+        Shows the export queue window, building it the first time.
+        """
+        if not self.queue_window:
+            self.queue_window = QueueWindow(self.export_queue)
+
+        self.queue_window.show()
+
     def build(self):
         """
         Builds the UI
@@ -84,6 +149,8 @@ class MainWindow(QtWidgets.QDialog):
         play_layout = QtWidgets.QHBoxLayout()
         slider_layout = QtWidgets.QVBoxLayout()
         frame_cut_layout = QtWidgets.QHBoxLayout()
+        clip_layout = QtWidgets.QHBoxLayout()
+        video_layout = QtWidgets.QHBoxLayout()
         current_video_layout = QtWidgets.QHBoxLayout()
         export_gif_layout = QtWidgets.QHBoxLayout()
         info_layout = QtWidgets.QVBoxLayout()
@@ -109,11 +176,16 @@ class MainWindow(QtWidgets.QDialog):
         export_action = QtWidgets.QAction('Export', parent=file_button)
         export_action.triggered.connect(self.exportGif)
         file_button.addAction(export_action)
+
+        # export queue action
+        queue_action = QtWidgets.QAction('Export Queue', parent=file_button)
+        queue_action.triggered.connect(self.showQueue)
+        file_button.addAction(queue_action)
         file_button.addSeparator()
 
         # settings action
         settings_action = QtWidgets.QAction('Settings', parent=file_button)
-        settings_action.triggered.connect(self.settings.show)
+        settings_action.triggered.connect(self.showSettings)
         file_button.addAction(settings_action)
         file_button.addSeparator()
 
@@ -129,7 +201,7 @@ class MainWindow(QtWidgets.QDialog):
 
         # about action
         about_action = QtWidgets.QAction('About', parent=help_button)
-        about_action.triggered.connect(self.about.show)
+        about_action.triggered.connect(self.showAbout)
         help_button.addAction(about_action)
 
         # player
@@ -137,6 +209,16 @@ class MainWindow(QtWidgets.QDialog):
         video.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
         self.player = QtMultimedia.QMediaPlayer()
         self.player.setVideoOutput(video)
+        video_layout.addWidget(video)
+
+        # drag over the video to crop the .gif, right click to clear
+        self.crop_selector = CropSelector(video, parent=self)
+        self.crop_selector.cropChanged.connect(self.onCropChanged)
+
+        # looping preview of the range about to be exported, rendered in the background
+        self.previewer = Previewer()
+        self.previewer.setVisible(self.settings_store.getData()['preview'])
+        video_layout.addWidget(self.previewer)
 
         # start cut label
         self.start_label = QtWidgets.QLabel('0')
@@ -168,6 +250,23 @@ class MainWindow(QtWidgets.QDialog):
         self.end_label = QtWidgets.QLabel('0')
         frame_cut_layout.addWidget(self.end_label, alignment=QtGui.Qt.AlignLeft)
 
+        # add clip button, every clip added is exported together, decoding the video once
+        add_clip_button = QtWidgets.QPushButton('Add Clip')
+        add_clip_button.setShortcut(QtGui.QKeySequence('A'))
+        add_clip_button.setToolTip('Add the range from start to end as a clip. Clips export together')
+        add_clip_button.clicked.connect(self.addClip)
+        clip_layout.addWidget(add_clip_button)
+
+        # clips label
+        self.clips_label = QtWidgets.QLabel('')
+        clip_layout.addWidget(self.clips_label)
+        clip_layout.addStretch()
+
+        # clear clips button
+        clear_clips_button = QtWidgets.QPushButton('Clear Clips')
+        clear_clips_button.clicked.connect(self.clearClips)
+        clip_layout.addWidget(clear_clips_button)
+
         # current video playing label
         playing_label = QtWidgets.QLabel('Current Video:')
         playing_label.setFixedWidth(100)
@@ -201,6 +300,11 @@ class MainWindow(QtWidgets.QDialog):
         play_layout.addWidget(self.current_time)
         self.current_time.setFixedWidth(50)
 
+        # thumbnails along the whole video, made in the background
+        self.filmstrip = Filmstrip()
+        self.filmstrip.scrubbed.connect(self.scrubTo)
+        slider_layout.addWidget(self.filmstrip)
+
         # create slider
         self.slider = QtWidgets.QSlider(QtCore.Qt.Horizontal)
         self.slider.setRange(0, 0)
@@ -226,8 +330,9 @@ class MainWindow(QtWidgets.QDialog):
 
         # finish layouts
         main_layout.addWidget(menu)
-        main_layout.addWidget(video)
+        main_layout.addLayout(video_layout)
         main_layout.addLayout(frame_cut_layout)
+        main_layout.addLayout(clip_layout)
         main_layout.addLayout(play_layout)
         main_layout.addLayout(info_layout)
 
@@ -250,7 +355,7 @@ class MainWindow(QtWidgets.QDialog):
 
         # will usually show up first time user launches giffer.exe
         # to notify them to set the ffmpeg.exe path
-        data = self.settings.getData()
+        data = self.settings_store.getData()
         if not data['ffmpeg'] or not os.path.exists(data['ffmpeg']):
             self.displayError('Invalid ffmpeg.exe path! Please set the location of ffmpeg.exe in the settings')
 
@@ -259,7 +364,7 @@ class MainWindow(QtWidgets.QDialog):
         Opens a dialog for user to pick video file to play in giffer.exe
         Updates data and plays the video if user picked video.
         """
-        data = self.settings.getData()
+        data = self.settings_store.getData()
         starting_directory = data['last_opened']
 
         dialog = QtWidgets.QFileDialog()
@@ -269,7 +374,7 @@ class MainWindow(QtWidgets.QDialog):
             return
 
         data['last_opened'] = os.path.dirname(video_path)
-        self.settings.updateData(data)
+        self.settings_store.setData(data)
         self.setVideoAndPlay(video_path)
 
     def displayError(self, error_message, raise_error=False):
@@ -301,6 +406,7 @@ class MainWindow(QtWidgets.QDialog):
         """
         self.playing_line.setText(self.current_video)
         self.export_line.setText(self.getExportPath())
+        self.export_queue.setMaxWorkers(self.settings_store.getData()['max_exports'])
 
     def updateVideoInfo(self, new_video):
         """
@@ -314,16 +420,226 @@ class MainWindow(QtWidgets.QDialog):
         if not new_video:
             return
 
-        open_video = cv2.VideoCapture(new_video)
-        self.video_width = int(open_video.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.video_height = int(open_video.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        self.video_fps = int(open_video.get(cv2.CAP_PROP_FPS))
-        self.video_fpms = 1000.0 / float(self.video_fps)
-        self.skip_range = 5000 if self.player.duration() / 10.0 > 5000 else self.player.duration() / 10.0
-        open_video.release()
+        try:
+            info = probeVideo(new_video, self.settings_store.getData()['ffmpeg'], getMetadataCache())
+        except (OSError, ValueError, ImportError, subprocess.CalledProcessError) as error:
+            self.displayError('Could not read video info! ' + str(error))
+            self.filmstrip.setVideo(new_video, None, '')
+            self.crop_selector.setVideoSize(0, 0)
+            self.scenes = None
+            return
+
+        self.video_width = info.width
+        self.video_height = info.height
+        self.video_fps = float(info.fps)
+        self.video_fpms = 1000.0 / self.video_fps
+        self.buildFrameIndex(new_video)
+        self.crop_selector.setVideoSize(info.width, info.height)
+        self.filmstrip.setVideo(new_video, info.duration, self.settings_store.getData()['ffmpeg'])
+        self.analyzeScenes(new_video)
+
+        # player has not loaded the video yet, so its duration is still the last video's
+        if info.duration:
+            self.skip_range = min(info.duration * 1000.0 / 10.0, 5000)
 
         self.setGeometry(200, 200, self.video_width, self.video_height)
 
+    def buildFrameIndex(self, path):
+        """
+        Starts building the frame index of the given video in the background. Until it is built, or if it can't be,
+        frames are stepped by the frame rate instead.
+
+        Args:
+            path (string): Path to video to index.
+        """
+        self.frame_index = None
+        worker = FrameIndexWorker(path, self.settings_store.getData()['ffmpeg'], parent=self)
+        worker.built.connect(self.onFrameIndexBuilt)
+        worker.finished.connect(functools.partial(self.onFrameIndexFinished, worker))
+        self.frame_index_workers.append(worker)
+        worker.start()
+
+    def onFrameIndexBuilt(self, path, frame_index):
+        """
+        Starts using the given frame index, unless another video was opened while it was being built.
+
+        Args:
+            path (string): Path to video that was indexed.
+
+            frame_index (FrameIndex): When every frame of the video is shown.
+        """
+        if path == self.current_video:
+            self.frame_index = frame_index
+
+    def onFrameIndexFinished(self, worker):
+        """
+        Lets go of the given frame index worker once its thread is done.
+
+        Args:
+            worker (FrameIndexWorker): Worker that finished.
+        """
+        self.frame_index_workers.remove(worker)
+        worker.deleteLater()
+
+    def analyzeScenes(self, path):
+        """
+        Starts finding the scene cuts and high motion of the given video in the background, cancelling the analysis
+        of the last video. Once found they are marked on the filmstrip and start and end can be snapped to them.
+
+        Args:
+            path (string): Path to video to analyze.
+        """
+        self.scenes = None
+        for worker in self.scene_workers:
+            worker.cancel()
+
+        ffmpeg_path = self.settings_store.getData()['ffmpeg']
+        if not ffmpeg_path:
+            return
+
+        worker = SceneWorker(path, ffmpeg_path, self.video_fps, parent=self)
+        worker.built.connect(self.onScenesBuilt)
+        worker.finished.connect(functools.partial(self.onSceneWorkerFinished, worker))
+        self.scene_workers.append(worker)
+        worker.start()
+
+    def onScenesBuilt(self, path, scenes):
+        """
+        Marks the given scene cuts and high motion on the filmstrip, unless another video was opened while
+        they were being found.
+
+        Args:
+            path (string): Path to video that was analyzed.
+
+            scenes (SceneAnalysis): Cuts and high motion segments of the video.
+        """
+        if path != self.current_video:
+            return
+
+        self.scenes = scenes
+        self.filmstrip.setScenes(scenes)
+
+    def onSceneWorkerFinished(self, worker):
+        """
+        Lets go of the given scene worker once its thread is done.
+
+        Args:
+            worker (SceneWorker): Worker that finished.
+        """
+        self.scene_workers.remove(worker)
+        worker.deleteLater()
+
+    def getSceneBoundary(self, direction=0):
+        """
+        Gets the suggested boundary, a scene cut or where high motion starts or ends, near where the video is at.
+
+        Args:
+            direction (int): 0 for the nearest boundary, 1 for the next one, -1 for the previous one.
+
+        Returns:
+            (float): Seconds of the boundary, snapped to its frame if the frame index is built. None if there is none.
+        """
+        if not self.scenes:
+            return None
+
+        seconds = gifutil.toSeconds(self.player.position(), text=False)
+        if direction > 0:
+            boundary = self.scenes.getNext(seconds)
+        elif direction < 0:
+            boundary = self.scenes.getPrevious(seconds)
+        else:
+            boundary = self.scenes.getNearest(seconds)
+
+        if boundary is not None and self.frame_index:
+            boundary = self.frame_index.snap(boundary)
+
+        return boundary
+
+    def jumpToScene(self, direction):
+        """
+        Pauses the video and moves to the next or previous suggested boundary.
+
+        Args:
+            direction (int): 1 for the next boundary, -1 for the previous one.
+        """
+        boundary = self.getSceneBoundary(direction)
+        if boundary is not None:
+            self.scrubTo(toMilliseconds(boundary, round_up=True))
+
+    def snapStartToScene(self):
+        """
+        Sets the start cut to the suggested boundary nearest where the video is at, and moves the video there.
+        """
+        boundary = self.getSceneBoundary()
+        if boundary is not None:
+            self.scrubTo(toMilliseconds(boundary, round_up=True))
+            self.setStart(boundary)
+
+    def snapEndToScene(self):
+        """
+        Sets the end cut to the suggested boundary nearest where the video is at, and moves the video there.
+        """
+        boundary = self.getSceneBoundary()
+        if boundary is not None:
+            self.scrubTo(toMilliseconds(boundary, round_up=True))
+            self.setEnd(boundary)
+
+    def getSnappedSeconds(self, position=None):
+        """
+        Gets the given position in seconds, snapped to the start of the frame showing there if the frame index is built.
+
+        Args:
+            position (int): Position in milliseconds. If None, uses the player's position.
+
+        Returns:
+            (float): Seconds from the start of the video.
+        """
+        position = self.player.position() if position is None else position
+        seconds = gifutil.toSeconds(position, text=False)
+        return self.frame_index.snap(seconds) if self.frame_index else seconds
+
+    def setPlayerPosition(self, position):
+        """
+        Moves the player to the given position, snapped to the start of the frame showing there if the frame index is
+        built. Rounded up to the next millisecond, so the player lands inside the frame rather than just before it.
+
+        Args:
+            position (int or float): Position in milliseconds.
+        """
+        if self.frame_index:
+            position = toMilliseconds(self.getSnappedSeconds(position), round_up=True)
+
+        self.player.setPosition(position)
+
+    def scrubTo(self, position):
+        """
+        Pauses the video and moves it to the given position, such as where the filmstrip was clicked.
+
+        Args:
+            position (int): Position in milliseconds.
+        """
+        self.pauseVideo()
+        self.setPlayerPosition(position)
+
+    def stepFrames(self, frames):
+        """
+        Pauses the video and moves the given amount of frames. Exact if the frame index is built,
+        otherwise moves by the frame rate.
+
+        Args:
+            frames (int): Frames to move, negative moves back.
+        """
+        if not self.frame_index:
+            if frames > 0:
+                self.skipForward(self.video_fpms * frames)
+            else:
+                self.skipBackward(self.video_fpms * -frames)
+            return
+
+        self.pauseVideo()
+        seconds = self.frame_index.step(gifutil.toSeconds(self.player.position(), text=False), frames)
+        self.player.setPosition(toMilliseconds(seconds, round_up=True))
+
     def setVideoAndPlay(self, file_path, update_video_info=True):
         """
         Plays the video at the given file_path, updates icons, video info, display info.
@@ -377,7 +693,7 @@ class MainWindow(QtWidgets.QDialog):
         if position < duration:
             new_position = position + amount
             new_position = duration if position > duration else new_position
-            self.player.setPosition(new_position)
+            self.setPlayerPosition(new_position)
 
     def skipBackward(self, amount, pause=True):
         """
@@ -395,7 +711,7 @@ class MainWindow(QtWidgets.QDialog):
         if position > 0:
             new_position = position - amount
             new_position = 0 if new_position < 0 else new_position
-            self.player.setPosition(new_position)
+            self.setPlayerPosition(new_position)
 
     def onPlayStateChanged(self, state):
         """
@@ -417,6 +733,7 @@ class MainWindow(QtWidgets.QDialog):
             position (int): Time in milliseconds video is at.
         """
         self.slider.setValue(position)
+        self.filmstrip.setPosition(position)
         self.current_time.setText(gifutil.toSeconds(position))
 
     def onDurationChanged(self, duration):
@@ -436,6 +753,8 @@ class MainWindow(QtWidgets.QDialog):
         self.start_slider.setValue(0)
         self.start_label.setText('0')
         self.updateCurrentLength()
+        self.previewer.reset()
+        self.clearClips()
 
     def updateCurrentLength(self):
         """
@@ -449,240 +768,217 @@ class MainWindow(QtWidgets.QDialog):
 
     def setStartFrame(self):
         """
-        Sets the start cut for where the .gif should start.
+        Sets the start cut for where the .gif should start, at the start of the frame showing.
+        """
+        self.setStart(self.getSnappedSeconds())
+
+    def setStart(self, position):
+        """
+        Sets the start cut for where the .gif should start, kept before the end cut.
+
+        Args:
+            position (float): Seconds from the start of the video, at the start of a frame.
         """
-        position = gifutil.toSeconds(self.player.position(), text=False)
         end_position = float(self.end_label.text())
 
         if position >= end_position:
             position = end_position - 0.01
 
-        self.start_label.setText(f'{position:0.3}')
-        self.start_slider.setValue(position * 1000.0)
+        # rounded down so ffmpeg.exe seeking to the start still includes the frame, the label shows the same time
+        milliseconds = toMilliseconds(position)
+        self.start_label.setText(f'{milliseconds / 1000.0:0.3f}')
+        self.start_slider.setValue(milliseconds)
         self.updateCurrentLength()
+        self.requestPreview()
 
     def setEndFrame(self):
         """
-        Sets the end cut for when the .gif should end.
+        Sets the end cut for when the .gif should end, at the start of the frame showing.
+        """
+        self.setEnd(self.getSnappedSeconds())
+
+    def setEnd(self, position):
+        """
+        Sets the end cut for when the .gif should end, kept after the start cut.
+
+        Args:
+            position (float): Seconds from the start of the video, at the start of a frame.
         """
-        position = gifutil.toSeconds(self.player.position(), text=False)
         start_position = float(self.start_label.text())
 
         if position <= start_position:
             position = start_position + 0.01
 
-        self.end_label.setText(f'{position:0.3}')
-        self.end_slider.setValue(position * 1000.0)
+        milliseconds = toMilliseconds(position)
+        self.end_label.setText(f'{milliseconds / 1000.0:0.3f}')
+        self.end_slider.setValue(milliseconds)
         self.updateCurrentLength()
+        self.requestPreview()
 
-    def validatePath(self, path, name, raise_error=False, gifsicle=False):
+    def onCropChanged(self, crop):
         """
-        Mainly used to validate the path of ffmpeg, convert, and/or gifsicle.
+        Shows the crop the user dragged over the video and previews it.
 
         Args:
-            path (string): Path to check and see if exists.
-
-            name (string): Name of program we are validating, used to display error for user.
-
-            raise_error (boolean): If True, will raise error to console.
-
-            gifsicle (boolean): Adds extra string to tell user we export and unoptimized gif.
-
-        Returns:
-            (boolean): True if path exists, False if path does NOT exist.
+            crop (list): x, y, width, and height in video pixels. None if the crop was cleared.
         """
-        if os.path.exists(path):
-            return True
+        if crop:
+            x, y, width, height = crop
+            self.info_label.setText(f'Cropping to {width}x{height} at {x}, {y}. Right click the video to clear')
+            self.info_label.setStyleSheet('color: black')
         else:
-            error_message = 'Invalid ' + name + ' path! Please set the location of ' + name + ' in the settings!'
-            error_message = error_message + ' Exported UNOPTIMIZED .gif' if gifsicle else error_message
-            self.displayError(error_message)
-            if raise_error:
-                raise ValueError(error_message)
-            else:
-                return False
+            self.info_label.setText('')
+
+        self.requestPreview()
 
-    def finishedExporting(self):
+    def addClip(self):
         """
-        Displays that video finished exporting, closes export window.
+        Adds the range from start to end as a clip to export along with the other clips.
         """
-        if self.timer:
-            self.timer.cancel()
+        if not self.current_video:
+            return
 
-        self.exporting_window.close()
-        self.info_label.setText('Finished Exporting')
-        self.info_label.setStyleSheet('color: black')
-        self.timer = threading.Timer(5.0, self.clearInfoDisplay)
-        self.timer.start()
+        clip = (self.start_slider.value() / 1000.0, self.end_slider.value() / 1000.0)
+        if clip[1] <= clip[0] or clip in self.clips:
+            return
 
-    def writeGif(self, path, colors=256):
+        self.clips.append(clip)
+        self.updateClips()
+
+    def clearClips(self):
+        """
+        Removes every clip, so exporting exports the range from start to end again.
         """
-        This is where the magic happens. Writes a .gif from to given path using ffmpeg.
+        self.clips = []
+        self.updateClips()
 
-        Args:
-            path (string): Where we should write the .gif to.
+    def updateClips(self):
+        """
+        Shows how many clips will export and where they are along the filmstrip.
+        """
+        self.clips_label.setText(str(len(self.clips)) + ' clips will export together' if self.clips else '')
+        self.filmstrip.setClips(self.clips)
 
-            colors (int): Must be exponent of 2. Used to optimize .gif when using gifsicle.exe
+    def requestPreview(self):
         """
-        if not path:
-            self.displayError('No video has been loaded! Please load video.', raise_error=True)
+        Asks the previewer to render the range about to be exported once the user stops setting start and end.
+        """
+        data = self.settings_store.getData()
+        self.previewer.setVisible(data['preview'])
 
-        # get the data
-        data = self.settings.getData()
-        ffmpeg_path = data['ffmpeg']
-        convert_path = data['convert']
-        gifsicle_path = data['gifsicle']
-        use_convert = data['use_convert']
-        use_gifsicle = data['use_gifsicle']
+        if not data['preview'] or not self.current_video or not os.path.exists(data['ffmpeg']):
+            self.previewer.reset()
+            return
 
-        # ffmpeg.exe is required for gif conversion to work
-        if not self.validatePath(ffmpeg_path, 'ffmpeg.exe'):
+        job = self.getExportJob('')
+        if job.length <= 0:
+            self.previewer.reset()
             return
 
-        # make temp directory to store everything we could make
-        temp_directory = tempfile.mkdtemp()
-        png_directory = os.path.join(temp_directory, 'pngs')
-        temp_gif_path = os.path.join(temp_directory, 'Temp.gif')
-        temp_gifsicle_path = os.path.join(temp_directory, 'TempOptimized.gif')
-        png_path = os.path.join(png_directory, 'temp_image%04d.png')
-        os.makedirs(png_directory)
-
-        # if True, we convert video to .png and then make a .gif from the .pngs
-        if use_convert:
-
-            # validate that convert.exe has been set correctly
-            if not self.validatePath(convert_path, 'convert.exe'):
-                shutil.rmtree(temp_directory)
-                return
-
-            # convert video to .png using ffmpeg.exe, then convert .png to .gif using convert.exe
-            try:
-                self.exporting_window.show()
-                self.ffmpegVideoToPng(ffmpeg_path, self.current_video, png_path)
-                self.convertPngToGif(convert_path, png_directory, temp_gif_path)
-            except Exception:
-                # clean up and display error before raising error
-                shutil.rmtree(temp_directory)
-                self.displayError('Using ffmpeg.exe and/or convert.exe failed! ')
-                self.exporting_window.close()
-                raise
-
-        # if False, we convert video to .gif without extracting each frame
-        else:
-            try:
-                # convert video to .gif using ffmpeg.exe
-                self.exporting_window.show()
-                self.ffmpegCreateGif(ffmpeg_path, self.current_video, temp_gif_path)
-            except Exception:
-                # clean up and display error before raising error
-                shutil.rmtree(temp_directory)
-                self.displayError('ffmpeg.exe failed! ')
-                self.exporting_window.close()
-                raise
-
-        # gifsicle attempts to optimize .gif size
-        if use_gifsicle:
-            if not self.validatePath(gifsicle_path, 'gifsicle.exe', gifsicle=True):
-                return
-
-            # use gifsicle to create new optimized .gif
-            try:
-                self.gifsicleOptimize(gifsicle_path, temp_gif_path, temp_gifsicle_path, colors)
-                temp_gif_path = temp_gifsicle_path
-            except Exception:
-                # display failure in case we fail, but continue to export unoptimized gif
-                self.displayError('gifsicle.exe failed! Exported UNOPTIMIZED .gif')
-
-        # this is essentially overwriting the path
-        if os.path.exists(path):
-            os.remove(path)
-
-        # move exported .gif to desired path, remove temp directories, print finished
-        os.rename(temp_gif_path, path)
-        shutil.rmtree(temp_directory)
-        self.finishedExporting()
-
-        if data['auto_close']:
-            self.close()
-
-    def ffmpegCreateGif(self, ffmpeg_path, input_path, output):
-        """
-        Creates .gif using ffmpeg.exe only
+        self.previewer.request(job, data['ffmpeg'])
+
+    def finishedExporting(self, queued_job):
+        """
+        Displays whether a queued export finished, failed, or was cancelled. Called when the export queue is done
+        with a job. May close giffer.exe if the queue has nothing left to export.
 
         Args:
-            ffmpeg_path (string): Path to ffmpeg.exe
+            queued_job (QueuedJob): Job the export queue is done with.
+        """
+        if self.timer:
+            self.timer.cancel()
 
-            input_path (string): Path to video that we are grabbing footage from.
+        name = os.path.basename(queued_job.job.output)
+
+        # warnings such as gifsicle failing still export the unoptimized .gif, so let the user know
+        if queued_job.status == QueuedJob.FINISHED and not queued_job.message:
+            notes = ' - ' + queued_job.notes if queued_job.notes else ''
+            self.info_label.setText('Finished Exporting ' + name + notes)
+            self.info_label.setStyleSheet('color: black')
+            self.timer = threading.Timer(5.0, self.clearInfoDisplay)
+            self.timer.start()
+        elif queued_job.status == QueuedJob.CANCELLED:
+            self.displayError('Cancelled exporting ' + name)
+        else:
+            self.displayError(queued_job.status + ' exporting ' + name + ': ' + queued_job.message)
 
-            output (string): Path to export .gif to. NOTE: Will NOT overwrite.
-        """
-        ffmpeg_command = '"%(FFMPEG_PATH)s" -ss %(START_TIME)s -t %(LENGTH)s -i "%(INPUT_PATH)s" -filter_complex "[0:v] fps=%(FPS)i,split [a][b];[a] palettegen [p];[b][p] paletteuse" "%(OUTPUT_PATH)s"' % \
-                         {
-                             'FFMPEG_PATH': ffmpeg_path,
-                             'START_TIME': self.start_label.text(),
-                             'LENGTH': str(float(self.end_label.text()) - float(self.start_label.text())),
-                             'INPUT_PATH': input_path,
-                             'FPS': self.video_fps,
-                             'OUTPUT_PATH': output
-                         }
-        subprocess.check_call(ffmpeg_command, shell=True)
+        if queued_job.status == QueuedJob.FINISHED and not self.export_queue.isBusy():
+            if self.settings_store.getData()['auto_close']:
+                self.close()
 
-    def ffmpegVideoToPng(self, ffmpeg_path, input_path, output):
+    def getExportJob(self, path, colors=256, clip=None):
         """
-        Converts given input_path to a .png image sequence.
+        Gets the job that describes exporting the current video from start to end with the current settings.
 
         Args:
-            ffmpeg_path (string): Path to ffmpeg.exe
+            path (string): Where we should write the .gif to.
+
+            colors (int): Must be exponent of 2. Used to optimize .gif when using gifsicle.exe
 
-            input_path (string): Path to video that we are grabbing footage from.
+            clip (tuple): Start and end in seconds to export instead of the start and end sliders.
 
-            output (string): Path to export .png image sequence to. NOTE the file name convention, e.g: temp_image%04d.png
+        Returns:
+            (ExportJob): Job that the GifExporter can export without needing the UI.
         """
-        ffmpeg_command = '"%(FFMPEG_PATH)s" -ss %(START_TIME)s -t %(LENGTH)s -i "%(INPUT_PATH)s" "%(OUTPUT_PATH)s"' % \
-                         {
-                             'FFMPEG_PATH': ffmpeg_path,
-                             'START_TIME': self.start_label.text(),
-                             'LENGTH': str(float(self.end_label.text()) - float(self.start_label.text())),
-                             'INPUT_PATH': input_path,
-                             'OUTPUT_PATH': output
-                         }
-        subprocess.check_call(ffmpeg_command, shell=True)
+        data = self.settings_store.getData()
+        backend = 'numpy' if data['use_numpy'] else 'convert' if data['use_convert'] else 'ffmpeg'
+        start, end = clip if clip else (self.start_slider.value() / 1000.0, self.end_slider.value() / 1000.0)
+
+        # the max size is only for .gifs, other formats are already a fraction of the size
+        max_size = int(data['max_size'] * 1024 * 1024) if data['format'] == 'gif' else None
+
+        # duplicates are only dropped from .gifs, by every backend but convert.exe
+        dedupe = DEDUPE_THRESHOLD if data['dedupe'] and data['format'] == 'gif' and backend != 'convert' else None
+        return ExportJob(self.current_video,
+                         path,
+                         start=start,
+                         end=end,
+                         fps=self.video_fps,
+                         colors=colors,
+                         backend=backend,
+                         optimize=data['use_gifsicle'],
+                         stream=data['stream_convert'],
+                         max_size=max_size,
+                         width=data['width'],
+                         height=data['height'],
+                         crop=self.crop_selector.crop,
+                         format=data['format'],
+                         dedupe=dedupe)
 
-    def convertPngToGif(self, convert_path, png_directory, output_gif):
+    def writeGif(self, path, colors=256):
         """
-        Converts a directory filled with an image sequence to .gif using convert.exe
+        This is where the magic happens. Adds a job to write a .gif to the given path to the export queue.
+        The job is a snapshot of the current video, start, end, and settings, so the user can carry on marking clips.
+        If clips were added, every clip is queued instead, numbered after the given path, and exported together.
 
         Args:
-            convert_path (string): Path to imagemagick's convert.exe
-
-            png_directory (string): Path to directory with image sequence in it.
-
-            output_gif (string): Path to export .gif to.
-        """
-        create_gif_command = '"%(CONVERT_PATH)s" -background gray -alpha remove -alpha off -delay 1x%(FPS)i "%(TEMP)s" "%(OUTPUT_GIF_FILENAME)s"' % \
-                             {
-                                 'CONVERT_PATH': convert_path,
-                                 'FPS': self.video_fps,
-                                 'TEMP': os.path.join(png_directory, '*.png'),
-                                 'OUTPUT_GIF_FILENAME': output_gif
-                             }
-        subprocess.check_call(create_gif_command, shell=True)
+            path (string): Where we should write the .gif to. Numbered if a queued job is already exporting there.
 
-    @staticmethod
-    def gifsicleOptimize(gifsicle_path, input_path, output_path, colors=256):
+            colors (int): Must be exponent of 2. Used to optimize .gif when using gifsicle.exe
         """
-        Runs gifsicle.exe on given input_path .gif to optimize it. Works sometimes. Especially if colors is <= 64
+        if not path:
+            self.displayError('No video has been loaded! Please load video.', raise_error=True)
 
-        Args:
-            gifsicle_path (string): Path to gifsicle.exe
+        data = self.settings_store.getData()
+        tools = {'ffmpeg': data['ffmpeg'], 'convert': data['convert'], 'gifsicle': data['gifsicle']}
 
-            input_path (string): Path of .gif to optimize.
+        if self.clips:
+            file_name, extension = os.path.splitext(path)
+            jobs = []
+            for number, clip in enumerate(self.clips, 1):
+                clip_path = self.export_queue.getUniquePath(file_name + '_' + str(number) + extension)
+                jobs.append(self.getExportJob(clip_path, colors, clip))
 
-            output_path (string): Path to export .gif to. NOTE: will NOT overwrite, must be different than input path.
+            self.export_queue.addClips(jobs, tools)
+            self.clearClips()
+            self.info_label.setText('Queued ' + str(len(jobs)) + ' clips of ' + os.path.basename(self.current_video))
+        else:
+            job = self.getExportJob(self.export_queue.getUniquePath(path), colors)
+            self.export_queue.add(job, tools)
+            self.info_label.setText('Queued ' + os.path.basename(job.output))
 
-            colors (int): Must be exponent of 2. Colors that final .gif will have.
-        """
-        subprocess.check_call('"' + gifsicle_path + '" -i "' + input_path + '" -O3 --colors ' + str(colors) + ' -o "' + output_path + '"', shell=True)
+        self.info_label.setStyleSheet('color: black')
+        self.showQueue()
 
     def saveGif(self):
         """
@@ -690,12 +986,13 @@ class MainWindow(QtWidgets.QDialog):
         Will export .gif
         """
         dialog = QtWidgets.QFileDialog()
-        save_path = dialog.getSaveFileName(self, 'Save Gif')
+        save_path, _ = dialog.getSaveFileName(self, 'Save Gif')
 
         if not save_path:
             return
 
-        save_path = save_path if save_path.endswith('.gif') else save_path + '.gif'
+        extension = FORMAT_EXTENSIONS[self.settings_store.getData()['format']]
+        save_path = save_path if save_path.lower().endswith(extension) else save_path + extension
         self.writeGif(save_path)
 
     def getExportPath(self):
@@ -709,10 +1006,9 @@ class MainWindow(QtWidgets.QDialog):
         if not self.current_video:
             return ''
 
-        data = self.settings.getData()
+        data = self.settings_store.getData()
         export_directory = data['export'] if data['export'] else os.path.dirname(self.current_video)
-        file_name, _ = os.path.splitext(self.current_video)
-        export_path = os.path.join(export_directory, os.path.basename(file_name + '.gif'))
+        export_path = gifutil.getExportName(self.current_video, export_directory, FORMAT_EXTENSIONS[data['format']])
         export_path = export_path.replace('\\', '/')
         return export_path
 
@@ -746,24 +1042,54 @@ class MainWindow(QtWidgets.QDialog):
             self.skipForward(self.skip_range, False)
         elif key == QtCore.Qt.Key_Period:
             # pause video, move forward one frame
-            self.skipForward(self.video_fpms)
+            self.stepFrames(1)
         elif key == QtCore.Qt.Key_Comma:
             # pause video, move back one frame
-            self.skipBackward(self.video_fpms)
+            self.stepFrames(-1)
+        elif key == QtCore.Qt.Key_BracketRight:
+            # pause video, move to the next scene cut or motion boundary
+            self.jumpToScene(1)
+        elif key == QtCore.Qt.Key_BracketLeft:
+            # pause video, move to the previous scene cut or motion boundary
+            self.jumpToScene(-1)
+        elif key == QtCore.Qt.Key_Q:
+            # set start to the nearest scene cut or motion boundary
+            self.snapStartToScene()
+        elif key == QtCore.Qt.Key_R:
+            # set end to the nearest scene cut or motion boundary
+            self.snapEndToScene()
 
         event.accept()
 
     def closeEvent(self, event):
         """
-        Overwriting close event to close possible about or settings windows that may be open.
+        Overwriting close event to stop the export queue and close possible about, settings, or queue windows.
+        Exports stopped by closing stay in the queue and start again the next time giffer.exe launches.
 
         Args:
             event (QEvent): Accepting when other windows are closed.
         """
-        self.settings.close()
-        self.settings.deleteLater()
+        self.export_queue.stop()
+
+        # frame indexes may still be building, ffprobe.exe is killed at the next packet once cancelled
+        for worker in self.frame_index_workers:
+            worker.cancel()
+            worker.wait()
+
+        # scene analysis stops at the next chunk of frames once cancelled
+        for worker in self.scene_workers:
+            worker.cancel()
+            worker.wait()
+
+        self.filmstrip.wait()
+        self.previewer.stop()
+
+        for window in (self.queue_window, self.settings, self.about):
+            if window:
+                window.close()
+                window.deleteLater()
 
-        self.about.close()
-        self.about.deleteLater()
+        # settings are saved a moment after they change, save any the user changed right before closing
+        self.settings_store.save()
 
         event.accept()
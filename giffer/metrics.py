@@ -0,0 +1,252 @@
+import os
+import time
+import json
+import logging
+import contextlib
+import logging.handlers
+import giffer.gifutil as gifutil
+
+# resource only exists on linux and mac, cpu time of child processes is left empty on windows
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# each log file holds a few thousand exports before it is rotated
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+
+def getChildCpuTime():
+    """
+    Gets the CPU seconds used by every child process this process has waited on. Shared by every thread,
+    so exports running at the same time count each other's processes too.
+
+    Returns:
+        (float): User and system CPU seconds, None on windows.
+    """
+    if not resource:
+        return None
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def getPathSize(path):
+    """
+    Gets how many bytes the given file, or every file in the given directory, takes up.
+
+    Args:
+        path (string or list): File or directory, or a list of them to add up.
+
+    Returns:
+        (int): Bytes, None if the path does not exist.
+    """
+    if isinstance(path, (list, tuple)):
+        sizes = [size for size in (getPathSize(each) for each in path) if size is not None]
+        return sum(sizes) if sizes else None
+
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    if not os.path.isdir(path):
+        return None
+
+    total = 0
+    for root, _, file_names in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, file_name)) for file_name in file_names)
+
+    return total
+
+
+class StageRecord(object):
+    """
+    How long one stage of an export took and how much it handled.
+    """
+    def __init__(self, stage, seconds=0.0, cpu_seconds=None, bytes_in=None, bytes_out=None, frames=None):
+        """
+        Args:
+            stage (string): Name of the stage, e.g. "palette"
+
+            seconds (float): Wall clock seconds the stage took.
+
+            cpu_seconds (float): CPU seconds of the export's thread plus the child processes the stage waited on.
+            None if unknown.
+
+            bytes_in (int): Bytes the stage read. None if unknown.
+
+            bytes_out (int): Bytes the stage wrote. None if unknown.
+
+            frames (int): Frames the stage handled. None if unknown.
+        """
+        self.stage = stage
+        self.seconds = seconds
+        self.cpu_seconds = cpu_seconds
+        self.bytes_in = bytes_in
+        self.bytes_out = bytes_out
+        self.frames = frames
+
+    def toDict(self):
+        """
+        Gets the record as a dictionary so it can be written to .json
+
+        Returns:
+            (dictionary): StageRecord arguments as keys.
+        """
+        return {'stage': self.stage,
+                'seconds': self.seconds,
+                'cpu_seconds': self.cpu_seconds,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'frames': self.frames}
+
+
+class ExportMetrics(object):
+    """
+    Times every stage of exporting one job, so a slow export shows which stage was slow.
+    """
+    def __init__(self, job):
+        """
+        Args:
+            job (ExportJob): Job being exported.
+        """
+        self.job = job
+        self.records = []
+        self.current = None
+        self.started = time.time()
+        self.seconds = None
+
+    @contextlib.contextmanager
+    def stage(self, name, bytes_in=None, output=None):
+        """
+        Times the code run inside the with block as the given stage.
+
+        Args:
+            name (string): Name of the stage.
+
+            bytes_in (int): Bytes the stage reads, if known up front.
+
+            output (string or list): File or directory the stage writes, or a list of them,
+            measured once the stage is done.
+
+        Returns:
+            (StageRecord): Record of the stage.
+        """
+        record = StageRecord(name, bytes_in=bytes_in)
+        self.current = record
+        started = time.perf_counter()
+        thread_started = time.thread_time()
+        children_started = getChildCpuTime()
+
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - started
+            record.cpu_seconds = time.thread_time() - thread_started
+            if children_started is not None:
+                record.cpu_seconds += getChildCpuTime() - children_started
+
+            if output:
+                record.bytes_out = getPathSize(output)
+
+            self.records.append(record)
+            self.current = None
+
+    def setFrames(self, frames):
+        """
+        Sets how many frames the running stage has handled so far, called as progress is reported.
+
+        Args:
+            frames (int): Frames handled so far.
+        """
+        if self.current and frames:
+            self.current.frames = frames
+
+    def finish(self):
+        """
+        Marks the export as done, whether it finished, failed, or was cancelled.
+        """
+        self.seconds = time.time() - self.started
+
+    def toDict(self):
+        """
+        Gets the machine readable summary of the export.
+
+        Returns:
+            (dictionary): Source, output, backend, total seconds, and every stage's record.
+        """
+        return {'source': self.job.source,
+                'output': self.job.output,
+                'backend': self.job.backend,
+                'started': self.started,
+                'seconds': self.seconds,
+                'stages': [record.toDict() for record in self.records]}
+
+    def describe(self):
+        """
+        Gets the stages as text to show the user, slowest first.
+
+        Returns:
+            (string): One line per stage with its seconds and share of the total.
+        """
+        total = sum(record.seconds for record in self.records) or 1.0
+        lines = []
+
+        for record in sorted(self.records, key=lambda record: record.seconds, reverse=True):
+            line = f'{record.stage:<16}{record.seconds:>8.2f}s{100.0 * record.seconds / total:>6.0f}%'
+            if record.cpu_seconds is not None:
+                line += f'{record.cpu_seconds:>8.2f}s cpu'
+            if record.frames:
+                line += f'{record.frames:>7} frames'
+            if record.bytes_out is not None:
+                line += f'{record.bytes_out / 1024.0:>10.0f}KB out'
+            lines.append(line)
+
+        return '\n'.join(lines)
+
+
+def getLogPath():
+    """
+    Gets the path to the log export metrics are written to.
+
+    Returns:
+        (string): Path to giffer_metrics.log next to giffer.exe
+    """
+    return os.path.join(os.path.dirname(gifutil.getCurrentPath()), 'giffer_metrics.log')
+
+
+def getLogger():
+    """
+    Gets the logger that writes every export's metrics as one line of .json to a rotating log.
+    The log file is only opened the first time this is called.
+
+    Returns:
+        (logging.Logger): Logger for export metrics.
+    """
+    logger = logging.getLogger('giffer.metrics')
+
+    if not logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(getLogPath(), maxBytes=LOG_MAX_BYTES,
+                                                       backupCount=LOG_BACKUP_COUNT, delay=True)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    return logger
+
+
+def logMetrics(metrics, status):
+    """
+    Writes the given metrics to the rotating log. Failing to write never fails the export.
+
+    Args:
+        metrics (ExportMetrics): Metrics of the export.
+
+        status (string): How the export ended, e.g. "finished", "failed", or "cancelled"
+    """
+    try:
+        getLogger().info(json.dumps(dict(metrics.toDict(), status=status)))
+    except (OSError, ValueError):
+        pass
@@ -0,0 +1,87 @@
+import numpy
+from giffer.gifstream import MAX_DELAY
+
+
+def getChangedBounds(previous, current):
+    """
+    Gets the smallest rectangle holding every pixel that differs between the given frames.
+
+    Args:
+        previous (numpy.ndarray): (H, W) uint8 palette indices showing before the current frame.
+
+        current (numpy.ndarray): (H, W) uint8 palette indices of the frame to show next.
+
+    Returns:
+        (tuple): Top, bottom, left, right of the changed rectangle, bottom and right exclusive. None if nothing changed.
+    """
+    changed = previous != current
+    rows = numpy.flatnonzero(changed.any(axis=1))
+
+    if not len(rows):
+        return None
+
+    columns = numpy.flatnonzero(changed.any(axis=0))
+    return rows[0], rows[-1] + 1, columns[0], columns[-1] + 1
+
+
+class FrameOptimizer(object):
+    """
+    Writes frames to a GifWriter as only the rectangle that changed since the last frame, with pixels that did not
+    change inside it made transparent. Long runs of the transparent index compress far better than the noise they
+    replace. Frames that do not change at all are merged into the frame before by adding up their delays, up to
+    the longest delay a .gif can hold.
+    Works one frame at a time, so frames are optimized as they are encoded instead of after the .gif is written.
+    """
+    def __init__(self, writer, transparent):
+        """
+        Args:
+            writer (GifWriter): Writer to write the optimized frames to.
+
+            transparent (int): Palette index no frame uses, shown as transparent.
+        """
+        self.writer = writer
+        self.transparent = transparent
+        self.previous = None
+        self.pending = None
+
+    def addFrame(self, indices, delay):
+        """
+        Adds the next frame. Frames are held back one frame, since the delay of a frame grows if the next is the same.
+
+        Args:
+            indices (numpy.ndarray): (H, W) uint8 palette indices of the whole frame.
+
+            delay (int): Hundredths of a second to show the frame for.
+        """
+        # first frame is always written whole, it is what every other frame draws on top of
+        if self.previous is None:
+            self.pending = [indices, delay, 0, 0, None]
+            self.previous = indices
+            return
+
+        bounds = getChangedBounds(self.previous, indices)
+        if bounds is None and self.pending[1] + delay <= MAX_DELAY:
+            self.pending[1] += delay
+            return
+
+        # a frame that did not change but would overflow the delay is written as a 1x1 transparent pixel
+        self.flush()
+        if bounds is None:
+            bounds = (0, 1, 0, 1)
+
+        top, bottom, left, right = bounds
+        rectangle = indices[top:bottom, left:right].copy()
+        rectangle[self.previous[top:bottom, left:right] == rectangle] = self.transparent
+        self.pending = [rectangle, delay, left, top, self.transparent]
+        self.previous = indices
+
+    def flush(self):
+        """
+        Writes the frame being held back, call once all frames are added.
+        """
+        if self.pending is None:
+            return
+
+        indices, delay, left, top, transparent = self.pending
+        self.writer.writeFrame(indices, delay, left, top, transparent)
+        self.pending = None
@@ -0,0 +1,220 @@
+import os
+import shutil
+import functools
+import tempfile
+from giffer.exporter import ExportJob, GifExporter, getIntermediateCache
+from giffer.worker import ExportWorker
+from PySide2 import QtWidgets, QtGui, QtCore
+
+
+# milliseconds the range has to stay the same before a preview is rendered
+PREVIEW_DELAY = 750
+
+# previews are small and choppy so they render in a fraction of the time of the real export
+PREVIEW_WIDTH = 240
+PREVIEW_FPS = 10
+
+# long ranges drop their preview fps so a preview never has more frames than this
+MAX_PREVIEW_FRAMES = 150
+
+
+def getPreviewJob(job, output, width=PREVIEW_WIDTH):
+    """
+    Gets the job that renders a quick, low resolution, reduced fps preview of the given job with ffmpeg.exe only.
+    Keeps the job's range, crop, stats mode, dither, and dedupe so the preview looks like the real export.
+
+    Args:
+        job (ExportJob): Job to preview.
+
+        output (string): Path to export the preview .gif to.
+
+        width (int): Pixels wide to scale the preview to.
+
+    Returns:
+        (ExportJob): Job for the preview.
+    """
+    fps = min(job.fps or PREVIEW_FPS, PREVIEW_FPS)
+    if job.length:
+        fps = min(fps, max(MAX_PREVIEW_FRAMES / job.length, 1.0))
+
+    # a job scaled to both a width and a height is stretched, so the preview is stretched the same
+    height = None
+    if job.width and job.height:
+        height = max(int(round(job.height * width / float(job.width) / 2.0)) * 2, 2)
+
+    return ExportJob(job.source,
+                     output,
+                     start=job.start,
+                     end=job.end,
+                     fps=fps,
+                     backend='ffmpeg',
+                     stats_mode=job.stats_mode,
+                     dither=job.dither,
+                     width=width,
+                     height=height,
+                     crop=job.crop,
+                     dedupe=job.dedupe)
+
+
+class Previewer(QtWidgets.QLabel):
+    """
+    Shows a looping preview .gif of the range about to be exported. Previews are rendered in the background once
+    the range stops changing for PREVIEW_DELAY milliseconds, and a preview still rendering is cancelled as soon as
+    the range changes again, so only the latest range is ever shown.
+    """
+    def __init__(self, parent=None):
+        """
+        Args:
+            parent (QWidget): Parent of the previewer.
+        """
+        super(Previewer, self).__init__(parent=parent)
+        self.setFixedWidth(PREVIEW_WIDTH)
+        self.setAlignment(QtCore.Qt.AlignCenter)
+        self.setText('Preview')
+        self.pending = None
+        self.current = None
+        self.workers = []
+        self.movie = None
+        self.buffer = None
+        self.rendered = 0
+        self.temp_directory = ''
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(PREVIEW_DELAY)
+        self.timer.timeout.connect(self.render)
+
+    def request(self, job, ffmpeg_path):
+        """
+        Renders a preview of the given job once no other preview is requested for PREVIEW_DELAY milliseconds.
+        Cancels the preview being rendered, since it is for a range that is no longer selected.
+
+        Args:
+            job (ExportJob): Job to preview.
+
+            ffmpeg_path (string): Path to ffmpeg.exe
+        """
+        self.cancel()
+        self.pending = (job, ffmpeg_path)
+        self.timer.start()
+
+    def render(self):
+        """
+        Starts rendering the last requested preview in the background.
+        """
+        if not self.pending:
+            return
+
+        job, ffmpeg_path = self.pending
+        self.pending = None
+
+        if not self.temp_directory:
+            self.temp_directory = tempfile.mkdtemp(prefix='giffer_preview_')
+
+        # every preview gets its own .gif, so a cancelled one still being cleaned up never clashes with the next
+        self.rendered += 1
+        output = os.path.join(self.temp_directory, 'preview' + str(self.rendered) + '.gif')
+        width = min(PREVIEW_WIDTH, self.width())
+
+        # previews are short, so one ffmpeg.exe leaves the other cores to any exports running
+        # a range already exported is read from its intermediate, but every slider change is a new range, so
+        # previews never pay for cutting one
+        exporter = GifExporter(ffmpeg_path, max_segments=1, intermediate_cache=getIntermediateCache(),
+                               cut_intermediates=False)
+        exporter.log_metrics = False
+        worker = ExportWorker(exporter, getPreviewJob(job, output, width), parent=self)
+        worker.succeeded.connect(functools.partial(self.onRendered, worker))
+        worker.finished.connect(functools.partial(self.onWorkerFinished, worker))
+        self.workers.append(worker)
+        self.current = worker
+        self.setText('Rendering preview...')
+        worker.start()
+
+    def onRendered(self, worker, result):
+        """
+        Shows the rendered preview, unless the range changed while it was rendering.
+
+        Args:
+            worker (ExportWorker): Worker that rendered the preview.
+
+            result (ExportResult): Where the preview .gif was written to.
+        """
+        try:
+            if worker is not self.current:
+                return
+
+            # read into memory so the .gif can be removed right away, even while the movie plays it
+            with open(result.path, 'rb') as open_file:
+                data = QtCore.QByteArray(open_file.read())
+        finally:
+            if os.path.exists(result.path):
+                os.remove(result.path)
+
+        self.stopMovie()
+        self.buffer = QtCore.QBuffer(self)
+        self.buffer.setData(data)
+        self.buffer.open(QtCore.QIODevice.ReadOnly)
+        self.movie = QtGui.QMovie(self.buffer, QtCore.QByteArray(b'gif'), self)
+        self.setMovie(self.movie)
+        self.movie.start()
+
+    def onWorkerFinished(self, worker):
+        """
+        Lets go of the given preview worker once its thread is done.
+
+        Args:
+            worker (ExportWorker): Worker that finished.
+        """
+        self.workers.remove(worker)
+        worker.deleteLater()
+
+        if worker is self.current:
+            self.current = None
+            if not self.movie:
+                self.setText('Preview')
+
+    def cancel(self):
+        """
+        Cancels the preview waiting to render and any preview rendering.
+        """
+        self.timer.stop()
+        self.pending = None
+        self.current = None
+
+        for worker in self.workers:
+            worker.cancel()
+
+    def stopMovie(self):
+        """
+        Stops showing the current preview.
+        """
+        if not self.movie:
+            return
+
+        self.movie.stop()
+        self.clear()
+        self.movie.deleteLater()
+        self.buffer.deleteLater()
+        self.movie = None
+        self.buffer = None
+
+    def reset(self):
+        """
+        Cancels any preview and stops showing the current one, such as when another video is opened.
+        """
+        self.cancel()
+        self.stopMovie()
+        self.setText('Preview')
+
+    def stop(self):
+        """
+        Cancels any preview, waits for their threads to finish, and removes the temp directory previews render to.
+        """
+        self.reset()
+
+        for worker in self.workers:
+            worker.wait()
+
+        if self.temp_directory:
+            shutil.rmtree(self.temp_directory, ignore_errors=True)
+            self.temp_directory = ''
@@ -0,0 +1,234 @@
+import os
+import json
+import shutil
+import fractions
+import subprocess
+import giffer.gifutil as gifutil
+from giffer.cache import DiskCache, makeKey
+
+
+# video info is a few kilobytes of .json, this holds thousands of videos
+METADATA_CACHE_SIZE = 16 * 1024 * 1024
+
+# video info already probed this session, keyed by path, size, and modified time
+_probed = {}
+
+
+class VideoInfo(object):
+    """
+    What giffer needs to know about a video before playing or exporting it.
+    """
+    def __init__(self, width, height, fps, frame_count=None, duration=None, keyframes=None, codec=''):
+        """
+        Args:
+            width (int): Width of the video in pixels.
+
+            height (int): Height of the video in pixels.
+
+            fps (fractions.Fraction): Exact frames per second, e.g. 30000/1001 instead of 29.97
+
+            frame_count (int): Frames in the video. None if unknown.
+
+            duration (float): Seconds the video plays for. None if unknown.
+
+            keyframes (list): Seconds of every keyframe, in order. Empty if unknown.
+
+            codec (string): Name of the video codec, e.g. "h264"
+        """
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_count = frame_count
+        self.duration = duration
+        self.keyframes = keyframes or []
+        self.codec = codec
+
+    def toDict(self):
+        """
+        Gets the video info as a dictionary so it can be written to .json
+
+        Returns:
+            (dictionary): VideoInfo arguments as keys, fps as "numerator/denominator" string.
+        """
+        return {'width': self.width,
+                'height': self.height,
+                'fps': str(self.fps),
+                'frame_count': self.frame_count,
+                'duration': self.duration,
+                'keyframes': self.keyframes,
+                'codec': self.codec}
+
+    @classmethod
+    def fromDict(cls, data):
+        """
+        Creates video info from a dictionary such as the one returned by toDict.
+
+        Args:
+            data (dictionary): VideoInfo arguments as keys.
+
+        Returns:
+            (VideoInfo): Video info made from given data.
+        """
+        data = dict(data)
+        data['fps'] = fractions.Fraction(data['fps'])
+        return cls(**data)
+
+
+def getMetadataCache():
+    """
+    Gets the cache that holds probed video info, shared by every giffer.exe
+
+    Returns:
+        (DiskCache): Cache of video info .json
+    """
+    return DiskCache(gifutil.getCacheDirectory('metadata'), METADATA_CACHE_SIZE)
+
+
+def getFfprobePath(ffmpeg_path):
+    """
+    Gets the path to ffprobe.exe, which ships next to ffmpeg.exe
+
+    Args:
+        ffmpeg_path (string): Path to ffmpeg.exe
+
+    Returns:
+        (string): Path to ffprobe next to ffmpeg, or on the PATH. Empty if it can't be found.
+    """
+    if ffmpeg_path:
+        directory, file_name = os.path.split(ffmpeg_path)
+        ffprobe_path = os.path.join(directory, file_name.lower().replace('ffmpeg', 'ffprobe'))
+        if 'ffmpeg' in file_name.lower() and os.path.exists(ffprobe_path):
+            return ffprobe_path
+
+    return shutil.which('ffprobe') or ''
+
+
+def parseRate(rate):
+    """
+    Parses a frame rate as ffprobe writes it.
+
+    Args:
+        rate (string): Rate such as "30000/1001", or "0/0" if unknown.
+
+    Returns:
+        (fractions.Fraction): Frames per second, None if unknown.
+    """
+    try:
+        rate = fractions.Fraction(rate)
+    except (ValueError, ZeroDivisionError, TypeError):
+        return None
+
+    return rate if rate > 0 else None
+
+
+def probeFfprobe(path, ffprobe_path):
+    """
+    Gets the info of the given video with ffprobe.exe. Reads packets without decoding them to find the keyframes,
+    and to count frames when the container does not say how many it has.
+
+    Args:
+        path (string): Path to video.
+
+        ffprobe_path (string): Path to ffprobe.exe
+
+    Returns:
+        (VideoInfo): Info of the video's first video stream.
+    """
+    entries = 'stream=codec_name,width,height,avg_frame_rate,r_frame_rate,nb_frames,duration:' \
+              'format=duration:packet=pts_time,flags'
+    command = [ffprobe_path, '-v', 'error', '-select_streams', 'v:0', '-show_entries', entries, '-of', 'json', path]
+    creation_flags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    data = json.loads(subprocess.check_output(command, stdin=subprocess.DEVNULL, creationflags=creation_flags))
+
+    if not data.get('streams'):
+        raise ValueError('No video stream found in ' + path)
+
+    stream = data['streams'][0]
+    packets = data.get('packets', [])
+    fps = parseRate(stream.get('avg_frame_rate')) or parseRate(stream.get('r_frame_rate'))
+    if not fps:
+        raise ValueError('Could not read the frame rate of ' + path)
+
+    frame_count = int(stream['nb_frames']) if stream.get('nb_frames', '').isdigit() else len(packets) or None
+    duration = stream.get('duration') or data.get('format', {}).get('duration')
+    keyframes = [float(packet['pts_time']) for packet in packets
+                 if 'K' in packet.get('flags', '') and packet.get('pts_time', 'N/A') != 'N/A']
+
+    return VideoInfo(int(stream['width']),
+                     int(stream['height']),
+                     fps,
+                     frame_count,
+                     float(duration) if duration else None,
+                     sorted(keyframes),
+                     stream.get('codec_name', ''))
+
+
+def probeOpenCV(path):
+    """
+    Gets the info of the given video with OpenCV, for when ffprobe.exe can't be found. OpenCV only knows the
+    frame rate as a float, so it is turned back into the closest fraction, and it can't tell where keyframes are.
+
+    Args:
+        path (string): Path to video.
+
+    Returns:
+        (VideoInfo): Info of the video.
+    """
+    # OpenCV takes a while to import and is only needed when there is no ffprobe.exe
+    import cv2
+
+    open_video = cv2.VideoCapture(path)
+
+    try:
+        if not open_video.isOpened():
+            raise ValueError('Could not open video ' + path)
+
+        fps = fractions.Fraction(open_video.get(cv2.CAP_PROP_FPS)).limit_denominator(1001)
+        if fps <= 0:
+            raise ValueError('Could not read the frame rate of ' + path)
+
+        frame_count = int(open_video.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+        return VideoInfo(int(open_video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                         int(open_video.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                         fps,
+                         frame_count,
+                         float(frame_count / fps) if frame_count else None)
+    finally:
+        open_video.release()
+
+
+def probeVideo(path, ffmpeg_path='', cache=None):
+    """
+    Gets the info of the given video, with ffprobe.exe if it can be found, otherwise OpenCV.
+    Info is remembered for the session, and in the given cache, by path, size, and modified time,
+    so opening the same video again does not probe it again.
+
+    Args:
+        path (string): Path to video.
+
+        ffmpeg_path (string): Path to ffmpeg.exe, ffprobe.exe is looked for next to it.
+
+        cache (DiskCache): Cache to keep video info in between sessions. If None, only remembered this session.
+
+    Returns:
+        (VideoInfo): Info of the video.
+    """
+    stat = os.stat(path)
+    key = makeKey('metadata', os.path.abspath(path), stat.st_size, stat.st_mtime)
+
+    if key in _probed:
+        return _probed[key]
+
+    data = cache.fetchJson(key) if cache else None
+    if data:
+        _probed[key] = VideoInfo.fromDict(data)
+        return _probed[key]
+
+    ffprobe_path = getFfprobePath(ffmpeg_path)
+    info = probeFfprobe(path, ffprobe_path) if ffprobe_path else probeOpenCV(path)
+
+    if cache:
+        cache.storeJson(key, info.toDict())
+
+    _probed[key] = info
+    return info
@@ -0,0 +1,343 @@
+import os
+import bisect
+import subprocess
+import numpy
+import giffer.gifutil as gifutil
+from giffer.cache import DiskCache, makeKey
+
+
+# scene analyses are a few kilobytes of .json, this holds thousands of them
+SCENE_CACHE_SIZE = 16 * 1024 * 1024
+
+# frames are decoded this small and in gray, plenty to tell a cut from motion and cheap to diff
+ANALYSIS_WIDTH = 64
+ANALYSIS_HEIGHT = 36
+
+# most frames per second analyzed, faster videos are analyzed at this rate so a cut is off by one frame at most
+MAX_ANALYSIS_FPS = 30.0
+
+# frames read from ffmpeg.exe and diffed at a time
+CHUNK_FRAMES = 256
+
+# a frame differing from the last by this much of full brightness, on average, and by CUT_RATIO times more than
+# the frames before it, starts a new scene
+CUT_THRESHOLD = 0.12
+CUT_RATIO = 3.0
+
+# seconds of frames before a frame that its difference is compared against
+BASELINE_SECONDS = 1.0
+
+# cuts closer together than this are flashes, only the first is kept
+MIN_SCENE_LENGTH = 0.5
+
+# frames differing by this much on average, smoothed over MOTION_SECONDS, are high motion
+MOTION_THRESHOLD = 0.04
+MOTION_SECONDS = 0.5
+
+# high motion shorter than this is not marked
+MIN_MOTION_LENGTH = 1.0
+
+# positions reach us in whole milliseconds, so a boundary this close to a position counts as on it
+TOLERANCE = 0.0005
+
+
+class SceneAnalysis(object):
+    """
+    Where a video cuts to a new scene and where it moves a lot, suggested as places to start or end a .gif.
+    Times are seconds from the first frame, the way players count.
+    """
+    def __init__(self, cuts, motion):
+        """
+        Args:
+            cuts (list): Seconds of the first frame of every new scene, in order.
+
+            motion (list): Start and end in seconds of every high motion segment, in order.
+        """
+        self.cuts = cuts
+        self.motion = motion
+
+    def getBoundaries(self):
+        """
+        Gets every suggested start or end, the cuts and where high motion starts and ends.
+
+        Returns:
+            (list): Seconds of every boundary, in order.
+        """
+        boundaries = set(self.cuts)
+        for start, end in self.motion:
+            boundaries.update((start, end))
+
+        return sorted(boundaries)
+
+    def getNearest(self, seconds):
+        """
+        Gets the boundary nearest the given time.
+
+        Args:
+            seconds (float): Time from the first frame.
+
+        Returns:
+            (float): Seconds of the boundary, None if there are none.
+        """
+        boundaries = self.getBoundaries()
+        if not boundaries:
+            return None
+
+        return min(boundaries, key=lambda boundary: abs(boundary - seconds))
+
+    def getNext(self, seconds):
+        """
+        Gets the first boundary after the given time.
+
+        Args:
+            seconds (float): Time from the first frame.
+
+        Returns:
+            (float): Seconds of the boundary, None if there are none after.
+        """
+        boundaries = self.getBoundaries()
+        index = bisect.bisect_right(boundaries, seconds + TOLERANCE)
+        return boundaries[index] if index < len(boundaries) else None
+
+    def getPrevious(self, seconds):
+        """
+        Gets the last boundary before the given time.
+
+        Args:
+            seconds (float): Time from the first frame.
+
+        Returns:
+            (float): Seconds of the boundary, None if there are none before.
+        """
+        boundaries = self.getBoundaries()
+        index = bisect.bisect_left(boundaries, seconds - TOLERANCE) - 1
+        return boundaries[index] if index >= 0 else None
+
+    def toDict(self):
+        """
+        Gets the analysis as a dictionary so it can be written to .json
+
+        Returns:
+            (dictionary): Cuts and motion as keys.
+        """
+        return {'cuts': self.cuts, 'motion': self.motion}
+
+    @classmethod
+    def fromDict(cls, data):
+        """
+        Creates an analysis from a dictionary such as the one returned by toDict.
+
+        Args:
+            data (dictionary): Cuts and motion as keys.
+
+        Returns:
+            (SceneAnalysis): Analysis made from given data.
+        """
+        return cls(data['cuts'], [tuple(segment) for segment in data['motion']])
+
+
+def getSceneCache():
+    """
+    Gets the cache that holds scene analyses, shared by every giffer.exe
+
+    Returns:
+        (DiskCache): Cache of scene analysis .json
+    """
+    return DiskCache(gifutil.getCacheDirectory('scenes'), SCENE_CACHE_SIZE)
+
+
+def getAnalysisFps(fps):
+    """
+    Gets the frames per second to analyze a video at.
+
+    Args:
+        fps (float): Frame rate of the video, None or 0 if unknown.
+
+    Returns:
+        (float): Frame rate to decode at for analysis.
+    """
+    return min(float(fps), MAX_ANALYSIS_FPS) if fps else MAX_ANALYSIS_FPS
+
+
+def getDifferences(frames, previous=None):
+    """
+    Gets how much every frame differs from the frame before it.
+
+    Args:
+        frames (numpy.ndarray): (N, height, width) uint8 gray frames.
+
+        previous (numpy.ndarray): (height, width) uint8 gray frame before the first. If None, the first frame
+        differs by 0.
+
+    Returns:
+        (numpy.ndarray): (N,) float32 mean absolute difference of each frame, 0 to 1 of full brightness.
+    """
+    frames = frames.astype(numpy.int16)
+    before = numpy.concatenate((frames[:1] if previous is None else previous[numpy.newaxis].astype(numpy.int16),
+                                frames[:-1]))
+    return numpy.abs(frames - before).mean(axis=(1, 2), dtype=numpy.float32) / 255.0
+
+
+def getMovingAverage(values, window, centered=False):
+    """
+    Gets the average of the values around each value.
+
+    Args:
+        values (numpy.ndarray): (N,) values to average.
+
+        window (int): Values in each average.
+
+        centered (boolean): If True, averages the values around each value. If False, averages the window of values
+        before each value, not including it.
+
+    Returns:
+        (numpy.ndarray): (N,) average for each value.
+    """
+    cumulative = numpy.concatenate(([0.0], numpy.cumsum(values, dtype=numpy.float64)))
+    indices = numpy.arange(len(values))
+
+    if centered:
+        low = numpy.maximum(indices - window // 2, 0)
+        high = numpy.minimum(indices + window - window // 2, len(values))
+    else:
+        low = numpy.maximum(indices - window, 0)
+        high = indices
+
+    return (cumulative[high] - cumulative[low]) / numpy.maximum(high - low, 1)
+
+
+def findScenes(differences, fps):
+    """
+    Finds the cuts and high motion segments in the differences between frames.
+
+    Args:
+        differences (numpy.ndarray): (N,) how much every frame differs from the one before it, see getDifferences.
+
+        fps (float): Frames per second the differences were taken at.
+
+    Returns:
+        (SceneAnalysis): Cuts and high motion segments.
+    """
+    if not len(differences):
+        return SceneAnalysis([], [])
+
+    # a cut stands out from the frames before it, motion that is always high does not
+    baseline = getMovingAverage(differences, max(int(round(fps * BASELINE_SECONDS)), 1))
+    candidates = numpy.flatnonzero((differences >= CUT_THRESHOLD) & (differences >= CUT_RATIO * baseline))
+
+    cut_frames = []
+    for frame in candidates:
+        if not cut_frames or frame - cut_frames[-1] >= MIN_SCENE_LENGTH * fps:
+            cut_frames.append(int(frame))
+
+    # cuts would count as a burst of motion, so they are left out of it
+    motion_differences = differences.copy()
+    motion_differences[cut_frames] = baseline[cut_frames]
+    smoothed = getMovingAverage(motion_differences, max(int(round(fps * MOTION_SECONDS)), 1), centered=True)
+
+    # every run of frames moving more than the threshold
+    moving = numpy.concatenate(([0], (smoothed >= MOTION_THRESHOLD).astype(numpy.int8), [0]))
+    changes = numpy.flatnonzero(numpy.diff(moving))
+    segments = [(int(start), int(end)) for start, end in zip(changes[::2], changes[1::2])
+                if end - start >= MIN_MOTION_LENGTH * fps]
+
+    # smoothing blurs where motion starts and ends, motion starting or ending at a cut does so exactly on it
+    def snapToCut(frame):
+        nearest = min(cut_frames, key=lambda cut_frame: abs(cut_frame - frame), default=frame)
+        return nearest if abs(nearest - frame) <= MOTION_SECONDS * fps else frame
+
+    motion = [(round(snapToCut(start) / fps, 3), round(snapToCut(end) / fps, 3)) for start, end in segments]
+    return SceneAnalysis([round(frame / fps, 3) for frame in cut_frames], motion)
+
+
+def analyzeScenes(path, ffmpeg_path, fps=None, is_cancelled=None):
+    """
+    Analyzes the video for scene cuts and high motion. Decodes it tiny and in gray with ffmpeg.exe and diffs each
+    chunk of frames as it arrives, so memory stays the same for any length of video.
+
+    Args:
+        path (string): Path to video.
+
+        ffmpeg_path (string): Path to ffmpeg.exe
+
+        fps (float): Frame rate of the video, None if unknown.
+
+        is_cancelled (callable): Called between chunks, stops the analysis if it returns True.
+
+    Returns:
+        (SceneAnalysis): Cuts and high motion segments, None if cancelled.
+    """
+    analysis_fps = getAnalysisFps(fps)
+    frame_size = ANALYSIS_WIDTH * ANALYSIS_HEIGHT
+    video_filter = 'fps=' + str(analysis_fps) + ',scale=' + str(ANALYSIS_WIDTH) + ':' + str(ANALYSIS_HEIGHT) + \
+                   ':flags=area,format=gray'
+    command = [ffmpeg_path, '-v', 'error', '-i', path, '-map', '0:v:0', '-an', '-sn', '-vf', video_filter,
+               '-f', 'rawvideo', '-']
+    creation_flags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, creationflags=creation_flags)
+
+    chunks = []
+    previous = None
+
+    try:
+        while True:
+            if is_cancelled and is_cancelled():
+                return None
+
+            data = process.stdout.read(frame_size * CHUNK_FRAMES)
+            frames = len(data) // frame_size
+            if not frames:
+                break
+
+            chunk = numpy.frombuffer(data[:frames * frame_size], dtype=numpy.uint8)
+            chunk = chunk.reshape(frames, ANALYSIS_HEIGHT, ANALYSIS_WIDTH)
+            chunks.append(getDifferences(chunk, previous))
+            previous = chunk[-1]
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+        process.stdout.close()
+        return_code = process.wait()
+
+    if return_code and not chunks:
+        raise subprocess.CalledProcessError(return_code, command)
+
+    return findScenes(numpy.concatenate(chunks) if chunks else numpy.zeros(0), analysis_fps)
+
+
+def getScenes(path, ffmpeg_path, fps=None, cache=None, is_cancelled=None):
+    """
+    Gets the scene analysis of the given video, from the given cache if it has been analyzed before.
+    Cached by path, size, modified time, and the rate it is analyzed at. Decoding a long video takes a while,
+    so call from a worker thread.
+
+    Args:
+        path (string): Path to video.
+
+        ffmpeg_path (string): Path to ffmpeg.exe
+
+        fps (float): Frame rate of the video, None if unknown.
+
+        cache (DiskCache): Cache to keep analyses in between sessions. If None, always analyzes.
+
+        is_cancelled (callable): Called while analyzing, stops the analysis if it returns True.
+
+    Returns:
+        (SceneAnalysis): Cuts and high motion segments of the video, None if cancelled.
+    """
+    stat = os.stat(path)
+    thresholds = (ANALYSIS_WIDTH, ANALYSIS_HEIGHT, CUT_THRESHOLD, CUT_RATIO, MOTION_THRESHOLD, MIN_MOTION_LENGTH)
+    key = makeKey('scenes', os.path.abspath(path), stat.st_size, stat.st_mtime, getAnalysisFps(fps), thresholds)
+
+    data = cache.fetchJson(key) if cache else None
+    if data:
+        return SceneAnalysis.fromDict(data)
+
+    scenes = analyzeScenes(path, ffmpeg_path, fps, is_cancelled)
+
+    if cache and scenes:
+        cache.storeJson(key, scenes.toDict())
+
+    return scenes
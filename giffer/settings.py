@@ -1,33 +1,53 @@
 import os
 from PySide2 import QtWidgets, QtCore
 from giffer import gifutil as gifutil
+from giffer.exporter import FORMATS
+
+
+# name shown in the export format box for each format
+FORMAT_NAMES = {'gif': '.gif',
+                'webp': 'Animated .webp',
+                'apng': 'Animated .png (APNG)',
+                'mp4': 'Looping .mp4',
+                'webm': 'Looping .webm'}
 
 
 class Settings(QtWidgets.QWidget):
     """
-    Handles caching data in .json to remember giffer.exe settings.
+    Handles caching data in .json to remember giffer.exe settings. Settings are held in memory by a SettingsStore,
+    which saves them shortly after they change and picks up changes made by other giffer.exe
     """
-    def __init__(self, update_display, clear_display, parent=None):
+    def __init__(self, update_display, clear_display, store, parent=None):
 
         super(Settings, self).__init__(parent=parent)
         self.setWindowTitle('Settings')
-        self.data_path = os.path.join(os.path.dirname(gifutil.getCurrentPath()), 'giffer_data.json')
+        self.store = store
         self.registry_name_key = r'*\shell\Open with Giffer'
         self.registry_name_command = r'*\shell\Open with Giffer\Command'
         self.registered_text = 'giffer.exe is registered to Windows. Right click to on Video file for quick giffer launch option!'
         self.setWindowFlags(QtCore.Qt.Tool | QtCore.Qt.WindowStaysOnTopHint)
         self.update_main_display = update_display
         self.clear_main_display = clear_display
+        self.use_numpy = None
         self.use_convert = None
+        self.stream_convert = None
         self.use_gifsicle = None
         self.ffmpeg_line = None
         self.convert_line = None
         self.gifsicle_line = None
         self.export_line = None
         self.auto_close_checkbox = None
+        self.preview_checkbox = None
+        self.dedupe_checkbox = None
+        self.max_exports_box = None
+        self.max_size_box = None
+        self.width_box = None
+        self.height_box = None
+        self.format_box = None
         self.info = None
         self.build()
         self.updateDisplay()
+        self.store.addListener(self.updateDisplay)
         self.isRegistered()
 
     def build(self):
@@ -38,6 +58,13 @@ class Settings(QtWidgets.QWidget):
         grid_layout = QtWidgets.QGridLayout()
         registry_layout = QtWidgets.QHBoxLayout()
 
+        # use built-in encoder checkbox
+        self.use_numpy = QtWidgets.QCheckBox('Use built-in encoder')
+        self.use_numpy.setToolTip('Encode .gifs in giffer.exe instead of with ffmpeg.exe or convert.exe')
+        self.use_numpy.setChecked(False)
+        self.use_numpy.clicked.connect(self.onUseNumpyChecked)
+        grid_layout.addWidget(self.use_numpy, 1, 0)
+
         # set ffmpeg location button
         ffmpeg_button = QtWidgets.QPushButton('Set ffmpeg')
         ffmpeg_button.clicked.connect(self.setFfmpegPath)
@@ -99,11 +126,85 @@ class Settings(QtWidgets.QWidget):
         self.export_line.setReadOnly(True)
         grid_layout.addWidget(self.export_line, 4, 2)
 
+        # stream frames to convert checkbox
+        self.stream_convert = QtWidgets.QCheckBox('Stream frames to convert.exe')
+        self.stream_convert.setToolTip('Pipe frames from ffmpeg.exe into convert.exe instead of writing .pngs')
+        self.stream_convert.setChecked(False)
+        self.stream_convert.clicked.connect(self.onStreamConvertChecked)
+        grid_layout.addWidget(self.stream_convert, 5, 1)
+
         # auto close checkbox
         self.auto_close_checkbox = QtWidgets.QCheckBox('Close giffer.exe after exporting')
         self.auto_close_checkbox.setChecked(False)
         self.auto_close_checkbox.clicked.connect(self.setAutoClose)
         grid_layout.addWidget(self.auto_close_checkbox, 5, 2)
+
+        # preview checkbox
+        self.preview_checkbox = QtWidgets.QCheckBox('Preview selection')
+        self.preview_checkbox.setToolTip('Render a small preview .gif in the background whenever start or end is set')
+        self.preview_checkbox.setChecked(True)
+        self.preview_checkbox.clicked.connect(self.onPreviewChecked)
+        grid_layout.addWidget(self.preview_checkbox, 6, 0)
+
+        # amount of exports the queue runs at the same time
+        max_exports_label = QtWidgets.QLabel('Simultaneous exports')
+        grid_layout.addWidget(max_exports_label, 6, 1)
+        self.max_exports_box = QtWidgets.QSpinBox()
+        self.max_exports_box.setRange(1, max(os.cpu_count() or 1, 1))
+        self.max_exports_box.valueChanged.connect(self.setMaxExports)
+        grid_layout.addWidget(self.max_exports_box, 6, 2)
+
+        # drop duplicate frames checkbox
+        self.dedupe_checkbox = QtWidgets.QCheckBox('Drop duplicate frames')
+        self.dedupe_checkbox.setToolTip('Show a frame for longer instead of encoding the frames after it that look '
+                                        'the same, smaller and faster for screen recordings')
+        self.dedupe_checkbox.clicked.connect(self.onDedupeChecked)
+        grid_layout.addWidget(self.dedupe_checkbox, 7, 0)
+
+        # size budget the .gif has to fit in, colors, fps, and width are lowered to fit
+        max_size_label = QtWidgets.QLabel('Max .gif size')
+        grid_layout.addWidget(max_size_label, 7, 1)
+        self.max_size_box = QtWidgets.QDoubleSpinBox()
+        self.max_size_box.setRange(0.0, 1024.0)
+        self.max_size_box.setDecimals(1)
+        self.max_size_box.setSuffix(' MB')
+        self.max_size_box.setSpecialValueText('No limit')
+        self.max_size_box.setToolTip('Lower colors, fps, and width as little as needed for the .gif to fit this size')
+        self.max_size_box.valueChanged.connect(self.setMaxSize)
+        grid_layout.addWidget(self.max_size_box, 7, 2)
+
+        # size the .gif is scaled to, scaled before the palette is made so every stage handles fewer pixels
+        scale_label = QtWidgets.QLabel('Scale .gif to')
+        grid_layout.addWidget(scale_label, 8, 1)
+        scale_layout = QtWidgets.QHBoxLayout()
+        self.width_box = QtWidgets.QSpinBox()
+        self.width_box.setRange(0, 8192)
+        self.width_box.setSingleStep(2)
+        self.width_box.setSuffix(' px wide')
+        self.width_box.setSpecialValueText('Video width')
+        self.width_box.setToolTip('Pixels wide to scale the .gif to, the height keeps the aspect ratio if not set')
+        self.width_box.valueChanged.connect(self.setWidth)
+        scale_layout.addWidget(self.width_box)
+        self.height_box = QtWidgets.QSpinBox()
+        self.height_box.setRange(0, 8192)
+        self.height_box.setSingleStep(2)
+        self.height_box.setSuffix(' px high')
+        self.height_box.setSpecialValueText('Video height')
+        self.height_box.setToolTip('Pixels high to scale the .gif to, the width keeps the aspect ratio if not set')
+        self.height_box.valueChanged.connect(self.setHeight)
+        scale_layout.addWidget(self.height_box)
+        grid_layout.addLayout(scale_layout, 8, 2)
+
+        # format to export, anything but .gif is encoded by ffmpeg.exe with the same range, crop, scale, and fps
+        format_label = QtWidgets.QLabel('Export as')
+        grid_layout.addWidget(format_label, 9, 1)
+        self.format_box = QtWidgets.QComboBox()
+        for name in FORMATS:
+            self.format_box.addItem(FORMAT_NAMES[name], name)
+        self.format_box.setToolTip('.webp, .png, .mp4, and .webm are smaller and faster to export than .gif, '
+                                   'and are encoded by ffmpeg.exe only')
+        self.format_box.currentIndexChanged.connect(self.setFormat)
+        grid_layout.addWidget(self.format_box, 9, 2)
         main_layout.addLayout(grid_layout)
 
         # set registry button
@@ -132,6 +233,17 @@ class Settings(QtWidgets.QWidget):
         self.info = QtWidgets.QLabel('')
         main_layout.addWidget(self.info)
 
+    def onUseNumpyChecked(self, new_state):
+        """
+        Updates data when use built-in encoder is checked on or off.
+
+        Args:
+            new_state (boolean): State of use built-in encoder checkbox.
+        """
+        data = self.getData()
+        data['use_numpy'] = new_state
+        self.updateData(data)
+
     def onUseConvertChecked(self, new_state):
         """
         Updates data when use convert.exe is checked on or off.
@@ -143,6 +255,17 @@ class Settings(QtWidgets.QWidget):
         data['use_convert'] = new_state
         self.updateData(data)
 
+    def onStreamConvertChecked(self, new_state):
+        """
+        Updates data when stream frames to convert.exe is checked on or off.
+
+        Args:
+            new_state (boolean): State of stream frames to convert.exe checkbox.
+        """
+        data = self.getData()
+        data['stream_convert'] = new_state
+        self.updateData(data)
+
     def onUseGifsicleChecked(self, new_state):
         """
         Updates data when use gifsicle.exe is checked on or off.
@@ -173,41 +296,146 @@ class Settings(QtWidgets.QWidget):
         data['auto_close'] = state
         self.updateData(data)
 
+    def onPreviewChecked(self, new_state):
+        """
+        Updates data when preview selection is checked on or off.
+
+        Args:
+            new_state (boolean): State of preview selection checkbox.
+        """
+        data = self.getData()
+        data['preview'] = new_state
+        self.updateData(data)
+
+    def onDedupeChecked(self, new_state):
+        """
+        Updates data when drop duplicate frames is checked on or off.
+
+        Args:
+            new_state (boolean): State of drop duplicate frames checkbox.
+        """
+        data = self.getData()
+        data['dedupe'] = new_state
+        self.updateData(data)
+
+    def setMaxExports(self, value):
+        """
+        Updates data when the amount of simultaneous exports is changed.
+
+        Args:
+            value (int): Amount of exports the export queue runs at the same time.
+        """
+        data = self.getData()
+        if data['max_exports'] == value:
+            return
+
+        data['max_exports'] = value
+        self.updateData(data)
+
+    def setMaxSize(self, value):
+        """
+        Updates data when the max .gif size is changed.
+
+        Args:
+            value (float): Megabytes the .gif has to fit in, 0 for no limit.
+        """
+        data = self.getData()
+        if data['max_size'] == value:
+            return
+
+        data['max_size'] = value
+        self.updateData(data)
+
+    def setWidth(self, value):
+        """
+        Updates data when the width to scale the .gif to is changed.
+
+        Args:
+            value (int): Pixels wide to scale the .gif to, 0 to keep the video's width.
+        """
+        data = self.getData()
+        if data['width'] == value:
+            return
+
+        data['width'] = value
+        self.updateData(data)
+
+    def setHeight(self, value):
+        """
+        Updates data when the height to scale the .gif to is changed.
+
+        Args:
+            value (int): Pixels high to scale the .gif to, 0 to keep the video's height.
+        """
+        data = self.getData()
+        if data['height'] == value:
+            return
+
+        data['height'] = value
+        self.updateData(data)
+
+    def setFormat(self, index):
+        """
+        Updates data when the format to export is changed.
+
+        Args:
+            index (int): Index of the chosen format in the export format box.
+        """
+        data = self.getData()
+        name = self.format_box.itemData(index)
+        if data['format'] == name:
+            return
+
+        data['format'] = name
+        self.updateData(data)
+
+    @staticmethod
+    def getDefaultData():
+        """
+        Gets the settings giffer.exe starts with.
+
+        Returns:
+            (dictionary): Setting name as key.
+        """
+        user_directory = os.path.expanduser('~')
+        starting_directory = user_directory if os.path.exists(user_directory) else ''
+        return {
+                'last_opened': starting_directory,
+                'use_numpy': False,
+                'use_convert': False,
+                'stream_convert': False,
+                'use_gifsicle': False,
+                'ffmpeg': '',
+                'convert': '',
+                'gifsicle': '',
+                'export': '',
+                'auto_close': False,
+                'preview': True,
+                'dedupe': False,
+                'max_exports': 2,
+                'max_size': 0.0,
+                'width': 0,
+                'height': 0,
+                'format': 'gif'
+               }
+
     def getData(self):
         """
-        Gets the cached data from the .json file. Creates .json with default settings if it does not exist.
+        Gets a copy of the settings held in memory. Settings missing from an older .json use their default.
 
         Returns:
             (dictionary): Setting name as key.
         """
-        if os.path.exists(self.data_path):
-            return gifutil.readJson(self.data_path)
-        else:
-            user_directory = os.path.expanduser('~')
-            starting_directory = user_directory if os.path.exists(user_directory) else ''
-            data = {
-                    'last_opened': starting_directory,
-                    'use_convert': False,
-                    'use_gifsicle': False,
-                    'ffmpeg': '',
-                    'convert': '',
-                    'gifsicle': '',
-                    'export': '',
-                    'auto_close': False
-                   }
-
-            gifutil.writeJson(self.data_path, data)
-            return data
+        return self.store.getData()
 
     def updateData(self, new_data):
         """
-        Convenience method for writing the .json file and updating the display with new data.
+        Convenience method for setting new data, which updates the display and is saved to the .json shortly after.
 
         Args:
             new_data (dictionary): Data to cache in .json.
         """
-        gifutil.writeJson(self.data_path, new_data)
-        self.updateDisplay(new_data)
+        self.store.setData(new_data)
 
     def updateDisplay(self, new_data=None):
         """
@@ -218,15 +446,27 @@ class Settings(QtWidgets.QWidget):
         """
         data = new_data if new_data else self.getData()
 
+        self.use_numpy.setChecked(data['use_numpy'])
         self.use_convert.setChecked(data['use_convert'])
+        self.use_convert.setEnabled(not data['use_numpy'])
         self.use_gifsicle.setChecked(data['use_gifsicle'])
         self.ffmpeg_line.setText(data['ffmpeg'])
         self.convert_line.setText(data['convert'])
         self.convert_line.setEnabled(data['use_convert'])
+        self.stream_convert.setChecked(data['stream_convert'])
+        self.stream_convert.setEnabled(data['use_convert'])
         self.gifsicle_line.setText(data['gifsicle'])
         self.gifsicle_line.setEnabled(data['use_gifsicle'])
         self.export_line.setText(data['export'])
         self.auto_close_checkbox.setChecked(data['auto_close'])
+        self.preview_checkbox.setChecked(data['preview'])
+        self.dedupe_checkbox.setChecked(data['dedupe'])
+        self.dedupe_checkbox.setEnabled(data['format'] == 'gif' and (data['use_numpy'] or not data['use_convert']))
+        self.max_exports_box.setValue(data['max_exports'])
+        self.max_size_box.setValue(data['max_size'])
+        self.width_box.setValue(data['width'])
+        self.height_box.setValue(data['height'])
+        self.format_box.setCurrentIndex(max(self.format_box.findData(data['format']), 0))
 
     def setFfmpegPath(self):
         """
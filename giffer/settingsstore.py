@@ -0,0 +1,156 @@
+import os
+import threading
+import giffer.gifutil as gifutil
+
+
+class SettingsStore(object):
+    """
+    Holds giffer.exe settings in memory, so reading a setting never touches the disk. Changes are written to the
+    .json a moment later, all at once, while holding a lock so many giffer.exe can share the same .json.
+    Only the settings this giffer.exe changed are written over the .json, and changes other giffer.exe write
+    are picked up when the .json's modified time changes.
+    """
+    def __init__(self, path, defaults, save_delay=0.5):
+        """
+        Args:
+            path (string): Path to the .json the settings are saved to.
+
+            defaults (dictionary): Setting name as key, used for settings missing from the .json
+
+            save_delay (float): Seconds to wait after a change before saving, changes made meanwhile are saved too.
+        """
+        self.path = path
+        self.defaults = defaults
+        self.save_delay = save_delay
+        self.data = dict(defaults)
+        self.changed_keys = set()
+        self.listeners = []
+        self.modified_time = None
+        self.timer = None
+        self.lock = threading.RLock()
+        self.reload()
+
+    def addListener(self, listener):
+        """
+        Adds a function to call whenever the settings change, either from this giffer.exe or another.
+
+        Args:
+            listener (function): Called with a copy of the settings dictionary.
+        """
+        self.listeners.append(listener)
+
+    def notify(self):
+        """
+        Calls every listener with a copy of the settings.
+        """
+        for listener in self.listeners:
+            listener(self.getData(reload=False))
+
+    def getModifiedTime(self):
+        """
+        Gets when the .json was last written.
+
+        Returns:
+            (int): Modified time of the .json in nanoseconds, None if it does not exist.
+        """
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def readFile(self):
+        """
+        Reads the settings in the .json, call while holding the file lock.
+
+        Returns:
+            (dictionary): Settings in the .json, empty if it does not exist or can't be read.
+        """
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            return gifutil.readJson(self.path)
+        except (OSError, ValueError):
+            return {}
+
+    def reload(self):
+        """
+        Reads the .json again, keeping any changes not saved yet. Notifies listeners if any setting changed.
+        """
+        with self.lock:
+            with gifutil.lockFile(self.path):
+                file_data = self.readFile()
+                self.modified_time = self.getModifiedTime()
+
+            data = dict(self.defaults)
+            data.update(file_data)
+            data.update({key: self.data[key] for key in self.changed_keys})
+            changed = data != self.data
+            self.data = data
+
+        # first giffer.exe to launch creates the .json with the default settings
+        if not file_data:
+            self.save()
+
+        if changed:
+            self.notify()
+
+    def getData(self, reload=True):
+        """
+        Gets a copy of the settings, safe to change and pass back to setData.
+
+        Args:
+            reload (boolean): If True, reloads the .json first if another giffer.exe has written to it.
+
+        Returns:
+            (dictionary): Setting name as key.
+        """
+        if reload and not self.changed_keys and self.getModifiedTime() != self.modified_time:
+            self.reload()
+
+        with self.lock:
+            return dict(self.data)
+
+    def setData(self, data):
+        """
+        Sets the settings, saving the ones that changed once no more changes come in for save_delay seconds.
+
+        Args:
+            data (dictionary): Setting name as key, usually a changed copy of what getData returned.
+        """
+        with self.lock:
+            changed_keys = set(key for key, value in data.items() if self.data.get(key) != value)
+            if not changed_keys:
+                return
+
+            self.data.update(data)
+            self.changed_keys |= changed_keys
+
+            if self.timer:
+                self.timer.cancel()
+
+            # not a daemon, so changes made right before giffer.exe closes are still saved
+            self.timer = threading.Timer(self.save_delay, self.save)
+            self.timer.start()
+
+        self.notify()
+
+    def save(self):
+        """
+        Saves the changed settings now, over whatever other giffer.exe have saved since.
+        """
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+
+            with gifutil.lockFile(self.path):
+                data = dict(self.defaults)
+                data.update(self.readFile())
+                data.update({key: self.data[key] for key in self.changed_keys})
+                gifutil.writeJson(self.path, data)
+
+            # saving may run on the timer's thread, so settings other giffer.exe changed are left for the next
+            # getData to reload and notify listeners about on the thread that asked
+            self.changed_keys = set()
+            self.modified_time = None
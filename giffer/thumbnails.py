@@ -0,0 +1,125 @@
+import os
+import subprocess
+import giffer.gifutil as gifutil
+from giffer.cache import DiskCache, makeKey
+
+
+# thumbnails are small .pngs of a few kilobytes, this holds tens of thousands of them
+THUMBNAIL_CACHE_SIZE = 64 * 1024 * 1024
+
+# pixels tall every thumbnail is scaled to, width keeps the video's aspect ratio
+THUMBNAIL_HEIGHT = 54
+
+
+def getThumbnailCache():
+    """
+    Gets the cache that holds video thumbnails, shared by every giffer.exe
+
+    Returns:
+        (DiskCache): Cache of thumbnail .pngs.
+    """
+    return DiskCache(gifutil.getCacheDirectory('thumbnails'), THUMBNAIL_CACHE_SIZE)
+
+
+def getThumbnailTimes(duration, count):
+    """
+    Gets the times to take thumbnails at, one in the middle of each of count equal slices of the video.
+
+    Args:
+        duration (float): Seconds the video plays for.
+
+        count (int): Amount of thumbnails.
+
+    Returns:
+        (list): Seconds of each thumbnail, rounded to the millisecond so they make stable cache keys.
+    """
+    return [round(duration * (index + 0.5) / count, 3) for index in range(count)]
+
+
+def getFillOrder(count):
+    """
+    Gets the order to make thumbnails in, coarse to fine, so a strip fills in evenly instead of left to right.
+    E.g. for 8 thumbnails: 0, 4, 2, 6, 1, 3, 5, 7
+
+    Args:
+        count (int): Amount of thumbnails.
+
+    Returns:
+        (list): Every index from 0 to count - 1 once.
+    """
+    order = []
+    step = 1
+    while step < count:
+        step *= 2
+
+    while step:
+        order += [index for index in range(0, count, step) if index not in order]
+        step //= 2
+
+    return order
+
+
+def extractThumbnail(ffmpeg_path, path, seconds, height=THUMBNAIL_HEIGHT):
+    """
+    Gets a small .png of the video near the given time. Seeks to the keyframe before the time and uses it
+    without decoding up to the exact frame, so it takes about the same time anywhere in an hour long video.
+
+    Args:
+        ffmpeg_path (string): Path to ffmpeg.exe
+
+        path (string): Path to video.
+
+        seconds (float): Time to take the thumbnail at.
+
+        height (int): Pixels tall to scale the thumbnail to.
+
+    Returns:
+        (bytes): .png image.
+    """
+    command = [ffmpeg_path, '-v', 'error', '-noaccurate_seek', '-ss', str(seconds), '-i', path,
+               '-frames:v', '1', '-vf', 'scale=-2:' + str(height), '-f', 'image2pipe', '-vcodec', 'png', '-']
+    creation_flags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    return subprocess.check_output(command, stdin=subprocess.DEVNULL, creationflags=creation_flags)
+
+
+def getThumbnail(ffmpeg_path, path, seconds, height=THUMBNAIL_HEIGHT, cache=None):
+    """
+    Gets a small .png of the video near the given time, from the given cache if it has been made before.
+    Cached by path, size, modified time, time, and height.
+
+    Args:
+        ffmpeg_path (string): Path to ffmpeg.exe
+
+        path (string): Path to video.
+
+        seconds (float): Time to take the thumbnail at.
+
+        height (int): Pixels tall to scale the thumbnail to.
+
+        cache (DiskCache): Cache to keep thumbnails in between sessions. If None, always extracts.
+
+    Returns:
+        (bytes): .png image.
+    """
+    if cache:
+        stat = os.stat(path)
+        key = makeKey('thumbnail', os.path.abspath(path), stat.st_size, stat.st_mtime, seconds, height)
+
+        try:
+            # marks the thumbnail as recently used, the way DiskCache.fetch does
+            os.utime(cache.getPath(key))
+            with open(cache.getPath(key), 'rb') as open_file:
+                return open_file.read()
+        except OSError:
+            pass
+
+    image = extractThumbnail(ffmpeg_path, path, seconds, height)
+
+    if cache:
+        def writeImage(temp_path):
+            with open(temp_path, 'wb') as open_file:
+                open_file.write(image)
+
+        cache.write(key, writeImage)
+
+    return image
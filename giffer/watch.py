@@ -0,0 +1,356 @@
+import os
+import sys
+import time
+import concurrent.futures
+import giffer.gifutil as gifutil
+from giffer.budget import parseSize
+from giffer.cache import hashFile, makeKey
+from giffer.cli import fillFromVideo, getOutputPath
+from giffer.exporter import (FORMAT_EXTENSIONS, ExportCancelled, ExportJob, GifExporter, getIntermediateCache,
+                             getPaletteCache, getResultCache)
+
+
+# files with these extensions are exported, anything else in the folder is left alone
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.mkv', '.avi', '.webm', '.m4v', '.wmv', '.flv', '.ts')
+
+# sidecar .json in a folder with the export settings for every video in it and the folders under it
+PRESET_NAME = 'giffer.json'
+
+# .json in the watched folder remembering which videos were exported, so a restart skips them
+MANIFEST_NAME = 'giffer_manifest.json'
+
+# seconds between looking for new or changed videos
+POLL_INTERVAL = 2.0
+
+# seconds a video's size and modified time must stay the same before exporting, so recordings still being written
+# are not exported half done
+SETTLE_TIME = 5.0
+
+
+class FolderWatcher(object):
+    """
+    Watches a folder for new or changed videos and exports each one to .gif on a pool of workers, with the settings
+    in the giffer.json presets of its folder and the folders above it. Every export is written to a manifest by the
+    video's content hash and preset, so restarting skips videos that were already exported.
+    """
+    def __init__(self, folder, tools, defaults=None, max_workers=None, recursive=True, poll_interval=POLL_INTERVAL,
+                 settle_time=SETTLE_TIME):
+        """
+        Args:
+            folder (string): Folder to watch.
+
+            tools (dictionary): "ffmpeg", "convert", and "gifsicle" as keys, path to each as value.
+
+            defaults (dictionary): ExportJob arguments used for every video, presets win over them.
+
+            max_workers (int): Amount of videos to export at the same time. If None, half the cores.
+
+            recursive (boolean): If True, folders inside the folder are watched too.
+
+            poll_interval (float): Seconds between looking for new or changed videos.
+
+            settle_time (float): Seconds a video must stay unchanged before it is exported.
+        """
+        self.folder = os.path.abspath(folder)
+        self.tools = tools
+        self.defaults = defaults or {}
+        self.max_workers = max_workers or max((os.cpu_count() or 1) // 2, 1)
+        self.recursive = recursive
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.manifest_path = os.path.join(self.folder, MANIFEST_NAME)
+        self.manifest = {}
+        self.seen = {}
+        self.running = {}
+        self.exporters = []
+        self.pool = None
+
+    def loadManifest(self):
+        """
+        Loads the manifest of videos exported before, starting an empty one if there is none or it can't be read.
+        """
+        try:
+            self.manifest = gifutil.readJson(self.manifest_path)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def saveManifest(self):
+        """
+        Writes the manifest of exported videos to the watched folder.
+        """
+        gifutil.writeJson(self.manifest_path, self.manifest)
+
+    def getPreset(self, directory):
+        """
+        Gets the export settings for videos in the given directory, merged from the giffer.json presets of every folder
+        from the watched folder down to it. Presets closer to the video win.
+
+        Args:
+            directory (string): Directory inside the watched folder.
+
+        Returns:
+            (dictionary): ExportJob arguments, plus "output_directory" if a preset sets where .gifs are written.
+        """
+        relative = os.path.relpath(directory, self.folder)
+        parts = [] if relative == os.curdir else relative.split(os.sep)
+        preset = dict(self.defaults)
+
+        for depth in range(len(parts) + 1):
+            path = os.path.join(self.folder, *(parts[:depth] + [PRESET_NAME]))
+            if not os.path.exists(path):
+                continue
+
+            data = gifutil.readJson(path)
+            if 'output_directory' in data:
+                data['output_directory'] = os.path.join(os.path.dirname(path), data['output_directory'])
+
+            preset.update(data)
+
+        return preset
+
+    def findVideos(self):
+        """
+        Gets every video in the watched folder, skipping any video that is itself an export.
+
+        Returns:
+            (list): Path to every video.
+        """
+        outputs = set(os.path.abspath(entry['output']) for entry in self.manifest.values() if entry['output'])
+        outputs.update(os.path.abspath(entry['output']) for _, entry in self.running.values())
+        videos = []
+
+        for root, directories, file_names in os.walk(self.folder):
+            if not self.recursive:
+                directories[:] = []
+
+            paths = [os.path.join(root, file_name) for file_name in sorted(file_names)
+                     if os.path.splitext(file_name)[1].lower() in VIDEO_EXTENSIONS]
+            videos += [path for path in paths if os.path.abspath(path) not in outputs]
+
+        return videos
+
+    def getSettledVideos(self, now):
+        """
+        Gets the videos whose size and modified time have not changed for settle_time seconds.
+
+        Args:
+            now (float): time.time() of this look at the folder.
+
+        Returns:
+            (list): Path to every settled video.
+        """
+        settled = []
+        seen = {}
+
+        for path in self.findVideos():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            signature = (stat.st_size, stat.st_mtime)
+            first_seen = self.seen.get(path, (signature, now))
+            if first_seen[0] != signature:
+                first_seen = (signature, now)
+
+            seen[path] = first_seen
+            if now - first_seen[1] >= self.settle_time:
+                settled.append(path)
+
+        self.seen = seen
+        return settled
+
+    def getJob(self, path, preset):
+        """
+        Gets the job that exports the given video with the given preset.
+
+        Args:
+            path (string): Path to video.
+
+            preset (dictionary): ExportJob arguments, plus "output_directory" if .gifs are written somewhere else.
+
+        Returns:
+            (ExportJob): Job to export.
+        """
+        options = dict(preset)
+        output_directory = options.pop('output_directory', '')
+        if output_directory:
+            os.makedirs(output_directory, exist_ok=True)
+
+        if isinstance(options.get('max_size'), str):
+            options['max_size'] = parseSize(options['max_size'])
+
+        # an unknown format is left for ExportJob to reject
+        extension = FORMAT_EXTENSIONS.get(options.get('format', 'gif'), '.gif')
+
+        try:
+            return ExportJob(path, getOutputPath(path, output_directory, extension), **options)
+        except TypeError as error:
+            raise ValueError('Invalid preset! ' + str(error))
+
+    def isExported(self, key, video_hash, preset_key):
+        """
+        Gets whether the manifest says the video was already exported with the same preset, and its .gif still exists.
+        Videos that failed are only tried again once they or their preset change.
+
+        Args:
+            key (string): Path to video relative to the watched folder.
+
+            video_hash (string): Hash of the video's content.
+
+            preset_key (string): Key of the preset the video would be exported with.
+
+        Returns:
+            (boolean): True if the video should be skipped.
+        """
+        entry = self.manifest.get(key)
+        if not entry or entry['hash'] != video_hash or entry['preset'] != preset_key:
+            return False
+
+        return entry['status'] == 'failed' or os.path.exists(entry['output'])
+
+    def exportVideo(self, job):
+        """
+        Exports the given job on its own exporter. Runs on a pool thread.
+
+        Args:
+            job (ExportJob): Job to export.
+
+        Returns:
+            (ExportResult): Result of the export.
+        """
+        # share the cores between the videos exporting at the same time
+        # every video is exported once, so intermediates are only read if giffer.exe already cut them
+        max_segments = max((os.cpu_count() or 1) // self.max_workers, 1)
+        exporter = GifExporter(self.tools['ffmpeg'], self.tools['convert'], self.tools['gifsicle'],
+                               palette_cache=getPaletteCache(), max_segments=max_segments,
+                               intermediate_cache=getIntermediateCache(), result_cache=getResultCache(),
+                               cut_intermediates=False)
+        self.exporters.append(exporter)
+
+        try:
+            fillFromVideo(job, self.tools['ffmpeg'])
+            return exporter.export(job)
+        finally:
+            self.exporters.remove(exporter)
+
+    def submit(self, path):
+        """
+        Starts exporting the given video on the pool, unless the manifest says it was already exported.
+
+        Args:
+            path (string): Path to settled video.
+        """
+        key = os.path.relpath(path, self.folder)
+        if key in self.running:
+            return
+
+        try:
+            preset = self.getPreset(os.path.dirname(path))
+            video_hash = hashFile(path)
+        except (OSError, ValueError) as error:
+            print('FAILED: ' + path + ': ' + str(error), file=sys.stderr)
+            return
+
+        preset_key = makeKey(preset)
+        if self.isExported(key, video_hash, preset_key):
+            return
+
+        entry = {'hash': video_hash, 'preset': preset_key, 'output': '', 'status': 'failed', 'error': ''}
+
+        try:
+            job = self.getJob(path, preset)
+        except ValueError as error:
+            entry['error'] = str(error)
+            self.finish(key, entry)
+            return
+
+        entry['output'] = job.output
+        self.running[key] = (self.pool.submit(self.exportVideo, job), entry)
+
+    def finish(self, key, entry):
+        """
+        Records how the export of a video ended in the manifest and prints it.
+
+        Args:
+            key (string): Path to video relative to the watched folder.
+
+            entry (dictionary): Manifest entry of the video.
+        """
+        self.manifest[key] = entry
+        self.saveManifest()
+
+        if entry['status'] == 'finished':
+            print(entry['output'])
+        else:
+            print('FAILED: ' + key + ': ' + entry['error'], file=sys.stderr)
+
+    def collect(self):
+        """
+        Records every export that is done in the manifest.
+        """
+        for key, (future, entry) in list(self.running.items()):
+            if not future.done():
+                continue
+
+            del self.running[key]
+            try:
+                result = future.result()
+            except ExportCancelled:
+                continue
+            except Exception as error:
+                entry['error'] = str(error)
+            else:
+                entry['status'] = 'finished'
+                for warning in result.warnings:
+                    print('WARNING: ' + key + ': ' + warning, file=sys.stderr)
+
+            self.finish(key, entry)
+
+    def scan(self):
+        """
+        Looks at the folder once, exporting every settled video that is new or changed.
+        """
+        for path in self.getSettledVideos(time.time()):
+            self.submit(path)
+
+        self.collect()
+
+    def run(self, once=False):
+        """
+        Watches the folder until interrupted with ctrl+c, stopping any exports still running.
+
+        Args:
+            once (boolean): If True, exports every video in the folder now, waits for them, then returns.
+        """
+        self.loadManifest()
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+
+        try:
+            if once:
+                self.settle_time = 0.0
+                self.scan()
+                concurrent.futures.wait([future for future, _ in self.running.values()])
+                self.collect()
+                return
+
+            while True:
+                self.scan()
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        """
+        Cancels the exports waiting and running, videos they were exporting are exported again next run.
+        """
+        for future, _ in self.running.values():
+            future.cancel()
+
+        for exporter in list(self.exporters):
+            exporter.cancel()
+
+        self.pool.shutdown(wait=True)
+        self.running = {}
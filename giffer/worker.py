@@ -0,0 +1,220 @@
+import subprocess
+from PySide2 import QtCore
+from giffer.exporter import ExportCancelled
+from giffer.frameindex import getFrameIndex, getFrameIndexCache
+from giffer.scenes import getSceneCache, getScenes
+from giffer.thumbnails import getThumbnail, getThumbnailCache
+
+
+class ExportWorker(QtCore.QThread):
+    """
+    Runs a GifExporter on its own thread so the UI keeps responding while exporting.
+    Signals are emitted from the worker thread and queued onto the UI thread by Qt.
+    """
+    progressed = QtCore.Signal(object)
+    succeeded = QtCore.Signal(object)
+    failed = QtCore.Signal(object)
+    cancelled = QtCore.Signal()
+
+    def __init__(self, exporter, job, parent=None):
+        """
+        Args:
+            exporter (GifExporter): Exporter to run, its progress callback will be set to emit progressed.
+
+            job (ExportJob): Job to export.
+
+            parent (QObject): Parent of the thread.
+        """
+        super(ExportWorker, self).__init__(parent=parent)
+        self.exporter = exporter
+        self.exporter.progress_callback = self.progressed.emit
+        self.job = job
+
+    def run(self):
+        """
+        Exports the job, emitting succeeded with the ExportResult, failed with the exception, or cancelled.
+        """
+        try:
+            result = self.exporter.export(self.job)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as error:
+            self.failed.emit(error)
+        else:
+            self.succeeded.emit(result)
+
+    def cancel(self):
+        """
+        Kills the processes the exporter is running. The thread finishes once the temp directory is removed.
+        """
+        self.exporter.cancel()
+
+
+class ClipsWorker(ExportWorker):
+    """
+    Runs a GifExporter over many clips of one video on its own thread, decoding the video once for all of them.
+    Emits succeeded once for every clip, each with its own ExportResult, which has the error set if the clip failed.
+    """
+    def __init__(self, exporter, jobs, parent=None):
+        """
+        Args:
+            exporter (GifExporter): Exporter to run, its progress callback will be set to emit progressed.
+
+            jobs (list): ExportJob for every clip, all with the same source.
+
+            parent (QObject): Parent of the thread.
+        """
+        super(ClipsWorker, self).__init__(exporter, jobs[0], parent=parent)
+        self.jobs = jobs
+
+    def run(self):
+        """
+        Exports the clips, emitting succeeded with every ExportResult, failed with the exception, or cancelled.
+        """
+        try:
+            results = self.exporter.exportClips(self.jobs)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as error:
+            self.failed.emit(error)
+        else:
+            for result in results:
+                self.succeeded.emit(result)
+
+
+class FrameIndexWorker(QtCore.QThread):
+    """
+    Gets the frame index of a video on its own thread, since building it reads every packet of the video.
+    """
+    built = QtCore.Signal(str, object)
+    failed = QtCore.Signal(str, object)
+
+    def __init__(self, path, ffmpeg_path, parent=None):
+        """
+        Args:
+            path (string): Path to video to index.
+
+            ffmpeg_path (string): Path to ffmpeg.exe, ffprobe.exe is looked for next to it.
+
+            parent (QObject): Parent of the thread.
+        """
+        super(FrameIndexWorker, self).__init__(parent=parent)
+        self.path = path
+        self.ffmpeg_path = ffmpeg_path
+        self.is_cancelled = False
+
+    def run(self):
+        """
+        Gets the frame index, emitting built with the video path and FrameIndex, or failed with the exception.
+        Emits nothing if cancelled.
+        """
+        try:
+            frame_index = getFrameIndex(self.path, self.ffmpeg_path, getFrameIndexCache(), lambda: self.is_cancelled)
+        except Exception as error:
+            if not self.is_cancelled:
+                self.failed.emit(self.path, error)
+        else:
+            if frame_index:
+                self.built.emit(self.path, frame_index)
+
+    def cancel(self):
+        """
+        Kills ffprobe.exe and stops building once the packet being read is done.
+        """
+        self.is_cancelled = True
+
+
+class SceneWorker(QtCore.QThread):
+    """
+    Analyzes a video for scene cuts and high motion on its own thread, since it decodes the whole video.
+    """
+    built = QtCore.Signal(str, object)
+    failed = QtCore.Signal(str, object)
+
+    def __init__(self, path, ffmpeg_path, fps=None, parent=None):
+        """
+        Args:
+            path (string): Path to video to analyze.
+
+            ffmpeg_path (string): Path to ffmpeg.exe
+
+            fps (float): Frame rate of the video, None if unknown.
+
+            parent (QObject): Parent of the thread.
+        """
+        super(SceneWorker, self).__init__(parent=parent)
+        self.path = path
+        self.ffmpeg_path = ffmpeg_path
+        self.fps = fps
+        self.is_cancelled = False
+
+    def run(self):
+        """
+        Gets the scene analysis, emitting built with the video path and SceneAnalysis, or failed with the exception.
+        Emits nothing if cancelled.
+        """
+        try:
+            scenes = getScenes(self.path, self.ffmpeg_path, self.fps, getSceneCache(), lambda: self.is_cancelled)
+        except Exception as error:
+            self.failed.emit(self.path, error)
+        else:
+            if scenes:
+                self.built.emit(self.path, scenes)
+
+    def cancel(self):
+        """
+        Stops analyzing once the chunk of frames being diffed is done.
+        """
+        self.is_cancelled = True
+
+
+class ThumbnailWorker(QtCore.QThread):
+    """
+    Makes the thumbnails of a video's filmstrip on its own thread, in the given order, emitting each one as it is made.
+    """
+    thumbnailReady = QtCore.Signal(str, int, object)
+
+    def __init__(self, path, times, order, ffmpeg_path, parent=None):
+        """
+        Args:
+            path (string): Path to video to make thumbnails of.
+
+            times (list): Seconds to take each thumbnail at.
+
+            order (list): Indexes of the times to make thumbnails of, in the order to make them.
+
+            ffmpeg_path (string): Path to ffmpeg.exe
+
+            parent (QObject): Parent of the thread.
+        """
+        super(ThumbnailWorker, self).__init__(parent=parent)
+        self.path = path
+        self.times = times
+        self.order = order
+        self.ffmpeg_path = ffmpeg_path
+        self.is_cancelled = False
+
+    def run(self):
+        """
+        Gets each thumbnail, emitting thumbnailReady with the video path, index, and .png bytes.
+        Stops at the first thumbnail that can't be made, since the rest won't be either.
+        """
+        cache = getThumbnailCache()
+
+        for index in self.order:
+            if self.is_cancelled:
+                return
+
+            try:
+                image = getThumbnail(self.ffmpeg_path, self.path, self.times[index], cache=cache)
+            except (OSError, subprocess.CalledProcessError):
+                return
+
+            if image:
+                self.thumbnailReady.emit(self.path, index, image)
+
+    def cancel(self):
+        """
+        Stops making thumbnails once the one being made is done.
+        """
+        self.is_cancelled = True
@@ -0,0 +1,17 @@
+from giffer.budget import getLevels
+from giffer.exporter import ExportJob
+
+
+def getColors(colors):
+    job = ExportJob('clip.mp4', 'clip.gif', end=1.0, colors=colors)
+    return sorted({level.colors for level in getLevels(job, 480, 30.0)}, reverse=True)
+
+
+def test_levels_start_at_the_job_colors():
+    assert getColors(256) == [256, 128, 64, 32]
+    assert getColors(200) == [200, 128, 64, 32]
+    assert getColors(16) == [16]
+
+
+def test_levels_need_two_colors():
+    assert getColors(1) == []
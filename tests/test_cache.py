@@ -0,0 +1,18 @@
+import os
+from giffer.cache import getFileKey
+
+
+def test_file_key_tells_apart_copies(tmp_path):
+    first = tmp_path / 'first.mp4'
+    second = tmp_path / 'second.mp4'
+    first.write_bytes(b'video')
+    second.write_bytes(b'video')
+
+    # same content in another place is another video
+    assert getFileKey(str(first))[3] == getFileKey(str(second))[3]
+    assert getFileKey(str(first)) != getFileKey(str(second))
+
+    # so is the same path rewritten later
+    key = getFileKey(str(first))
+    os.utime(str(first), (1, 1))
+    assert getFileKey(str(first)) != key
@@ -0,0 +1,54 @@
+import os
+from giffer.cli import getOutputPath
+
+
+def test_output_path_never_overwrites_source(tmp_path):
+    source = tmp_path / 'clip.mp4'
+    source.write_bytes(b'video')
+
+    # same extension next to the video, or into the video's own folder, gets a suffix
+    assert getOutputPath(str(source), '', '.mp4') == str(tmp_path / 'clip_clip.mp4')
+    assert getOutputPath(str(source), str(tmp_path), '.mp4') == str(tmp_path / 'clip_clip.mp4')
+
+    # other formats keep the video's name
+    assert getOutputPath(str(source), '', '.gif') == str(tmp_path / 'clip.gif')
+
+    # a path written differently is still the video
+    other = os.path.join(str(tmp_path), '.', 'clip.mp4')
+    assert getOutputPath(other, '', '.mp4').endswith('clip_clip.mp4')
+
+
+def test_export_refuses_to_overwrite_source(tmp_path):
+    import pytest
+    from giffer.exporter import ExportJob, GifExporter
+
+    source = tmp_path / 'clip.mp4'
+    source.write_bytes(b'video')
+
+    job = ExportJob(str(source), str(source), end=1.0, format='mp4')
+    with pytest.raises(ValueError):
+        GifExporter('').validateJob(job)
+
+    assert source.read_bytes() == b'video'
+
+
+def test_bad_jobs_name_the_file_and_entry(tmp_path):
+    import json
+    import pytest
+    from giffer.cli import readJobs
+
+    jobs = tmp_path / 'jobs.json'
+    with pytest.raises(ValueError, match='jobs.json'):
+        readJobs(str(jobs))
+
+    jobs.write_text('[{"source": "a.mp4"')
+    with pytest.raises(ValueError, match='Could not read --jobs'):
+        readJobs(str(jobs))
+
+    jobs.write_text(json.dumps([{'source': 'a.mp4', 'output': 'a.gif', 'end': 1.0}, {'source': 'b.mp4'}]))
+    with pytest.raises(ValueError, match='Invalid job 1 in --jobs'):
+        readJobs(str(jobs))
+
+    jobs.write_text(json.dumps([{'source': 'a.mp4', 'output': 'a.gif', 'end': 1.0}, 'b.mp4']))
+    with pytest.raises(ValueError, match='Invalid job 1 in --jobs'):
+        readJobs(str(jobs))
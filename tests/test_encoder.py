@@ -0,0 +1,43 @@
+import numpy
+import pytest
+from PIL import Image
+from giffer.encoder import GifWriter
+
+
+def getIndices(pattern, colors, height=64, width=96):
+    if pattern == 'random':
+        return numpy.random.RandomState(colors).randint(0, colors, (height, width)).astype(numpy.uint8)
+
+    if pattern == 'flat':
+        return numpy.full((height, width), colors - 1, dtype=numpy.uint8)
+
+    gradient = numpy.arange(height * width).reshape(height, width) * colors // (height * width)
+    return gradient.astype(numpy.uint8)
+
+
+@pytest.mark.parametrize('colors', [1, 2, 3, 4, 5, 16, 17, 128, 255, 256])
+@pytest.mark.parametrize('pattern', ['random', 'flat', 'gradient'])
+def test_frames_decode_to_the_same_indices(tmp_path, pattern, colors):
+    path = str(tmp_path / 'encoded.gif')
+    palette = numpy.repeat(numpy.arange(colors, dtype=numpy.uint8)[:, None], 3, axis=1)
+    indices = getIndices(pattern, colors)
+
+    writer = GifWriter(path, indices.shape[1], indices.shape[0], palette)
+    writer.writeFrame(indices, 4)
+    writer.close()
+
+    with Image.open(path) as image:
+        assert numpy.array_equal(numpy.array(image), indices)
+
+
+def test_big_frame_fills_the_code_table(tmp_path):
+    path = str(tmp_path / 'encoded.gif')
+    palette = numpy.repeat(numpy.arange(256, dtype=numpy.uint8)[:, None], 3, axis=1)
+    indices = getIndices('random', 256, 300, 400)
+
+    writer = GifWriter(path, 400, 300, palette)
+    writer.writeFrame(indices, 4)
+    writer.close()
+
+    with Image.open(path) as image:
+        assert numpy.array_equal(numpy.array(image), indices)
@@ -0,0 +1,53 @@
+import io
+from giffer.exporter import GifExporter, ProcessError
+
+
+def test_progress_blocks_keep_errors_apart():
+    stream = io.BytesIO(b'frame=3\nfps=30.0\nprogress=continue\n[gif @ 0x1] Invalid palette\nframe=6\n'
+                        b'progress=end\nError while filtering: x=1 failed\n')
+    errors = []
+
+    blocks = list(GifExporter.readProgressBlocks(stream, errors))
+
+    assert [block['frame'] for block in blocks] == ['3', '6']
+    assert errors == ['[gif @ 0x1] Invalid palette', 'Error while filtering: x=1 failed']
+
+
+def test_process_error_shows_stderr():
+    assert str(ProcessError(1, ['ffmpeg'], stderr='Invalid data')).endswith('exit status 1. Invalid data')
+    assert str(ProcessError(1, ['ffmpeg'], stderr='')).endswith('exit status 1.')
+
+
+def test_failed_group_only_exports_failed_clips_again():
+    from giffer.exporter import ExportJob, ExportResult
+
+    jobs = [ExportJob('clip.mp4', 'clip_' + str(number) + '.gif', start=number, end=number + 1.0)
+            for number in range(3)]
+    exported = []
+
+    def exportGroup(group):
+        results = [ExportResult(job) for job in group]
+        results[1].error = OSError('Could not save')
+        return results
+
+    def export(job):
+        exported.append(job)
+        return ExportResult(job)
+
+    exporter = GifExporter('')
+    exporter.exportGroup = exportGroup
+    exporter.export = export
+
+    results = exporter.exportClips(jobs)
+    assert exported == [jobs[1]]
+    assert [result.job for result in results] == jobs
+    assert not any(result.error for result in results)
+
+    # a pass that failed outright exports every clip on its own
+    def failGroup(group):
+        raise OSError('Could not decode')
+
+    exported = []
+    exporter.exportGroup = failGroup
+    exporter.exportClips(jobs)
+    assert exported == jobs
@@ -0,0 +1,28 @@
+import numpy
+from PIL import Image
+from giffer.encoder import GifWriter
+from giffer.gifstream import GifStream, joinGifs
+
+
+def writeGif(path, delays, offset):
+    palette = numpy.repeat(numpy.arange(8, dtype=numpy.uint8)[:, None] * 32, 3, axis=1)
+    writer = GifWriter(path, 16, 12, palette)
+    for number, delay in enumerate(delays):
+        writer.writeFrame(numpy.full((12, 16), (offset + number) % 8, dtype=numpy.uint8), delay)
+
+    writer.close()
+
+
+def test_joined_gif_keeps_every_frame_and_delay(tmp_path):
+    paths = [str(tmp_path / 'first.gif'), str(tmp_path / 'second.gif'), str(tmp_path / 'third.gif')]
+    delays = [[3, 4, 5], [10, 2], [7]]
+    for offset, (path, gif_delays) in enumerate(zip(paths, delays)):
+        writeGif(path, gif_delays, offset * 3)
+
+    output = str(tmp_path / 'joined.gif')
+    joinGifs(paths, output)
+
+    assert GifStream.fromFile(output).getDelays() == [3, 4, 5, 10, 2, 7]
+    with Image.open(output) as image:
+        assert image.n_frames == 6
+        assert image.info['loop'] == 0
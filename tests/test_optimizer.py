@@ -0,0 +1,24 @@
+import numpy
+from giffer.encoder import GifWriter
+from giffer.gifstream import MAX_DELAY, GifStream
+from giffer.optimizer import FrameOptimizer
+
+
+def test_merged_frames_keep_the_total_delay(tmp_path):
+    path = str(tmp_path / 'optimized.gif')
+    palette = numpy.array([[0, 0, 0], [255, 255, 255], [255, 0, 255]], dtype=numpy.uint8)
+    frame = numpy.arange(64, dtype=numpy.uint8).reshape(8, 8) % 2
+    delays = [30000, 30000, 30000, 7, 1]
+
+    writer = GifWriter(path, 8, 8, palette)
+    optimizer = FrameOptimizer(writer, 2)
+    for delay in delays:
+        optimizer.addFrame(frame, delay)
+
+    optimizer.flush()
+    writer.close()
+
+    written = GifStream.fromFile(path).getDelays()
+    assert sum(written) == sum(delays)
+    assert max(written) <= MAX_DELAY
+    assert len(written) < len(delays)